@@ -10,7 +10,6 @@ Demonstrates testing patterns and best practices for PydanticAI agents:
 """
 
 import pytest
-import asyncio
 from unittest.mock import Mock, AsyncMock
 from dataclasses import dataclass
 from typing import Optional, List
@@ -115,7 +114,6 @@ class TestAgentBasics:
             assert result.data.confidence == 0.9
             assert result.data.actions == ["test_action"]
     
-    @pytest.mark.asyncio
     async def test_agent_async_with_test_model(self, test_dependencies):
         """Test async agent behavior with TestModel."""
         test_model = TestModel()
@@ -148,7 +146,6 @@ class TestAgentTools:
             user_id="test_user_456"
         )
     
-    @pytest.mark.asyncio
     async def test_database_tool_success(self, mock_dependencies):
         """Test database tool with successful response."""
         test_model = TestModel(call_tools=['mock_database_query'])
@@ -165,7 +162,6 @@ class TestAgentTools:
             # TestModel should include tool results
             assert "mock_database_query" in result.data.message
     
-    @pytest.mark.asyncio
     async def test_database_tool_error(self, mock_dependencies):
         """Test database tool with error handling."""
         # Configure mock to raise exception
@@ -320,7 +316,6 @@ class TestAgentIntegration:
             user_id="test_integration_user"
         )
     
-    @pytest.mark.asyncio
     async def test_complete_workflow(self, full_mock_dependencies):
         """Test complete agent workflow with multiple tools."""
         test_model = TestModel(call_tools='all')  # Call all available tools
@@ -358,7 +353,6 @@ class TestAgentErrorRecovery:
             user_id="failing_test_user"
         )
     
-    @pytest.mark.asyncio
     async def test_tool_error_recovery(self, failing_dependencies):
         """Test agent behavior when tools fail."""
         test_model = TestModel(call_tools='all')
@@ -376,14 +370,6 @@ class TestAgentErrorRecovery:
 
 
 # Pytest configuration and utilities
-@pytest.fixture(scope="session")
-def event_loop():
-    """Create an instance of the default event loop for the test session."""
-    loop = asyncio.get_event_loop_policy().new_event_loop()
-    yield loop
-    loop.close()
-
-
 def pytest_configure(config):
     """Configure pytest with custom markers."""
     config.addinivalue_line(
@@ -4,7 +4,7 @@ WhatsApp Conversational Scheduling Agent.
 A PydanticAI-based agent for handling appointment scheduling through WhatsApp.
 """
 
-from .agent import scheduling_agent, chat_with_scheduler, chat_with_scheduler_sync
+from .agent import get_scheduling_agent, chat_with_scheduler, chat_with_scheduler_sync
 from .dependencies import create_scheduling_dependencies, SchedulingDependencies
 from .settings import settings
 from .providers import get_llm_model, get_model_info
@@ -12,6 +12,7 @@ from .providers import get_llm_model, get_model_info
 __version__ = "1.0.0"
 __all__ = [
     "scheduling_agent",
+    "get_scheduling_agent",
     "chat_with_scheduler", 
     "chat_with_scheduler_sync",
     "create_scheduling_dependencies",
@@ -19,4 +20,11 @@ __all__ = [
     "settings",
     "get_llm_model",
     "get_model_info"
-]
\ No newline at end of file
+]
+
+
+def __getattr__(name):
+    """Build `scheduling_agent` on first access rather than at package import."""
+    if name == "scheduling_agent":
+        return get_scheduling_agent()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -3,100 +3,58 @@ WhatsApp Conversational Scheduling Agent.
 Following main_agent_reference patterns with string output and focused tools.
 """
 
+import asyncio
 import logging
-from typing import List, Dict, Any, Optional, Tuple
-from pydantic_ai import Agent, RunContext
+from datetime import datetime
+from functools import cache
+from typing import List, Dict, Any, Optional, Tuple, Callable, Awaitable
 
-from providers import get_llm_model
-from dependencies import SchedulingDependencies
-from tools import (
-    send_whatsapp_message,
-    check_calendar_availability,
+from pydantic import ValidationError
+from pydantic_ai import Agent, RunContext
+from pydantic_ai.exceptions import UnexpectedModelBehavior
+
+from .providers import get_llm_model
+from .dependencies import SchedulingDependencies, get_timezone
+from .planner import JITPlanner, PlanValidationError
+from .prompts import SYSTEM_PROMPT, WORKFLOW_EXAMPLE
+from .availability import cached_check_calendar_availability
+from .date_parsing import parse_datetime_natural_async
+from .routing import classify_message
+from .responses import response_key, response_cache_for, stream_agent_response
+from .sync_runner import run_on_background_loop
+from .time_ranges import parse_time_range, fast_parse
+from .tools import (
+    flush_outbox,
     book_class,
     cancel_booking,
     get_client_bookings,
-    parse_datetime_natural
+    CLASS_DURATIONS
 )
 
 logger = logging.getLogger(__name__)
 
+# Concurrent Google Calendar lookups allowed per batch availability check
+MAX_CONCURRENT_CALENDAR_CALLS = 10
 
-SYSTEM_PROMPT = """
-You are a friendly and efficient scheduling assistant for a fitness studio. Your role is to help clients book, reschedule, and manage their class appointments through WhatsApp.
-
-MANDATORY RULES FOR DATE/TIME HANDLING:
-1. CONTEXT AWARENESS - You MUST understand what "today" is:
-   - ALWAYS use get_current_datetime tool first when user mentions relative dates
-   - This gives you context for "próximo viernes", "tomorrow", "next week"
-   - Without current date, you cannot calculate relative dates properly
-
-2. When ANY date or time is mentioned (like "próximo viernes", "tomorrow", "8pm"), you MUST:
-   - FIRST use get_current_datetime to understand current date context
-   - THEN use parse_date_time tool with the user's exact words
-   - NEVER ask the user to provide dates in a specific format
-   - NEVER try to parse dates yourself
-
-3. WORKFLOW EXAMPLE FOR RELATIVE DATES:
-   User: "necesito agendar una clase de pilates para el próximo viernes a las 8pm"
-   You MUST:
-   Step 1: Use get_current_datetime() to know what day it is today
-   Step 2: Use parse_date_time("próximo viernes a las 8pm") with current context
-   Step 3: If successful, ask for name and phone
-   Step 4: Once you have all info, use make_booking tool
-
-4. CONTEXT IS CRITICAL:
-   - "próximo viernes" means different dates depending on what day it is today
-   - Always establish current date context first
-   - Then parse relative expressions with that context
-
-Key responsibilities:
-- Greet clients warmly and professionally (only ONCE per conversation)
-- Understand scheduling requests in natural language
-- Use the parse_date_time tool for ANY date/time expressions
-- Check availability and suggest suitable time slots
-- Handle booking confirmations and send details
-- Manage rescheduling and cancellations
-- Answer basic questions about class types, duration, and instructors
-- Maintain conversation context throughout the interaction
-
-Guidelines:
-- Do NOT repeat greetings in ongoing conversations
-- Always confirm the details before finalizing a booking
-- Offer 3-5 available time slots when possible
-- Be proactive about potential scheduling conflicts
-- Use the client's timezone for all communications
-- Send confirmation messages with all relevant details
-- Be concise but thorough in responses
-- Handle edge cases gracefully (no availability, last-minute changes)
-- Remember conversation context and previous bookings
-
-Class Types Available:
-- Yoga (60 minutes)
-- Pilates (45 minutes)
-- HIIT Training (30 minutes)
-- Personal Training (60 minutes)
-- Group Fitness (45 minutes)
-
-You should NOT:
-- Discuss pricing or payment (redirect to staff)
-- Make changes to instructor schedules
-- Share other clients' information
-- Book outside of business hours without special authorization
-- Ask users to format dates - use parse_date_time instead
-
-Always be helpful, professional, and focus on making scheduling as easy as possible for clients.
-"""
+# Day names indexed by datetime.weekday()
+_DAYS_ES = ('lunes', 'martes', 'miércoles', 'jueves', 'viernes', 'sábado', 'domingo')
+_DAYS_EN = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
 
 
-# Create the scheduling agent - using string output (no result_type)
-scheduling_agent = Agent(
-    get_llm_model(),
-    deps_type=SchedulingDependencies,
-    system_prompt=SYSTEM_PROMPT
-)
+def _compact(result: Any) -> Any:
+    """
+    Drop None-valued fields from a tool result before it is echoed to the model.
+    
+    Empty fields cost prompt tokens on every tool round-trip without telling
+    the model anything.
+    """
+    if isinstance(result, dict):
+        return {key: _compact(value) for key, value in result.items() if value is not None}
+    if isinstance(result, list):
+        return [_compact(item) for item in result]
+    return result
 
 
-@scheduling_agent.tool
 async def send_message(
     ctx: RunContext[SchedulingDependencies],
     to_number: str,
@@ -106,6 +64,8 @@ async def send_message(
     """
     Send a WhatsApp message to a client.
     
+    Messages are queued and delivered together at the end of the turn.
+    
     Args:
         to_number: Client's phone number
         message: Message content to send
@@ -114,10 +74,32 @@ async def send_message(
     Returns:
         Message delivery status
     """
-    return await send_whatsapp_message(ctx, to_number, message, template_type)
+    ctx.deps.outbox.enqueue(to_number, message, template_type)
+    return f"Message to {to_number} queued for delivery"
+
+
+async def _check_availability(
+    ctx: RunContext[SchedulingDependencies],
+    date: str,
+    time_range: Optional[str],
+    instructor: Optional[str],
+    prefetch_days: int
+) -> List[Dict[str, Any]]:
+    """Resolve natural language date/time range and query the cached calendar."""
+    # Parse the date if it's in natural language
+    parsed_date = await parse_datetime_natural_async(ctx, date)
+    if not parsed_date.get("success"):
+        return [{"error": f"Could not understand date: {date}"}]
+    
+    formatted_date = parsed_date["date"]
+    
+    time_tuple = parse_time_range(time_range) if time_range else None
+    
+    return await cached_check_calendar_availability(
+        ctx, formatted_date, time_tuple, instructor, prefetch_days=prefetch_days
+    )
 
 
-@scheduling_agent.tool
 async def check_availability(
     ctx: RunContext[SchedulingDependencies],
     date: str,
@@ -135,28 +117,40 @@ async def check_availability(
     Returns:
         List of available time slots with instructor information
     """
-    # Parse the date if it's in natural language
-    parsed_date = parse_datetime_natural(ctx, date)
-    if not parsed_date.get("success"):
-        return [{"error": f"Could not understand date: {date}"}]
+    # Prefetch the next two days, clients often ask for alternatives
+    return await _check_availability(ctx, date, time_range, instructor, prefetch_days=2)
+
+
+async def batch_check_availability(
+    ctx: RunContext[SchedulingDependencies],
+    dates: List[str],
+    time_range: Optional[str] = None,
+    instructor: Optional[str] = None
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Check calendar availability for several dates at once.
     
-    formatted_date = parsed_date["date"]
+    Prefer this over repeated check_availability calls when the client is
+    comparing multiple days.
     
-    # Parse time range if provided
-    time_tuple = None
-    if time_range:
-        # Simple time range parsing (can be enhanced)
-        if "morning" in time_range.lower():
-            time_tuple = ("09:00", "12:00")
-        elif "afternoon" in time_range.lower():
-            time_tuple = ("12:00", "17:00")
-        elif "evening" in time_range.lower():
-            time_tuple = ("17:00", "20:00")
+    Args:
+        dates: Dates to check (e.g., ["tomorrow", "next Monday", "2024-01-17"])
+        time_range: Optional time range applied to every date
+        instructor: Optional preferred instructor name
+    
+    Returns:
+        Available time slots keyed by the requested date
+    """
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_CALENDAR_CALLS)
+    
+    async def _check(date: str) -> List[Dict[str, Any]]:
+        async with semaphore:
+            return await _check_availability(ctx, date, time_range, instructor, prefetch_days=0)
     
-    return await check_calendar_availability(ctx, formatted_date, time_tuple, instructor)
+    results = await asyncio.gather(*(_check(date) for date in dates))
+    return dict(zip(dates, results))
 
 
-@scheduling_agent.tool
 async def make_booking(
     ctx: RunContext[SchedulingDependencies],
     client_name: str,
@@ -182,15 +176,13 @@ async def make_booking(
     Returns:
         Booking confirmation details
     """
-    # Check if date is already in YYYY-MM-DD format or needs parsing
-    import re
-    if re.match(r'^\d{4}-\d{2}-\d{2}$', date) and re.match(r'^\d{2}:\d{2}$', time):
-        # Date and time are already parsed - use directly
-        booking_date = date
-        booking_time = time
+    # Skip natural language parsing when the model already normalized the inputs
+    fast = fast_parse(date, time)
+    if fast:
+        booking_date, booking_time = fast
     else:
         # Parse date and time from natural language
-        parsed_datetime = parse_datetime_natural(ctx, f"{date} at {time}")
+        parsed_datetime = await parse_datetime_natural_async(ctx, f"{date} at {time}")
         if not parsed_datetime.get("success"):
             return {
                 "success": False,
@@ -200,13 +192,12 @@ async def make_booking(
         booking_date = parsed_datetime["date"]
         booking_time = parsed_datetime["time"]
     
-    return await book_class(
+    return _compact(await book_class(
         ctx, client_name, client_phone, booking_date, 
         booking_time, class_type, instructor, notes
-    )
+    ))
 
 
-@scheduling_agent.tool
 async def cancel_appointment(
     ctx: RunContext[SchedulingDependencies],
     booking_id: Optional[str] = None,
@@ -219,7 +210,7 @@ async def cancel_appointment(
     
     Args:
         booking_id: Booking ID (if known)
-        client_phone: Client's phone number
+        client_phone: Client's phone number (only the sender's own bookings can be cancelled)
         date: Booking date (if booking_id not provided)
         time: Booking time (if booking_id not provided)
     
@@ -229,24 +220,23 @@ async def cancel_appointment(
     # Parse date if provided and in natural language
     formatted_date = date
     if date and not booking_id:
-        parsed_date = parse_datetime_natural(ctx, date)
+        parsed_date = await parse_datetime_natural_async(ctx, date)
         if parsed_date.get("success"):
             formatted_date = parsed_date["date"]
     
-    return await cancel_booking(ctx, booking_id, client_phone, formatted_date, time)
+    return _compact(await cancel_booking(ctx, booking_id, client_phone, formatted_date, time))
 
 
-@scheduling_agent.tool
 async def view_bookings(
     ctx: RunContext[SchedulingDependencies],
     client_phone: str,
     date_range: Optional[str] = None
 ) -> List[Dict[str, Any]]:
     """
-    View all bookings for a client.
+    View all bookings of the client in this conversation.
     
     Args:
-        client_phone: Client's phone number
+        client_phone: Client's phone number (only the sender's own bookings are returned)
         date_range: Optional date range (e.g., "this week", "next month")
     
     Returns:
@@ -254,10 +244,27 @@ async def view_bookings(
     """
     # For now, ignore date_range parsing and return all bookings
     # In production, this would filter by date range
-    return await get_client_bookings(ctx, client_phone)
+    return _compact(await get_client_bookings(ctx, client_phone))
+
+
+def get_studio_info(ctx: RunContext[SchedulingDependencies]) -> Dict[str, Any]:
+    """
+    Get studio reference information.
+    
+    Returns:
+        Class types with durations, business hours and an example booking workflow
+    """
+    return {
+        "class_types": [
+            {"name": name, "duration_minutes": minutes}
+            for name, minutes in CLASS_DURATIONS.items()
+        ],
+        "business_hours": f"{ctx.deps.business_hours_start:02d}:00-{ctx.deps.business_hours_end:02d}:00",
+        "timezone": ctx.deps.user_timezone,
+        "workflow_example": WORKFLOW_EXAMPLE,
+    }
 
 
-@scheduling_agent.tool
 def get_current_datetime(
     ctx: RunContext[SchedulingDependencies],
     timezone: Optional[str] = None
@@ -271,45 +278,34 @@ def get_current_datetime(
     Returns:
         Current datetime information
     """
-    from datetime import datetime
-    import pytz
-    
     # Use user timezone or default
     tz_str = timezone or ctx.deps.user_timezone
     
     try:
         # Get current time in specified timezone
-        if tz_str == "UTC":
-            now = datetime.utcnow().replace(tzinfo=pytz.UTC)
-        else:
-            tz = pytz.timezone(tz_str)
-            now = datetime.now(tz)
-        
-        # Calculate day of week in Spanish and English
-        days_es = ['lunes', 'martes', 'miércoles', 'jueves', 'viernes', 'sábado', 'domingo']
-        days_en = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+        now = datetime.now(get_timezone(tz_str))
         
         return {
             "current_datetime": now.isoformat(),
             "current_date": now.strftime('%Y-%m-%d'),
             "current_time": now.strftime('%H:%M'),
             "day_of_week": now.weekday(),  # 0=Monday, 6=Sunday
-            "day_name_es": days_es[now.weekday()],
-            "day_name_en": days_en[now.weekday()],
+            "day_name_es": _DAYS_ES[now.weekday()],
+            "day_name_en": _DAYS_EN[now.weekday()],
             "timezone": str(now.tzinfo),
             "formatted": now.strftime('%A, %B %d, %Y at %I:%M %p')
         }
         
     except Exception as e:
+        now = datetime.now(get_timezone("UTC"))
         return {
             "error": f"Error getting current time: {str(e)}",
-            "current_date": datetime.now().strftime('%Y-%m-%d'),
-            "current_time": datetime.now().strftime('%H:%M')
+            "current_date": now.date().isoformat(),
+            "current_time": f"{now.hour:02d}:{now.minute:02d}"
         }
 
 
-@scheduling_agent.tool
-def parse_date_time(
+async def parse_date_time(
     ctx: RunContext[SchedulingDependencies],
     user_input: str,
     timezone: Optional[str] = None
@@ -327,13 +323,105 @@ def parse_date_time(
     Returns:
         Structured datetime information
     """
-    return parse_datetime_natural(ctx, user_input, timezone)
+    return await parse_datetime_natural_async(ctx, user_input, timezone)
+
+
+# Tools registered on the scheduling agent
+AGENT_TOOLS = (
+    send_message,
+    check_availability,
+    batch_check_availability,
+    make_booking,
+    cancel_appointment,
+    view_bookings,
+    get_current_datetime,
+    parse_date_time,
+    get_studio_info,
+)
+
+# Lookup-only subset for the read agent, keeps mutating tool schemas out of the prompt
+READ_ONLY_TOOLS = (
+    check_availability,
+    batch_check_availability,
+    view_bookings,
+    get_current_datetime,
+    parse_date_time,
+    get_studio_info,
+)
 
 
+@cache
+def get_scheduling_agent() -> Agent:
+    """
+    Build the scheduling agent on first use.
+    
+    Model client construction and tool registration happen once, on the
+    first chat instead of at import time.
+    
+    Returns:
+        Scheduling agent with all tools registered
+    """
+    return _build_agent(AGENT_TOOLS)
+
+
+@cache
+def get_read_agent() -> Agent:
+    """
+    Build the read-only scheduling agent on first use.
+    
+    Returns:
+        Agent with only the lookup tools registered
+    """
+    return _build_agent(READ_ONLY_TOOLS)
+
+
+def _build_agent(tools: Tuple[Callable[..., Any], ...]) -> Agent:
+    """Create a scheduling agent with the given tools registered."""
+    # Create the scheduling agent - using string output (no result_type)
+    agent = Agent(
+        get_llm_model(),
+        deps_type=SchedulingDependencies,
+        system_prompt=SYSTEM_PROMPT
+    )
+    for tool in tools:
+        agent.tool(tool)
+    return agent
+
+
+def __getattr__(name: str) -> Any:
+    """Keep `agent.scheduling_agent` and `agent.jit_planner` working for existing callers."""
+    if name == "scheduling_agent":
+        return get_scheduling_agent()
+    if name == "jit_planner":
+        return get_jit_planner()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+@cache
+def get_jit_planner() -> JITPlanner:
+    """
+    Build the JIT planner on first use.
+    
+    Returns:
+        Planner dispatching straight to the lookup tools above; bookings and
+        cancellations always go through the agent's confirmation step
+    """
+    return JITPlanner(
+        get_llm_model(),
+        tools={
+            "get_current_datetime": get_current_datetime,
+            "parse_date_time": parse_date_time,
+            "check_availability": check_availability,
+            "batch_check_availability": batch_check_availability,
+            "view_bookings": view_bookings,
+        }
+    )
+
 # Convenience function to create agent with dependencies
 async def chat_with_scheduler(
     message: str,
-    dependencies: SchedulingDependencies
+    dependencies: SchedulingDependencies,
+    push: Optional[Callable[[str], Awaitable[Any]]] = None
 ) -> str:
     """
     Main function to chat with the scheduling agent.
@@ -341,16 +429,54 @@ async def chat_with_scheduler(
     Args:
         message: User's message to the agent
         dependencies: Configured scheduling dependencies
+        push: Optional coroutine delivering reply text to the client; when
+            given, agent output is streamed through it sentence by sentence
     
     Returns:
         String response from the agent
     """
+    key = response_key(message, dependencies)
+    response_cache = response_cache_for(dependencies)
+    cached = response_cache.get(key) if key is not None else None
+    if cached is not None:
+        logger.info("Serving cached response for repeated message")
+        if push:
+            await push(cached)
+        return cached
+    
     try:
-        result = await scheduling_agent.run(message, deps=dependencies)
-        return result.data
+        route = classify_message(message)
+        response = None
+        # Clear lookups try a single-roundtrip JIT plan first; bookings and
+        # confirmations need the conversation history, so they go straight to the agent
+        if route == "read":
+            try:
+                response = await get_jit_planner().run(message, dependencies)
+                if push:
+                    await push(response)
+            except (PlanValidationError, UnexpectedModelBehavior, ValidationError) as e:
+                logger.info("JIT plan rejected, falling back to agent: %s", e)
+        
+        if response is None:
+            agent = get_read_agent() if route == "read" else get_scheduling_agent()
+            if push:
+                response = await stream_agent_response(agent, message, dependencies, push)
+            else:
+                result = await agent.run(message, deps=dependencies)
+                response = result.data
+        
+        if key is not None:
+            response_cache[key] = response
+        return response
     except Exception as e:
-        logger.error(f"Error in scheduling agent: {e}")
-        return f"I apologize, but I encountered an error: {str(e)}. Please try again or contact our staff for assistance."
+        logger.error("Error in scheduling agent: %s", e)
+        error_response = f"I apologize, but I encountered an error: {str(e)}. Please try again or contact our staff for assistance."
+        if push:
+            await push(error_response)
+        return error_response
+    finally:
+        # Deliver messages queued by send_message during this turn in one batch
+        await flush_outbox(dependencies)
 
 
 def chat_with_scheduler_sync(
@@ -360,6 +486,9 @@ def chat_with_scheduler_sync(
     """
     Synchronous version of chat_with_scheduler.
     
+    Runs the async flow on a persistent background event loop, so the model
+    client and pooled HTTP connections survive across calls.
+    
     Args:
         message: User's message to the agent
         dependencies: Configured scheduling dependencies
@@ -367,9 +496,4 @@ def chat_with_scheduler_sync(
     Returns:
         String response from the agent
     """
-    try:
-        result = scheduling_agent.run_sync(message, deps=dependencies)
-        return result.data
-    except Exception as e:
-        logger.error(f"Error in scheduling agent: {e}")
-        return f"I apologize, but I encountered an error: {str(e)}. Please try again or contact our staff for assistance."
\ No newline at end of file
+    return run_on_background_loop(chat_with_scheduler(message, dependencies))
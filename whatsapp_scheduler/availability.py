@@ -0,0 +1,238 @@
+"""
+Class availability lookups for the WhatsApp Scheduling Agent.
+Free slots are computed from calendar busy intervals and cached per session.
+"""
+
+import asyncio
+import logging
+import time
+from typing import List, Dict, Any, Optional, Tuple
+from datetime import datetime, timedelta
+from functools import lru_cache
+from pydantic_ai import RunContext
+
+from .dependencies import SchedulingDependencies
+from .calendar_api import get_busy_intervals
+
+logger = logging.getLogger(__name__)
+
+# Seconds a cached availability lookup stays valid within a session
+AVAILABILITY_CACHE_TTL = 60.0
+
+
+async def check_calendar_availability(
+    ctx: RunContext[SchedulingDependencies],
+    date: str,
+    time_range: Optional[Tuple[str, str]] = None,
+    instructor: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    Check calendar availability for scheduling by querying Google Calendar.
+    
+    Args:
+        date: Date to check (YYYY-MM-DD format)
+        time_range: Optional tuple of (start_time, end_time)
+        instructor: Optional specific instructor
+    
+    Returns:
+        List of available time slots
+    """
+    try:
+        logger.info("Checking calendar availability for %s with time_range: %s", date, time_range)
+        
+        # Set default time range if not provided
+        if time_range is None:
+            time_range = (f"{ctx.deps.business_hours_start:02d}:00", f"{ctx.deps.business_hours_end:02d}:00")
+        
+        # Create datetime range for the day
+        start_datetime = f"{date}T{time_range[0]}:00"
+        end_datetime = f"{date}T{time_range[1]}:00"
+        
+        # Get busy intervals from Google Calendar
+        busy_intervals = await get_busy_intervals(
+            ctx,
+            start_time=start_datetime + "Z",
+            end_time=end_datetime + "Z"
+        )
+        
+        # Generate all possible slots (hourly slots in business hours)
+        available_slots = []
+        start_hour = int(time_range[0].split(':')[0])
+        end_hour = int(time_range[1].split(':')[0])
+        
+        # Busy intervals in minutes since midnight of `date`
+        booked = [
+            (_minute_of_day(busy_start, date), _minute_of_day(busy_end, date))
+            for busy_start, busy_end in busy_intervals
+        ]
+        
+        slot_instructor = instructor or "Available Staff"
+        for slot_start in _free_slot_starts(booked, start_hour * 60, end_hour * 60, 60):
+            available_slots.append({
+                "time": f"{slot_start // 60:02d}:{slot_start % 60:02d}",
+                "instructor": slot_instructor,
+                "duration": "60 minutes",
+                "available": True,
+                "date": date
+            })
+        
+        logger.info("Found %d available slots for %s", len(available_slots), date)
+        return available_slots
+        
+    except Exception as e:
+        error_msg = f"Error checking calendar availability: {str(e)}"
+        logger.error(error_msg)
+        # Fallback to basic available slots if calendar check fails
+        return [
+            dict(slot) for slot in _fallback_slots(
+                ctx.deps.business_hours_start,
+                ctx.deps.business_hours_end,
+                instructor or "Available Staff"
+            )
+        ]
+
+
+def _minute_of_day(event_datetime: str, date: str) -> int:
+    """
+    Convert an ISO event datetime to minutes since midnight of `date`.
+    
+    Times on earlier days map before the day starts and later days after it ends.
+    """
+    event_date = event_datetime[:10]
+    if event_date < date:
+        return -1
+    if event_date > date:
+        return 24 * 60 + 1
+    return int(event_datetime[11:13]) * 60 + int(event_datetime[14:16])
+
+
+def _free_slot_starts(
+    booked: List[Tuple[int, int]],
+    day_start: int,
+    day_end: int,
+    slot_len: int
+) -> List[int]:
+    """
+    Return the start minutes of back-to-back slots in [day_start, day_end) that
+    overlap no busy interval.
+    
+    Busy intervals are half-open (start, end) minute pairs in any order. They are
+    merged once and swept with a single pointer alongside the slot starts, so the
+    cost is O(n log n + slots) instead of checking every event for every slot.
+    """
+    merged: List[List[int]] = []
+    for start, end in sorted(booked):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    
+    free = []
+    i, count = 0, len(merged)
+    for slot_start in range(day_start, day_end, slot_len):
+        while i < count and merged[i][1] <= slot_start:
+            i += 1
+        if i == count or merged[i][0] >= slot_start + slot_len:
+            free.append(slot_start)
+    return free
+
+
+@lru_cache(maxsize=64)
+def _hourly_slot_times(start_hour: int, end_hour: int, step: int = 1) -> Tuple[str, ...]:
+    """Return the "HH:00" slot start times between two business hours."""
+    return tuple(f"{hour:02d}:00" for hour in range(start_hour, end_hour, step))
+
+
+@lru_cache(maxsize=64)
+def _fallback_slots(start_hour: int, end_hour: int, instructor: str) -> Tuple[Dict[str, Any], ...]:
+    """
+    Build the fallback availability shown when the calendar cannot be reached.
+    
+    Cached per business hours and instructor; callers must copy the dicts
+    before handing them out.
+    """
+    return tuple(
+        {
+            "time": slot_time,
+            "instructor": instructor,
+            "duration": "60 minutes",
+            "available": True,
+            "note": "Calendar check failed, showing fallback availability"
+        }
+        for slot_time in _hourly_slot_times(start_hour, end_hour, 2)  # Every 2 hours as fallback
+    )
+
+
+def _availability_entry_usable(entry: Optional[Tuple[float, "asyncio.Task"]]) -> bool:
+    """Check whether a cached availability lookup can be awaited on this loop."""
+    if entry is None:
+        return False
+    expiry, task = entry
+    if expiry <= time.monotonic() or task.cancelled():
+        return False
+    # Pending lookups started on a previous (closed) event loop cannot be awaited
+    return task.done() or task.get_loop() is asyncio.get_running_loop()
+
+
+def _start_availability_lookup(
+    ctx: RunContext[SchedulingDependencies],
+    key: Tuple[str, Optional[Tuple[str, str]], Optional[str]]
+) -> "asyncio.Task":
+    """Return the cached lookup task for a key, starting a new one on miss."""
+    cache = ctx.deps.availability_cache
+    entry = cache.get(key)
+    if _availability_entry_usable(entry):
+        return entry[1]
+    
+    task = asyncio.create_task(check_calendar_availability(ctx, *key))
+    cache[key] = (time.monotonic() + AVAILABILITY_CACHE_TTL, task)
+    return task
+
+
+async def cached_check_calendar_availability(
+    ctx: RunContext[SchedulingDependencies],
+    date: str,
+    time_range: Optional[Tuple[str, str]] = None,
+    instructor: Optional[str] = None,
+    prefetch_days: int = 0
+) -> List[Dict[str, Any]]:
+    """
+    Check calendar availability through the per-session TTL cache.
+    
+    Concurrent requests for the same key share a single lookup. Optionally
+    prefetches the following days in the background so follow-up questions
+    like "any other days?" are answered from the cache.
+    
+    Args:
+        date: Date to check (YYYY-MM-DD format)
+        time_range: Optional tuple of (start_time, end_time)
+        instructor: Optional specific instructor
+        prefetch_days: Number of following days to prefetch in the background
+    
+    Returns:
+        List of available time slots
+    """
+    async with ctx.deps.availability_lock:
+        task = _start_availability_lookup(ctx, (date, time_range, instructor))
+        
+        if prefetch_days:
+            base_date = datetime.fromisoformat(date).date()
+            for offset in range(1, prefetch_days + 1):
+                next_date = (base_date + timedelta(days=offset)).isoformat()
+                _start_availability_lookup(ctx, (next_date, time_range, instructor))
+    
+    # Shield so a cancelled caller does not cancel the lookup shared via the cache
+    return list(await asyncio.shield(task))
+
+
+def invalidate_availability_cache(ctx: RunContext[SchedulingDependencies], date: str) -> None:
+    """
+    Drop cached availability for a date after its calendar changed.
+    
+    Args:
+        date: Date whose cached slots are stale (YYYY-MM-DD format)
+    """
+    cache = ctx.deps.availability_cache
+    for key in [key for key in cache if key[0] == date]:
+        del cache[key]
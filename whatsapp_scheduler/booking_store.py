@@ -0,0 +1,187 @@
+"""
+SQLite-backed booking storage for the WhatsApp Scheduling Agent.
+Bookings survive restarts and are looked up through indexes instead of scans.
+"""
+
+import asyncio
+import logging
+import weakref
+from typing import Optional, Dict, Any, List, Tuple
+import aiosqlite
+
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS bookings (
+    booking_id TEXT PRIMARY KEY,
+    client_name TEXT NOT NULL,
+    client_phone TEXT NOT NULL,
+    date TEXT NOT NULL,
+    time TEXT NOT NULL,
+    class_type TEXT NOT NULL,
+    instructor TEXT,
+    notes TEXT,
+    calendar_event_id TEXT,
+    calendar_event_link TEXT,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_bookings_phone_date ON bookings (client_phone, date);
+"""
+
+_COLUMNS = (
+    "booking_id", "client_name", "client_phone", "date", "time", "class_type",
+    "instructor", "notes", "calendar_event_id", "calendar_event_link", "created_at"
+)
+_INSERT_SQL = f"INSERT INTO bookings ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})"
+
+# One store per event loop, aiosqlite futures are bound to the loop that awaits them
+_STORES: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, BookingStore]" = weakref.WeakKeyDictionary()
+
+
+def sqlite_path(database_url: str) -> str:
+    """
+    Extract the file path from a sqlite:/// database URL.
+    
+    Args:
+        database_url: URL such as sqlite:///scheduler.db
+    
+    Returns:
+        Filesystem path of the database
+    """
+    prefix = "sqlite:///"
+    if not database_url.startswith(prefix):
+        raise ValueError(f"Unsupported database URL for the booking store: {database_url!r}")
+    return database_url[len(prefix):]
+
+
+class BookingStore:
+    """Bookings table in a WAL-mode SQLite database, opened on first use."""
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._db: Optional[aiosqlite.Connection] = None
+        self._connect_lock = asyncio.Lock()
+    
+    async def _connection(self) -> aiosqlite.Connection:
+        """Open the database and create the schema once."""
+        if self._db is not None:
+            return self._db
+        async with self._connect_lock:
+            if self._db is None:
+                db = await aiosqlite.connect(self.path)
+                db.row_factory = aiosqlite.Row
+                # WAL lets readers proceed during writes; NORMAL is durable enough with WAL
+                await db.execute("PRAGMA journal_mode=WAL")
+                await db.execute("PRAGMA synchronous=NORMAL")
+                await db.executescript(_SCHEMA)
+                await db.commit()
+                self._db = db
+                logger.info("Booking store opened at %s", self.path)
+        return self._db
+    
+    async def open(self) -> None:
+        """Open the database ahead of the first query."""
+        await self._connection()
+    
+    async def add(self, record: Dict[str, Any]) -> None:
+        """
+        Insert a booking.
+        
+        Args:
+            record: Mapping with a value for every bookings column
+        """
+        db = await self._connection()
+        await db.execute(_INSERT_SQL, tuple(record.get(column) for column in _COLUMNS))
+        await db.commit()
+    
+    async def remove(self, booking_id: str, client_phone: str) -> bool:
+        """
+        Delete a booking by id, only if it belongs to the given client.
+        
+        Returns:
+            True if a booking was deleted
+        """
+        db = await self._connection()
+        cursor = await db.execute(
+            "DELETE FROM bookings WHERE booking_id = ? AND client_phone = ?",
+            (booking_id, client_phone)
+        )
+        await db.commit()
+        return cursor.rowcount > 0
+    
+    async def remove_by_slot(self, client_phone: str, date: str, time: str) -> Optional[str]:
+        """
+        Delete a client's booking at a given date and time.
+        
+        Returns:
+            The deleted booking id, or None if there was no such booking
+        """
+        db = await self._connection()
+        async with db.execute(
+            "SELECT booking_id FROM bookings WHERE client_phone = ? AND date = ? AND time = ? LIMIT 1",
+            (client_phone, date, time)
+        ) as cursor:
+            row = await cursor.fetchone()
+        if row is None:
+            return None
+        return row["booking_id"] if await self.remove(row["booking_id"], client_phone) else None
+    
+    async def for_client(
+        self,
+        client_phone: str,
+        date_range: Optional[Tuple[str, str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        List a client's bookings ordered by date and time.
+        
+        Args:
+            client_phone: Client's phone number
+            date_range: Optional inclusive (start_date, end_date) in YYYY-MM-DD format
+        
+        Returns:
+            Booking rows as dicts
+        """
+        db = await self._connection()
+        if date_range:
+            query = "SELECT * FROM bookings WHERE client_phone = ? AND date BETWEEN ? AND ? ORDER BY date, time"
+            params: Tuple = (client_phone, *date_range)
+        else:
+            query = "SELECT * FROM bookings WHERE client_phone = ? ORDER BY date, time"
+            params = (client_phone,)
+        async with db.execute(query, params) as cursor:
+            return [dict(row) for row in await cursor.fetchall()]
+    
+    async def close(self) -> None:
+        """Close the database connection, if open."""
+        if self._db is not None:
+            await self._db.close()
+            self._db = None
+
+
+def get_booking_store() -> BookingStore:
+    """
+    Return the booking store for the running event loop.
+    
+    Only called from inside the loop, so every store is registered and
+    closed by close_booking_store.
+    
+    Returns:
+        Shared BookingStore
+    
+    Raises:
+        RuntimeError: If no event loop is running
+    """
+    loop = asyncio.get_running_loop()
+    store = _STORES.get(loop)
+    if store is None:
+        store = _STORES[loop] = BookingStore(sqlite_path(settings.database_url))
+    return store
+
+
+async def close_booking_store() -> None:
+    """Close the booking store of the running event loop, if any."""
+    store = _STORES.pop(asyncio.get_running_loop(), None)
+    if store is not None:
+        await store.close()
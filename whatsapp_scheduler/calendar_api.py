@@ -0,0 +1,252 @@
+"""
+Google Calendar API access for the WhatsApp Scheduling Agent.
+Blocking client calls run on a dedicated thread pool; busy intervals are
+served from the push-synced index or a short-lived FreeBusy cache.
+"""
+
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple, Callable, TypeVar
+from cachetools import TTLCache
+import os.path
+from pydantic_ai import RunContext
+
+from google.auth.transport.requests import Request
+from google.oauth2.credentials import Credentials
+from google_auth_oauthlib.flow import InstalledAppFlow
+from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+
+from .dependencies import SchedulingDependencies, get_timezone
+
+logger = logging.getLogger(__name__)
+
+# Google Calendar API configuration
+SCOPES = ['https://www.googleapis.com/auth/calendar']
+
+# googleapiclient is blocking, so Calendar requests run on this pool instead of the event loop
+CALENDAR_MAX_WORKERS = 4
+_CALENDAR_EXECUTOR = ThreadPoolExecutor(max_workers=CALENDAR_MAX_WORKERS, thread_name_prefix="calendar")
+# httplib2 connections are not thread-safe, so each worker keeps its own service objects
+_calendar_local = threading.local()
+
+# Credentials shared by all worker threads, keyed by token path
+_CREDENTIALS: Dict[str, Credentials] = {}
+_CREDENTIALS_LOCK = threading.Lock()
+
+_T = TypeVar("_T")
+
+# Process-wide FreeBusy results, shared by all sessions: key -> lookup task
+CALENDAR_CACHE_TTL = 30.0
+_BUSY_CACHE: TTLCache = TTLCache(maxsize=256, ttl=CALENDAR_CACHE_TTL)
+
+
+def _calendar_credentials(ctx: RunContext[SchedulingDependencies]) -> Credentials:
+    """
+    Return valid Calendar credentials for the configured token file.
+    
+    The token file is read once per process; afterwards the cached credentials
+    are only refreshed (and the token file rewritten) when they have expired.
+    """
+    token_path = ctx.deps.calendar_token_path
+    with _CREDENTIALS_LOCK:
+        creds = _CREDENTIALS.get(token_path)
+        if creds is not None and creds.valid:
+            return creds
+        
+        # Load existing token
+        if creds is None and os.path.exists(token_path):
+            creds = Credentials.from_authorized_user_file(token_path, SCOPES)
+        
+        # If there are no (valid) credentials available, let the user log in
+        if not creds or not creds.valid:
+            if creds and creds.expired and creds.refresh_token:
+                creds.refresh(Request())
+            else:
+                flow = InstalledAppFlow.from_client_secrets_file(
+                    ctx.deps.calendar_credentials_path, SCOPES)
+                creds = flow.run_local_server(port=0)
+            
+            # Save the credentials for the next run
+            with open(token_path, 'w') as token:
+                token.write(creds.to_json())
+        
+        _CREDENTIALS[token_path] = creds
+        return creds
+
+
+def get_calendar_service(ctx: RunContext[SchedulingDependencies]):
+    """Get authenticated Google Calendar service."""
+    try:
+        creds = _calendar_credentials(ctx)
+        
+        # Use the discovery document bundled with googleapiclient, no network fetch
+        service = build('calendar', 'v3', credentials=creds, static_discovery=True, cache_discovery=False)
+        return service
+        
+    except Exception as e:
+        logger.error("Error creating calendar service: %s", e)
+        raise
+
+
+def _thread_calendar_service(ctx: RunContext[SchedulingDependencies]):
+    """Return this worker thread's Calendar service, building it on first use."""
+    services = getattr(_calendar_local, 'services', None)
+    if services is None:
+        services = _calendar_local.services = {}
+    service = services.get(ctx.deps.calendar_token_path)
+    if service is None:
+        service = services[ctx.deps.calendar_token_path] = get_calendar_service(ctx)
+    return service
+
+
+async def run_calendar(
+    ctx: RunContext[SchedulingDependencies],
+    call: Callable[[Any], _T]
+) -> _T:
+    """
+    Run a blocking Calendar API call on the calendar thread pool.
+    
+    Args:
+        call: Function receiving the worker's Calendar service and returning the result
+    
+    Returns:
+        Result of `call`
+    """
+    return await asyncio.get_running_loop().run_in_executor(
+        _CALENDAR_EXECUTOR,
+        lambda: call(_thread_calendar_service(ctx))
+    )
+
+
+async def get_calendar_events(
+    start_time: str,
+    end_time: str,
+    max_results: int = 10,
+    ctx: Optional[RunContext[SchedulingDependencies]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Get calendar events from Google Calendar.
+    
+    Args:
+        start_time: Start time in ISO format
+        end_time: End time in ISO format  
+        max_results: Maximum number of events to return
+        ctx: Optional context (for testing)
+    
+    Returns:
+        List of calendar events
+    """
+    try:
+        if ctx is None:
+            from .dependencies import create_scheduling_dependencies
+            deps = create_scheduling_dependencies()
+            
+            class MockContext:
+                def __init__(self, deps):
+                    self.deps = deps
+            ctx = MockContext(deps)
+        
+        # Call the Calendar API
+        events_result = await run_calendar(ctx, lambda service: service.events().list(
+            calendarId=ctx.deps.calendar_id,
+            timeMin=start_time,
+            timeMax=end_time,
+            maxResults=max_results,
+            singleEvents=True,
+            orderBy='startTime'
+        ).execute())
+        
+        events = events_result.get('items', [])
+        
+        logger.info("Retrieved %d events from Google Calendar", len(events))
+        return events
+        
+    except HttpError as e:
+        logger.error("Google Calendar API error: %s", e)
+        raise
+    except Exception as e:
+        logger.error("Error getting calendar events: %s", e)
+        raise
+
+
+async def get_busy_intervals(
+    ctx: RunContext[SchedulingDependencies],
+    start_time: str,
+    end_time: str
+) -> List[Tuple[str, str]]:
+    """
+    Get the busy (start, end) intervals of the calendar.
+    
+    While push notifications keep the local calendar index live, intervals are
+    read from it without an API call. Otherwise the FreeBusy API is queried;
+    results are cached process-wide for CALENDAR_CACHE_TTL seconds and
+    concurrent callers for the same range share one request.
+    
+    Args:
+        start_time: Start time in ISO format
+        end_time: End time in ISO format
+    
+    Returns:
+        List of (start, end) ISO datetime pairs
+    """
+    index = ctx.deps.calendar_index
+    if index is not None and index.live:
+        return index.busy(start_time, end_time, get_timezone(ctx.deps.user_timezone))
+    
+    key = (asyncio.get_running_loop(), ctx.deps.calendar_id, start_time, end_time)
+    task = _BUSY_CACHE.get(key)
+    if task is None or (task.done() and (task.cancelled() or task.exception() is not None)):
+        task = _BUSY_CACHE[key] = asyncio.ensure_future(_fetch_busy_intervals(ctx, start_time, end_time))
+    
+    # Shield so a cancelled caller does not cancel the request shared via the cache
+    return list(await asyncio.shield(task))
+
+
+def invalidate_busy_cache(calendar_id: str, day: str) -> None:
+    """Drop cached busy intervals for a calendar day after an event was added."""
+    for key in [key for key in list(_BUSY_CACHE) if key[1] == calendar_id and key[2][:10] == day]:
+        _BUSY_CACHE.pop(key, None)
+
+
+async def _fetch_busy_intervals(
+    ctx: RunContext[SchedulingDependencies],
+    start_time: str,
+    end_time: str
+) -> List[Tuple[str, str]]:
+    """Query FreeBusy, falling back to listing full events if the query fails."""
+    try:
+        calendar_id = ctx.deps.calendar_id
+        
+        freebusy_result = await run_calendar(ctx, lambda service: service.freebusy().query(body={
+            "timeMin": start_time,
+            "timeMax": end_time,
+            "timeZone": ctx.deps.user_timezone,
+            "items": [{"id": calendar_id}]
+        }).execute())
+        
+        calendar = freebusy_result.get('calendars', {}).get(calendar_id, {})
+        if calendar.get('errors'):
+            raise RuntimeError(f"FreeBusy errors for {calendar_id}: {calendar['errors']}")
+        
+        busy = [(interval['start'], interval['end']) for interval in calendar.get('busy', [])]
+        logger.info("Retrieved %d busy intervals from Google Calendar", len(busy))
+        return busy
+        
+    except Exception as e:
+        logger.warning("FreeBusy query failed, falling back to events list: %s", e)
+        events = await get_calendar_events(
+            start_time=start_time,
+            end_time=end_time,
+            max_results=50,
+            ctx=ctx
+        )
+        busy = []
+        for event in events:
+            event_start = event.get('start', {}).get('dateTime', '')
+            event_end = event.get('end', {}).get('dateTime', '')
+            if event_start and event_end:
+                busy.append((event_start, event_end))
+        return busy
@@ -0,0 +1,93 @@
+"""
+Batched Google Calendar event inserts for the WhatsApp Scheduling Agent.
+Inserts issued in the same event loop tick share one BatchHttpRequest.
+"""
+
+import asyncio
+import logging
+from typing import List, Dict, Any, Set, Tuple
+from pydantic_ai import RunContext
+
+from .dependencies import SchedulingDependencies
+from .calendar_api import run_calendar
+
+logger = logging.getLogger(__name__)
+
+
+# Event inserts waiting for the end of the current loop tick, per (loop, token, calendar)
+_PENDING_INSERTS: Dict[Tuple, List[Tuple[Dict[str, Any], asyncio.Future]]] = {}
+# Running flush tasks; the loop only keeps weak references to tasks
+_FLUSH_TASKS: Set[asyncio.Task] = set()
+
+
+def queue_event_insert(
+    ctx: RunContext[SchedulingDependencies],
+    event_data: Dict[str, Any]
+) -> asyncio.Future:
+    """
+    Queue an event insert and return a future for the created event.
+    
+    Inserts queued during the same loop iteration (e.g. book_class calls under
+    asyncio.gather) are sent together in one BatchHttpRequest.
+    """
+    loop = asyncio.get_running_loop()
+    key = (loop, ctx.deps.calendar_token_path, ctx.deps.calendar_id)
+    pending = _PENDING_INSERTS.get(key)
+    if pending is None:
+        pending = _PENDING_INSERTS[key] = []
+        loop.call_soon(_start_event_flush, loop, ctx, key)
+    
+    future = loop.create_future()
+    pending.append((event_data, future))
+    return future
+
+
+def _start_event_flush(
+    loop: asyncio.AbstractEventLoop,
+    ctx: RunContext[SchedulingDependencies],
+    key: Tuple
+) -> None:
+    """Start the flush task for a calendar and hold a reference until it finishes."""
+    task = loop.create_task(_flush_event_inserts(ctx, key))
+    _FLUSH_TASKS.add(task)
+    task.add_done_callback(_FLUSH_TASKS.discard)
+
+
+async def _flush_event_inserts(ctx: RunContext[SchedulingDependencies], key: Tuple) -> None:
+    """Send the queued inserts for a calendar, as one batch request when there are several."""
+    items = _PENDING_INSERTS.pop(key)
+    calendar_id = ctx.deps.calendar_id
+    
+    def insert_all(service) -> List[Any]:
+        if len(items) == 1:
+            return [service.events().insert(calendarId=calendar_id, body=items[0][0]).execute()]
+        
+        results: List[Any] = [None] * len(items)
+        
+        def collect(request_id, response, exception):
+            results[int(request_id)] = exception if exception is not None else response
+        
+        batch = service.new_batch_http_request(callback=collect)
+        for index, (event_data, _) in enumerate(items):
+            batch.add(
+                service.events().insert(calendarId=calendar_id, body=event_data),
+                request_id=str(index)
+            )
+        batch.execute()
+        return results
+    
+    try:
+        results = await run_calendar(ctx, insert_all)
+    except Exception as e:
+        results = [e] * len(items)
+    
+    if len(items) > 1:
+        logger.info("Created %d calendar events in one batch request", len(items))
+    
+    for (_, future), result in zip(items, results):
+        if future.done():
+            continue
+        if isinstance(result, Exception):
+            future.set_exception(result)
+        else:
+            future.set_result(result)
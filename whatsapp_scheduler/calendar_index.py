@@ -0,0 +1,142 @@
+"""
+Local index of busy calendar intervals for the WhatsApp Scheduling Agent.
+Kept current by Google Calendar push notifications so availability checks
+are answered without a Calendar API round-trip.
+"""
+
+import asyncio
+import bisect
+import hmac
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, List, Tuple
+from zoneinfo import ZoneInfo
+
+
+def parse_instant(value: str) -> datetime:
+    """Parse an RFC 3339 timestamp, accepting a trailing Z for UTC."""
+    if value.endswith("Z"):
+        value = value[:-1] + "+00:00"
+    return datetime.fromisoformat(value)
+
+
+class CalendarIndex:
+    """Busy (start, end) intervals of one calendar, sorted by start time."""
+    
+    def __init__(self, calendar_id: str):
+        self.calendar_id = calendar_id
+        # Only consulted while a watch channel is active and the last sync succeeded
+        self.live = False
+        self.sync_token: Optional[str] = None
+        self.channel_id: Optional[str] = None
+        self.channel_token: Optional[str] = None
+        # Set by push notifications, cleared by the sync task
+        self.changed = asyncio.Event()
+        self._events: Dict[str, Tuple[datetime, datetime]] = {}
+        self._intervals: List[Tuple[datetime, datetime, str]] = []
+        self._max_duration = timedelta(0)
+    
+    def clear(self) -> None:
+        """Drop every indexed event ahead of a full resync."""
+        self.sync_token = None
+        self._events.clear()
+        self._intervals.clear()
+        self._max_duration = timedelta(0)
+    
+    def apply(self, event: Dict[str, Any]) -> None:
+        """
+        Insert, update or remove an event from a Calendar API response.
+        
+        Cancelled, transparent and all-day events are not busy time and are removed.
+        """
+        event_id = event.get("id")
+        if not event_id:
+            return
+        self._discard(event_id)
+        
+        start = event.get("start", {}).get("dateTime")
+        end = event.get("end", {}).get("dateTime")
+        if (
+            event.get("status") == "cancelled"
+            or event.get("transparency") == "transparent"
+            or not start
+            or not end
+        ):
+            return
+        
+        interval = (parse_instant(start), parse_instant(end), event_id)
+        self._events[event_id] = interval[:2]
+        bisect.insort(self._intervals, interval)
+        if interval[1] - interval[0] > self._max_duration:
+            self._max_duration = interval[1] - interval[0]
+    
+    def _discard(self, event_id: str) -> None:
+        """Remove an event from the sorted intervals, if indexed."""
+        previous = self._events.pop(event_id, None)
+        if previous is None:
+            return
+        position = bisect.bisect_left(self._intervals, (*previous, event_id))
+        if position < len(self._intervals) and self._intervals[position][2] == event_id:
+            del self._intervals[position]
+    
+    def busy(self, start_time: str, end_time: str, timezone: ZoneInfo) -> List[Tuple[str, str]]:
+        """
+        Return the busy intervals overlapping [start_time, end_time).
+        
+        Args:
+            start_time: Start time in ISO format
+            end_time: End time in ISO format
+            timezone: Timezone the returned datetimes are expressed in
+        
+        Returns:
+            List of (start, end) ISO datetime pairs, like the FreeBusy API
+        """
+        window_start = parse_instant(start_time)
+        window_end = parse_instant(end_time)
+        # No event is longer than _max_duration, so earlier starts cannot overlap
+        first = bisect.bisect_left(self._intervals, (window_start - self._max_duration,))
+        last = bisect.bisect_left(self._intervals, (window_end,))
+        return [
+            (start.astimezone(timezone).isoformat(), end.astimezone(timezone).isoformat())
+            for start, end, _ in self._intervals[first:last]
+            if end > window_start
+        ]
+    
+    def __len__(self) -> int:
+        return len(self._events)
+
+
+# Process-wide indexes keyed by calendar id
+_INDEXES: Dict[str, CalendarIndex] = {}
+
+
+def get_calendar_index(calendar_id: str) -> CalendarIndex:
+    """
+    Return the shared busy-interval index for a calendar.
+    
+    Returns:
+        CalendarIndex, created empty and not live on first use
+    """
+    index = _INDEXES.get(calendar_id)
+    if index is None:
+        index = _INDEXES[calendar_id] = CalendarIndex(calendar_id)
+    return index
+
+
+def notify_change(channel_id: str, channel_token: str) -> bool:
+    """
+    Flag the index watched by a push channel as changed.
+    
+    Args:
+        channel_id: X-Goog-Channel-ID header of the notification
+        channel_token: X-Goog-Channel-Token header of the notification
+    
+    Returns:
+        False if no index is watched by the channel or the token does not match
+    """
+    for index in _INDEXES.values():
+        if index.channel_id == channel_id and index.channel_token is not None:
+            if not hmac.compare_digest(index.channel_token, channel_token):
+                return False
+            index.changed.set()
+            return True
+    return False
@@ -0,0 +1,145 @@
+"""
+Push-notification sync of the local calendar index for the WhatsApp Scheduling Agent.
+Keeps an events.watch channel open and applies incremental events.list changes.
+"""
+
+import asyncio
+import logging
+import secrets
+import time
+import uuid
+from typing import List, Dict, Any, Optional, Tuple
+from pydantic_ai import RunContext
+
+from googleapiclient.errors import HttpError
+
+from .dependencies import SchedulingDependencies
+from .calendar_api import run_calendar
+from .calendar_index import CalendarIndex
+
+logger = logging.getLogger(__name__)
+
+# Push notification channels: requested lifetime, renewal margin and sync retry delay in seconds
+CALENDAR_WATCH_TTL = 7 * 24 * 3600
+CALENDAR_WATCH_RENEW_MARGIN = 3600.0
+CALENDAR_SYNC_RETRY_DELAY = 30.0
+
+
+async def _sync_calendar_index(
+    ctx: RunContext[SchedulingDependencies],
+    index: CalendarIndex
+) -> None:
+    """
+    Bring the local index up to date with events.list.
+    
+    Only changes since the last sync are fetched while a sync token is held;
+    without one, or when Google expired it (410 Gone), all events are reloaded.
+    """
+    calendar_id = ctx.deps.calendar_id
+    
+    def list_changes(service, sync_token: Optional[str]) -> Tuple[List[Dict[str, Any]], str]:
+        # Incremental requests may not repeat filters like timeMin, so the full sync has none either
+        params: Dict[str, Any] = {'calendarId': calendar_id, 'singleEvents': True, 'maxResults': 2500}
+        if sync_token:
+            params['syncToken'] = sync_token
+        items: List[Dict[str, Any]] = []
+        while True:
+            result = service.events().list(**params).execute()
+            items.extend(result.get('items', []))
+            params['pageToken'] = result.get('nextPageToken')
+            if not params['pageToken']:
+                return items, result.get('nextSyncToken')
+    
+    sync_token = index.sync_token
+    try:
+        items, next_token = await run_calendar(ctx, lambda service: list_changes(service, sync_token))
+    except HttpError as e:
+        if sync_token is None or e.resp.status != 410:
+            raise
+        logger.info("Calendar sync token expired, running a full sync")
+        sync_token = None
+        items, next_token = await run_calendar(ctx, lambda service: list_changes(service, None))
+    
+    if sync_token is None:
+        index.clear()
+    for event in items:
+        index.apply(event)
+    index.sync_token = next_token
+    logger.info("Synced %d calendar changes, %d busy events indexed", len(items), len(index))
+
+
+async def _watch_calendar(ctx: RunContext[SchedulingDependencies], address: str) -> Dict[str, Any]:
+    """Open a push notification channel for the calendar's events."""
+    body = {
+        'id': str(uuid.uuid4()),
+        'type': 'web_hook',
+        'address': address,
+        'token': secrets.token_urlsafe(32),
+        'params': {'ttl': str(CALENDAR_WATCH_TTL)}
+    }
+    channel = await run_calendar(ctx, lambda service: service.events().watch(
+        calendarId=ctx.deps.calendar_id,
+        body=body
+    ).execute())
+    logger.info("Watching calendar %s on channel %s", ctx.deps.calendar_id, channel.get('id'))
+    return {**channel, 'token': body['token']}
+
+
+async def _stop_calendar_watch(ctx: RunContext[SchedulingDependencies], channel: Dict[str, Any]) -> None:
+    """Close a push notification channel, logging instead of raising on failure."""
+    try:
+        await run_calendar(ctx, lambda service: service.channels().stop(body={
+            'id': channel['id'],
+            'resourceId': channel['resourceId']
+        }).execute())
+    except Exception as e:
+        logger.warning("Failed to stop calendar channel %s: %s", channel.get('id'), e)
+
+
+async def run_calendar_sync(ctx: RunContext[SchedulingDependencies], address: str) -> None:
+    """
+    Keep the calendar's local index current from push notifications until cancelled.
+    
+    Registers an events.watch channel delivering to `address`, renews it before
+    it expires and runs an incremental sync whenever a notification flags the
+    index as changed. The index only serves availability checks while the last
+    sync succeeded; otherwise lookups fall back to the FreeBusy API.
+    
+    Args:
+        address: Public HTTPS URL of the calendar notification endpoint
+    """
+    index = ctx.deps.calendar_index
+    channel: Optional[Dict[str, Any]] = None
+    renew_at = 0.0
+    try:
+        while True:
+            try:
+                if channel is None or time.time() >= renew_at:
+                    new_channel = await _watch_calendar(ctx, address)
+                    if channel is not None:
+                        await _stop_calendar_watch(ctx, channel)
+                    channel = new_channel
+                    index.channel_id, index.channel_token = channel['id'], channel['token']
+                    renew_at = int(channel['expiration']) / 1000 - CALENDAR_WATCH_RENEW_MARGIN
+                    # Changes made while no channel was open are picked up by a sync
+                    index.changed.set()
+                
+                try:
+                    await asyncio.wait_for(index.changed.wait(), timeout=max(renew_at - time.time(), 0))
+                except asyncio.TimeoutError:
+                    continue
+                index.changed.clear()
+                
+                await _sync_calendar_index(ctx, index)
+                index.live = True
+                
+            except Exception as e:
+                index.live = False
+                logger.error("Calendar index sync failed, retrying in %.0fs: %s", CALENDAR_SYNC_RETRY_DELAY, e)
+                index.changed.set()
+                await asyncio.sleep(CALENDAR_SYNC_RETRY_DELAY)
+    finally:
+        index.live = False
+        index.channel_id = index.channel_token = None
+        if channel is not None:
+            await _stop_calendar_watch(ctx, channel)
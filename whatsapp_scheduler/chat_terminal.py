@@ -5,74 +5,160 @@ Test AI provider and calendar integration without WhatsApp.
 """
 
 import asyncio
+import inspect
+import json
 import sys
 import os
-import uuid
+import time
+import secrets
+from collections import deque
+from hashlib import blake2b
+from types import SimpleNamespace
 from datetime import datetime
+from typing import Callable, Optional, Tuple
+from cachetools import TTLCache
 from dotenv import load_dotenv
 
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
 # Load environment variables
 load_dotenv()
 
-# Add current directory to Python path
-sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from .providers import get_model_info
+
+# Exchanges kept locally; the full conversation is carried by message_history
+RECENT_EXCHANGES = 3
+
+# Repeat-query cache; turns that booked, cancelled or sent a message are never cached
+RESPONSE_CACHE_SIZE = 32
+RESPONSE_CACHE_TTL = 300
+SIDE_EFFECT_TOOLS = frozenset({'make_booking', 'cancel_appointment', 'send_message'})
+
+# Carriage return plus ANSI erase-to-end-of-line
+CLEAR_LINE = "\r\x1b[K"
+
+QUIT_COMMANDS = frozenset({'/quit', '/exit', 'quit', 'exit'})
+
+# Header and help screens, written to stdout in one call each
+HEADER_TEMPLATE = """🤖 WHATSAPP SCHEDULING AGENT - TERMINAL CHAT
+==================================================
+🔧 Provider: {provider}
+🧠 Model: {model}
+📅 Calendar: {calendar}
+🆔 Session: {session}
+==================================================
+💡 Commands:
+  /help     - Show available commands
+  /calendar - Test calendar connection
+  /provider - Show provider info
+  /history  - Show chat history
+  /clear    - Clear chat history
+  /quit     - Exit chat
+==================================================
+💬 Start chatting! Try: 'I want to book an appointment tomorrow at 2pm'
+
+"""
+
+HELP_TEXT = """
+📚 HELP - What you can do:
+------------------------------
+📅 Schedule appointments:
+  • 'Book me a meeting tomorrow at 3pm'
+  • 'What times are available on Monday?'
+  • 'Cancel my appointment on Friday'
+
+📋 Check availability:
+  • 'Show my calendar for next week'
+  • 'Am I free on Tuesday morning?'
+  • 'What meetings do I have today?'
+
+⚙️  System commands:
+  • /calendar - Test Google Calendar connection
+  • /provider - Show AI provider details
+  • /history  - View conversation history
+  • /clear    - Clear conversation history
+  • /quit     - Exit the chat
+
+"""
+
+# Instructions sent with the first message of a conversation
+FIRST_TURN_INSTRUCTIONS = """INSTRUCCIONES ESPECIALES:
+- Responde en el mismo idioma que el usuario (español si escribe en español)
+- Esta es una nueva conversación
+- Saluda solo UNA VEZ al inicio
+- IMPORTANTE: Si el usuario menciona CUALQUIER fecha/hora, USA INMEDIATAMENTE la herramienta parse_date_time
+- NO pidas al usuario reformatear fechas - usa las herramientas disponibles
+- Mantén un registro mental de toda la información que el usuario proporcione"""
+
+
+def _called_side_effect_tool(messages) -> bool:
+    """Return True if any of the run's messages calls a tool with side effects."""
+    return any(
+        getattr(part, 'tool_name', None) in SIDE_EFFECT_TOOLS
+        for message in messages
+        for part in message.parts
+    )
 
-import agent
-import dependencies
-from providers import get_model_info
 
 class TerminalChat:
     """Interactive terminal chat interface for testing the agent."""
     
     def __init__(self):
-        self.session_id = str(uuid.uuid4())[:8]
+        self.session_id = secrets.token_hex(4)
         self.user_timezone = "America/Bogota"
         self.deps = None
         self.chat_history = []
-        self.conversation_messages = []  # Store full conversation for context
+        self.conversation_messages = deque(maxlen=RECENT_EXCHANGES)  # Last few exchanges
+        self._last_result = None  # Previous agent run, source of message_history
+        self._has_credentials = os.path.exists('credentials.json')
+        self._warmup = None
+        self._response_cache = TTLCache(maxsize=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL)
+        self._commands = {
+            '/help': self.print_help,
+            '/calendar': self.test_calendar_connection,
+            '/provider': self.show_provider_info,
+            '/history': self.show_history,
+            '/clear': self.clear_history,
+        }
     
     def print_header(self):
         """Print chat interface header."""
         model_info = get_model_info()
-        print("🤖 WHATSAPP SCHEDULING AGENT - TERMINAL CHAT")
-        print("=" * 50)
-        print(f"🔧 Provider: {model_info['llm_provider']}")
-        print(f"🧠 Model: {model_info['llm_model']}")
-        print(f"📅 Calendar: {'✅ Enabled' if os.path.exists('credentials.json') else '❌ Not configured'}")
-        print(f"🆔 Session: {self.session_id}")
-        print("=" * 50)
-        print("💡 Commands:")
-        print("  /help     - Show available commands")
-        print("  /calendar - Test calendar connection")
-        print("  /provider - Show provider info")
-        print("  /history  - Show chat history")
-        print("  /clear    - Clear chat history")
-        print("  /quit     - Exit chat")
-        print("=" * 50)
-        print("💬 Start chatting! Try: 'I want to book an appointment tomorrow at 2pm'")
-        print()
+        sys.stdout.write(HEADER_TEMPLATE.format(
+            provider=model_info['llm_provider'],
+            model=model_info['llm_model'],
+            calendar='✅ Enabled' if self._has_credentials else '❌ Not configured',
+            session=self.session_id
+        ))
     
     def print_help(self):
         """Print help information."""
-        print("\n📚 HELP - What you can do:")
-        print("-" * 30)
-        print("📅 Schedule appointments:")
-        print("  • 'Book me a meeting tomorrow at 3pm'")
-        print("  • 'What times are available on Monday?'")
-        print("  • 'Cancel my appointment on Friday'")
-        print()
-        print("📋 Check availability:")
-        print("  • 'Show my calendar for next week'")
-        print("  • 'Am I free on Tuesday morning?'")
-        print("  • 'What meetings do I have today?'")
-        print()
-        print("⚙️  System commands:")
-        print("  • /calendar - Test Google Calendar connection")
-        print("  • /provider - Show AI provider details")
-        print("  • /history  - View conversation history")
-        print("  • /clear    - Clear conversation history")
-        print("  • /quit     - Exit the chat")
-        print()
+        sys.stdout.write(HELP_TEXT)
+    
+    def _warm_calendar(self) -> None:
+        """Import the agent stack and refresh the calendar token ahead of the first message."""
+        try:
+            from . import agent  # noqa: F401 - pulls in tools, googleapiclient and dateparser
+            from .calendar_api import get_calendar_service
+            from .settings import settings
+            
+            # Only refresh an existing token; the interactive OAuth flow must not start here
+            if self._has_credentials and os.path.exists(settings.calendar_token_path):
+                get_calendar_service(SimpleNamespace(deps=SimpleNamespace(
+                    calendar_token_path=settings.calendar_token_path,
+                    calendar_credentials_path=settings.calendar_credentials_path
+                )))
+        except Exception:
+            pass  # Warm-up is best effort, the real call reports errors
+    
+    async def _await_warmup(self):
+        """Wait for the startup warm-up, if it is still running."""
+        if self._warmup is not None:
+            await self._warmup
+            self._warmup = None
     
     async def test_calendar_connection(self):
         """Test Google Calendar connection."""
@@ -80,12 +166,16 @@ class TerminalChat:
         print("-" * 30)
         
         try:
-            from tools import get_calendar_events
+            await self._await_warmup()
+            from .calendar_api import get_calendar_events
+            from .dependencies import get_timezone
             
             # Test calendar authentication and connection
             print("🔐 Checking calendar credentials...")
             
-            if not os.path.exists('credentials.json'):
+            # Re-check so a credentials file added mid-session is picked up
+            self._has_credentials = os.path.exists('credentials.json')
+            if not self._has_credentials:
                 print("❌ credentials.json not found")
                 print("💡 To set up Google Calendar:")
                 print("   1. Go to Google Cloud Console")
@@ -99,8 +189,9 @@ class TerminalChat:
             print("📊 Testing calendar API access...")
             from datetime import datetime, timedelta
             
-            start_time = datetime.now().isoformat() + 'Z'
-            end_time = (datetime.now() + timedelta(days=1)).isoformat() + 'Z'
+            now = datetime.now(get_timezone("UTC"))
+            start_time = now.isoformat()
+            end_time = (now + timedelta(days=1)).isoformat()
             
             events = await get_calendar_events(
                 start_time=start_time,
@@ -137,7 +228,7 @@ class TerminalChat:
             print(f"🔄 Fallback: {'✅' if model_info.get('fallback_enabled') else '❌'}")
             
             # Test model creation
-            from providers import get_llm_model
+            from .providers import get_llm_model
             model = get_llm_model()
             print(f"✅ Model created: {type(model).__name__}")
             
@@ -154,7 +245,7 @@ class TerminalChat:
             return
         
         for i, (user_msg, agent_response, timestamp) in enumerate(self.chat_history, 1):
-            print(f"\n{i}. [{timestamp}]")
+            print(f"\n{i}. [{datetime.fromtimestamp(timestamp).strftime('%H:%M:%S')}]")
             print(f"👤 You: {user_msg}")
             print(f"🤖 Agent: {agent_response}")
     
@@ -162,30 +253,65 @@ class TerminalChat:
         """Clear chat history."""
         self.chat_history.clear()
         self.conversation_messages.clear()
+        self._last_result = None
+        self._response_cache.clear()
         print("✅ Chat history cleared")
     
-    async def process_user_input(self, user_input: str) -> str:
-        """Process user input and get agent response with conversation context."""
+    async def process_user_input(
+        self,
+        user_input: str,
+        on_text: Optional[Callable[[str], None]] = None
+    ) -> str:
+        """Process user input and get agent response with conversation context.
+        
+        When on_text is given, the model's reply is streamed through it as it
+        is generated; the full reply is still returned.
+        """
         try:
+            await self._await_warmup()
+            
+            # Agent and tool modules are imported on the first message, not at startup
+            from . import agent
+            from .dependencies import create_scheduling_dependencies
+            
             # Create dependencies if not exists
             if not self.deps:
-                self.deps = dependencies.create_scheduling_dependencies(
+                self.deps = create_scheduling_dependencies(
                     session_id=self.session_id,
                     user_timezone=self.user_timezone
                 )
+                # Bookings made from the terminal belong to this terminal session
+                self.deps.conversation_context["client_phone"] = f"terminal_{self.session_id}"
             
-            # Build conversation context for better memory
-            context_message = self._build_context_message(user_input)
+            # Identical question in an identical recent context gets the same reply
+            cache_key = self._response_cache_key(user_input)
+            agent_response = self._response_cache.get(cache_key)
             
-            # Get agent response with context
-            result = await agent.scheduling_agent.run(context_message, deps=self.deps)
-            agent_response = result.output
+            if agent_response is None:
+                # Build conversation context for better memory
+                context_message = self._build_context_message(user_input)
+                
+                # Stream the agent response, continuing the previous run's message history
+                history = self._last_result.all_messages() if self._last_result else None
+                chunks = []
+                async with agent.get_scheduling_agent().run_stream(
+                    context_message, deps=self.deps, message_history=history
+                ) as result:
+                    async for chunk in result.stream_text(delta=True):
+                        chunks.append(chunk)
+                        if on_text:
+                            on_text(chunk)
+                self._last_result = result
+                agent_response = "".join(chunks)
+                
+                if not _called_side_effect_tool(result.new_messages()):
+                    self._response_cache[cache_key] = agent_response
             
             # Store this exchange for future context
             self.conversation_messages.append({
                 "user": user_input,
                 "agent": agent_response,
-                "timestamp": datetime.now().isoformat()
+                "timestamp": time.time()
             })
             
             return agent_response
@@ -193,44 +319,34 @@ class TerminalChat:
         except Exception as e:
             return f"❌ Error: {e}"
     
+    def _response_cache_key(self, user_input: str) -> Tuple[str, str]:
+        """Key a query on its normalized text and the last two exchanges."""
+        recent = [(msg["user"], msg["agent"]) for msg in list(self.conversation_messages)[-2:]]
+        context_hash = blake2b(json.dumps(recent).encode(), digest_size=8).hexdigest()
+        return " ".join(user_input.lower().split()), context_hash
+    
     def _build_context_message(self, current_input: str) -> str:
-        """Build message with conversation context."""
+        """Build the message for the current turn.
+        
+        Only the first turn carries the instruction preamble, so later turns
+        add nothing but the user's words to the cached conversation prefix.
+        """
         if not self.conversation_messages:
             # First message - add language preference
-            return f"""Usuario dice: {current_input}
-
-INSTRUCCIONES ESPECIALES:
-- Responde en el mismo idioma que el usuario (español si escribe en español)
-- Esta es una nueva conversación
-- Saluda solo UNA VEZ al inicio
-- IMPORTANTE: Si el usuario menciona CUALQUIER fecha/hora, USA INMEDIATAMENTE la herramienta parse_date_time
-- NO pidas al usuario reformatear fechas - usa las herramientas disponibles
-- Mantén un registro mental de toda la información que el usuario proporcione"""
-        
-        # Subsequent messages - include recent context
-        context_parts = ["CONTEXTO DE LA CONVERSACIÓN:"]
-        
-        # Include last 3 exchanges for context
-        recent_messages = self.conversation_messages[-3:]
-        for msg in recent_messages:
-            context_parts.append(f"Usuario: {msg['user']}")
-            context_parts.append(f"Asistente: {msg['agent']}")
-        
-        context_parts.append(f"\nNUEVO MENSAJE DEL USUARIO: {current_input}")
-        context_parts.append("\nINSTRUCCIONES IMPORTANTES:")
-        context_parts.append("- NO saludes de nuevo, ya estás en una conversación")
-        context_parts.append("- Mantén el mismo idioma de la conversación")
-        context_parts.append("- Recuerda TODA la información previa de esta conversación")
-        context_parts.append("- Si el usuario menciona fecha/hora, USA parse_date_time INMEDIATAMENTE")
-        context_parts.append("- NUNCA pidas al usuario reformatear fechas - usa las herramientas")
-        context_parts.append("- El usuario ya mencionó información importante anteriormente")
+            return f"{FIRST_TURN_INSTRUCTIONS}\n\nUsuario dice: {current_input}"
         
-        return "\n".join(context_parts)
+        # Earlier turns, including the instructions above, reach the model
+        # through message_history; persistent rules live in the system prompt
+        return current_input
     
     async def run_chat(self):
         """Run the interactive chat loop."""
         self.print_header()
         
+        # Overlap agent imports and calendar auth with the user typing; input()
+        # blocks the event loop, so this runs on a worker thread
+        self._warmup = asyncio.get_running_loop().run_in_executor(None, self._warm_calendar)
+        
         while True:
             try:
                 # Get user input
@@ -240,40 +356,43 @@ INSTRUCCIONES ESPECIALES:
                     continue
                 
                 # Handle commands
-                if user_input.lower() in ['/quit', '/exit', 'quit', 'exit']:
+                command = user_input.lower()
+                if command in QUIT_COMMANDS:
                     print("\n👋 Goodbye! Thanks for testing the agent!")
                     break
-                elif user_input.lower() == '/help':
-                    self.print_help()
-                    continue
-                elif user_input.lower() == '/calendar':
-                    await self.test_calendar_connection()
-                    continue
-                elif user_input.lower() == '/provider':
-                    self.show_provider_info()
-                    continue
-                elif user_input.lower() == '/history':
-                    self.show_history()
-                    continue
-                elif user_input.lower() == '/clear':
-                    self.clear_history()
+                handler = self._commands.get(command)
+                if handler:
+                    outcome = handler()
+                    if inspect.isawaitable(outcome):
+                        await outcome
                     continue
                 
                 # Process regular chat message
-                print("🤖 Agent: ", end="", flush=True)
-                print("🔄 Thinking...", end="", flush=True)
+                sys.stdout.write("🤖 Agent: 🔄 Thinking...")
+                sys.stdout.flush()
                 
-                response = await self.process_user_input(user_input)
+                streamed = []
                 
-                # Clear the "Thinking..." message
-                print("\r🤖 Agent: " + " " * 15, end="")
-                print(f"\r🤖 Agent: {response}")
+                def write_chunk(chunk: str) -> None:
+                    # The first chunk replaces the "Thinking..." line
+                    if not streamed:
+                        sys.stdout.write(f"{CLEAR_LINE}🤖 Agent: ")
+                    streamed.append(chunk)
+                    sys.stdout.write(chunk)
+                    sys.stdout.flush()
                 
-                # Save to history
-                timestamp = datetime.now().strftime("%H:%M:%S")
-                self.chat_history.append((user_input, response, timestamp))
+                response = await self.process_user_input(user_input, on_text=write_chunk)
                 
-                print()  # Add spacing
+                # Cached replies and errors were not streamed, print them whole
+                if not streamed:
+                    sys.stdout.write(f"{CLEAR_LINE}🤖 Agent: {response}")
+                elif "".join(streamed) != response:
+                    sys.stdout.write(f"\n{response}")
+                sys.stdout.write("\n\n")
+                sys.stdout.flush()
+                
+                # Save to history
+                self.chat_history.append((user_input, response, time.time()))
                 
             except KeyboardInterrupt:
                 print("\n\n👋 Chat interrupted. Goodbye!")
@@ -284,6 +403,12 @@ INSTRUCCIONES ESPECIALES:
             except Exception as e:
                 print(f"\n❌ Unexpected error: {e}")
                 print("💡 Try /help for available commands")
+        
+        if self.deps:
+            from .dependencies import close_http_client
+            from .booking_store import close_booking_store
+            await close_http_client()
+            await close_booking_store()
 
 def main():
     """Main function to start the chat interface."""
@@ -297,9 +422,12 @@ def main():
         print("   LLM_API_KEY=your_actual_api_key_here")
         return
     
-    # Start chat
+    # Start chat, on uvloop when it is installed
     chat = TerminalChat()
-    asyncio.run(chat.run_chat())
+    if uvloop is not None:
+        uvloop.run(chat.run_chat())
+    else:
+        asyncio.run(chat.run_chat())
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
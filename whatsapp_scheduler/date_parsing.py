@@ -0,0 +1,445 @@
+"""
+Natural language date and time parsing for the WhatsApp Scheduling Agent.
+Common Spanish and English expressions are resolved by regex fast paths;
+everything else falls back to dateparser on a dedicated thread pool.
+"""
+
+import asyncio
+import logging
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, Tuple
+from datetime import datetime, timedelta
+from functools import lru_cache
+from dateparser.date import DateDataParser
+from pydantic_ai import RunContext
+
+from .dependencies import SchedulingDependencies, get_timezone
+
+logger = logging.getLogger(__name__)
+
+# Date parsing can fall through to dateparser, which is slow and blocking, so async
+# callers run it here rather than on the event loop or the shared default executor
+PARSE_MAX_WORKERS = 4
+_PARSE_EXECUTOR = ThreadPoolExecutor(max_workers=PARSE_MAX_WORKERS, thread_name_prefix="parse")
+
+# Spanish and English weekday names, 0=Monday through 6=Sunday
+WEEKDAY_NUMBERS = {
+    'lunes': 0, 'monday': 0,
+    'martes': 1, 'tuesday': 1,
+    'miércoles': 2, 'miercoles': 2, 'wednesday': 2,
+    'jueves': 3, 'thursday': 3,
+    'viernes': 4, 'friday': 4,
+    'sábado': 5, 'sabado': 5, 'saturday': 5,
+    'domingo': 6, 'sunday': 6
+}
+
+# Fast paths tried before dateparser: ISO dates, "in N days/hours/minutes",
+# "15 de marzo" / "15 march" and numeric day/month dates
+_ISO_DATE_RE = re.compile(r'\b\d{4}-\d{2}-\d{2}\b')
+_RELATIVE_OFFSET_RE = re.compile(
+    r'\b(?:in|en|dentro de)\s+(\d{1,3})\s+(days?|d[ií]as?|hours?|horas?|minutes?|minutos?)\b'
+)
+_OFFSET_UNITS = {
+    'day': 'days', 'dia': 'days', 'día': 'days',
+    'hour': 'hours', 'hora': 'hours',
+    'minute': 'minutes', 'minuto': 'minutes',
+}
+_MONTH_NUMBERS = {
+    name: number
+    for number, names in enumerate((
+        ('enero', 'january'), ('febrero', 'february'), ('marzo', 'march'),
+        ('abril', 'april'), ('mayo', 'may'), ('junio', 'june'),
+        ('julio', 'july'), ('agosto', 'august'), ('septiembre', 'setiembre', 'september'),
+        ('octubre', 'october'), ('noviembre', 'november'), ('diciembre', 'december')
+    ), start=1)
+    for name in names
+}
+_DAY_OF_MONTH_RE = re.compile(
+    r'\b(?:el\s+)?(\d{1,2})\s+(?:de\s+|of\s+)?('
+    + '|'.join(sorted(_MONTH_NUMBERS, key=len, reverse=True))
+    + r')\b'
+)
+_NUMERIC_DATE_RE = re.compile(r'\b(\d{1,2})/(\d{1,2})(?:/(\d{4}|\d{2}))?\b')  # day/month[/year]
+# A time with no day at all ("14:00", "a las 3 pm") means today
+_BARE_TIME_RE = re.compile(r'(?:(?:a las?|at)\s+)?\d{1,2}(?::\d{2})?\s*(?:am|pm)?')
+
+# Relative day keywords mapped to a tag, or to the weekday number for day names
+_DAY_KEYWORDS: Dict[str, Any] = {
+    'pasado mañana': 'day_after', 'day after tomorrow': 'day_after',
+    'mañana': 'tomorrow', 'tomorrow': 'tomorrow',
+    'hoy': 'today', 'today': 'today',
+    'próximo': 'next', 'proximo': 'next', 'next': 'next',
+    **WEEKDAY_NUMBERS
+}
+# All keywords in one alternation, longest first, so the input is scanned once
+_DAY_KEYWORD_RE = re.compile(
+    r'\b(?:' + '|'.join(map(re.escape, sorted(_DAY_KEYWORDS, key=len, reverse=True))) + r')\b'
+)
+
+
+def _resolve_day_month(now: datetime, day: int, month: int, year: Optional[int] = None):
+    """
+    Build the date for a day and month, rolling past dates into next year.
+    
+    Returns:
+        The date, or None if the day does not exist in that month
+    """
+    try:
+        if year is not None:
+            return datetime(year, month, day).date()
+        resolved = datetime(now.year, month, day).date()
+        if resolved < now.date():
+            resolved = datetime(now.year + 1, month, day).date()
+        return resolved
+    except ValueError:
+        return None
+
+
+def _next_weekday_ordinal(base_ordinal: int, target_weekday: int) -> int:
+    """
+    Resolve "next <weekday>" as pure integer arithmetic on proleptic ordinals.
+    
+    Args:
+        base_ordinal: Ordinal of the reference date (date.toordinal())
+        target_weekday: Target weekday, 0=Monday through 6=Sunday
+    
+    Returns:
+        Ordinal of the next occurrence of target_weekday, strictly after the base date
+    """
+    # Ordinal 1 (0001-01-01) is a Monday, so weekday == (ordinal - 1) % 7
+    days_ahead = (target_weekday - (base_ordinal - 1)) % 7
+    return base_ordinal + (days_ahead or 7)
+
+
+def parse_datetime_natural(
+    ctx: RunContext[SchedulingDependencies],
+    user_input: str,
+    timezone: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Parse natural language datetime expressions with current date context and Spanish support.
+    
+    Results are cached per normalized input and timezone for the current
+    minute, so the model re-parsing the same phrase (in any casing or spacing)
+    within a conversation is a dict lookup.
+    
+    Args:
+        user_input: Natural language date/time expression
+        timezone: Optional timezone for parsing
+    
+    Returns:
+        Structured datetime information
+    """
+    # Use user timezone or default
+    tz = timezone or ctx.deps.user_timezone
+    result = dict(_parse_datetime_cached(user_input.strip().lower(), tz, int(time.time() // 60)))
+    result["original_input"] = user_input
+    return result
+
+
+async def parse_datetime_natural_async(
+    ctx: RunContext[SchedulingDependencies],
+    user_input: str,
+    timezone: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Run parse_datetime_natural on the parse thread pool.
+    
+    Args:
+        user_input: Natural language date/time expression
+        timezone: Optional timezone for parsing
+    
+    Returns:
+        Structured datetime information
+    """
+    return await asyncio.get_running_loop().run_in_executor(
+        _PARSE_EXECUTOR,
+        parse_datetime_natural, ctx, user_input, timezone
+    )
+
+
+# Time expressions as (pattern, has "a la(s)"/"at" phrase, has minutes), tried in order
+_TIME_PATTERNS = tuple(
+    (re.compile(pattern), is_phrase, has_colon)
+    for pattern, is_phrase, has_colon in (
+        (r'a la (\d{1,2})\s+(pm|am)', True, False),  # "a la 1 pm" (singular)
+        (r'a las (\d{1,2}):(\d{2})\s*(pm|am)?', True, True),  # "a las 1:30 pm" with minutes
+        (r'a las (\d{1,2})\s+(pm|am)', True, False),  # "a las 1 pm" (plural)
+        (r'at (\d{1,2})\s*(pm|am)', True, False),  # "at 1 pm"
+        (r'(\d{1,2}):(\d{2})', False, True),  # "13:30"
+        (r'(\d{1,2})\s*(pm|am)', False, False)  # "1 pm" (fallback)
+    )
+)
+
+# Spanish phrases translated before handing the input to dateparser
+_SPANISH_PHRASES = {
+    'próximo viernes': 'next friday',
+    'proximo viernes': 'next friday',
+    'el viernes que viene': 'next friday',
+    'siguiente viernes': 'next friday',
+    'próximo lunes': 'next monday',
+    'proximo lunes': 'next monday',
+    'próximo martes': 'next tuesday',
+    'proximo martes': 'next tuesday',
+    'próximo miércoles': 'next wednesday',
+    'proximo miercoles': 'next wednesday',
+    'próximo jueves': 'next thursday',
+    'proximo jueves': 'next thursday',
+    'próximo sábado': 'next saturday',
+    'proximo sabado': 'next saturday',
+    'próximo domingo': 'next sunday',
+    'proximo domingo': 'next sunday',
+    'mañana': 'tomorrow',
+    'pasado mañana': 'day after tomorrow'
+}
+# Longest phrases first so "pasado mañana" wins over "mañana"
+_SPANISH_PHRASE_RE = re.compile(
+    '|'.join(map(re.escape, sorted(_SPANISH_PHRASES, key=len, reverse=True)))
+)
+
+_SPANISH_MONTHS = {
+    'enero': 'january', 'febrero': 'february', 'marzo': 'march',
+    'abril': 'april', 'mayo': 'may', 'junio': 'june',
+    'julio': 'july', 'agosto': 'august', 'septiembre': 'september',
+    'octubre': 'october', 'noviembre': 'november', 'diciembre': 'december'
+}
+# "el 15 de marzo" -> "15 march"
+_SPANISH_DAY_OF_MONTH_RE = re.compile(r'el (\d+) de (' + '|'.join(_SPANISH_MONTHS) + ')')
+
+
+# One dateparser instance per thread and timezone, rebuilt when its relative base
+# minute changes; DateDataParser is not thread-safe and the parse pool has several workers
+_date_parser_local = threading.local()
+
+
+def _date_parser_for(tz: str, reference_minute: int, now: datetime) -> DateDataParser:
+    """
+    Return this thread's DateDataParser for a timezone, reusing it within the same minute.
+    
+    dateparser.parse() validates its settings and rebuilds the language
+    detection and parser pipeline on every call, which dominates its cost.
+    """
+    parsers: Dict[str, Tuple[int, DateDataParser]] = getattr(_date_parser_local, 'parsers', None)
+    if parsers is None:
+        parsers = _date_parser_local.parsers = {}
+    entry = parsers.get(tz)
+    if entry is not None and entry[0] == reference_minute:
+        return entry[1]
+    
+    parser = DateDataParser(
+        languages=['es', 'en'],
+        settings={
+            'TIMEZONE': tz,
+            'RETURN_AS_TIMEZONE_AWARE': True,
+            'PREFER_DAY_OF_MONTH': 'first',
+            'DATE_ORDER': 'DMY',
+            'PREFER_DATES_FROM': 'future',
+            'RELATIVE_BASE': now  # Use current date as reference
+        }
+    )
+    parsers[tz] = (reference_minute, parser)
+    return parser
+
+
+@lru_cache(maxsize=4096)
+def _parse_datetime_cached(user_input: str, tz: str, reference_minute: int) -> Dict[str, Any]:
+    """
+    Context-free parse behind parse_datetime_natural.
+    
+    Args:
+        user_input: Natural language date/time expression, stripped and lowercased
+        tz: Timezone name for parsing
+        reference_minute: Current time in whole minutes, keys this cache and the dateparser instance
+    
+    Returns:
+        Structured datetime information
+    """
+    try:
+        # Get current date for context
+        try:
+            now = datetime.now(get_timezone(tz))
+        except Exception:
+            now = datetime.now(get_timezone("UTC"))
+        
+        # Preprocess Spanish expressions with current date context
+        original_lower = user_input.lower().strip()
+        translated_input = original_lower
+        
+        # Manual parsing for common Spanish relative dates
+        current_weekday = now.weekday()  # 0=Monday, 6=Sunday
+        
+        # Try to manually calculate relative dates
+        target_date = None
+        target_hour, target_minute = 0, 0
+        
+        # Extract time if present - improved patterns to handle Spanish properly
+        time_found = None
+        for pattern, is_phrase, has_colon in _TIME_PATTERNS:
+            match = pattern.search(original_lower)
+            if match:
+                try:
+                    # Parse based on pattern type
+                    if is_phrase:
+                        # Patterns with explicit Spanish/English time phrases
+                        hour = int(match.group(1))
+                        if has_colon and len(match.groups()) >= 2 and match.group(2).isdigit():
+                            minute = int(match.group(2))
+                            ampm = match.group(3) if len(match.groups()) >= 3 else None
+                        else:
+                            minute = 0  # Default to 0 minutes for "a la 1 pm"
+                            ampm = match.group(2) if len(match.groups()) >= 2 else None
+                    elif has_colon:
+                        # Time with colon "13:30"
+                        hour = int(match.group(1))
+                        minute = int(match.group(2))
+                        ampm = match.group(3) if len(match.groups()) >= 3 else None
+                    else:
+                        # Simple hour + am/pm "1 pm"
+                        hour = int(match.group(1))
+                        minute = 0
+                        ampm = match.group(2) if len(match.groups()) >= 2 else None
+                    
+                    # Apply AM/PM conversion
+                    if ampm:
+                        if ampm.lower() == 'pm' and hour != 12:
+                            hour += 12
+                        elif ampm.lower() == 'am' and hour == 12:
+                            hour = 0
+                    
+                    target_hour, target_minute = hour, minute
+                    time_found = True
+                    break
+                except Exception as e:
+                    logger.error("Error parsing time pattern '%s': %s", pattern.pattern, e)
+                    continue
+        
+        # Parse explicit and relative day expressions manually
+        iso_match = _ISO_DATE_RE.search(original_lower)
+        offset_match = _RELATIVE_OFFSET_RE.search(original_lower)
+        day_month_match = _DAY_OF_MONTH_RE.search(original_lower)
+        numeric_match = _NUMERIC_DATE_RE.search(original_lower)
+        if iso_match:
+            target_date = datetime.fromisoformat(iso_match.group(0)).date()
+        elif offset_match:
+            # "in 3 days", "en 2 horas": an hour/minute offset also sets the time
+            amount, unit = int(offset_match.group(1)), offset_match.group(2)
+            target = now + timedelta(**{_OFFSET_UNITS[unit.rstrip('s')]: amount})
+            target_date = target.date()
+            if not time_found and _OFFSET_UNITS[unit.rstrip('s')] != 'days':
+                target_hour, target_minute = target.hour, target.minute
+        elif day_month_match:
+            target_date = _resolve_day_month(
+                now, int(day_month_match.group(1)), _MONTH_NUMBERS[day_month_match.group(2)]
+            )
+        elif numeric_match:
+            year = numeric_match.group(3)
+            if year is not None:
+                year = int(year) + 2000 if len(year) == 2 else int(year)
+            target_date = _resolve_day_month(
+                now, int(numeric_match.group(1)), int(numeric_match.group(2)), year
+            )
+        else:
+            day_hits = {_DAY_KEYWORDS[match.group(0)] for match in _DAY_KEYWORD_RE.finditer(original_lower)}
+            if 'day_after' in day_hits:
+                target_date = now.date() + timedelta(days=2)
+            elif 'tomorrow' in day_hits:
+                target_date = now.date() + timedelta(days=1)
+            elif 'today' in day_hits:
+                target_date = now.date()
+            elif 'next' in day_hits:
+                # "próximo viernes" / "next friday"; the earliest weekday wins if several are named
+                weekdays = [hit for hit in day_hits if isinstance(hit, int)]
+                if weekdays:
+                    target_date = datetime.fromordinal(_next_weekday_ordinal(now.toordinal(), min(weekdays))).date()
+            elif time_found and _BARE_TIME_RE.fullmatch(original_lower):
+                target_date = now.date()
+        
+        # If we successfully parsed manually
+        if target_date:
+            try:
+                # Combine date and time
+                target_datetime = datetime(
+                    target_date.year, target_date.month, target_date.day,
+                    target_hour, target_minute,
+                    tzinfo=get_timezone(tz)
+                )
+                
+                return {
+                    "success": True,
+                    "datetime": target_datetime.isoformat(),
+                    "date": target_date.isoformat(),
+                    "time": f"{target_hour:02d}:{target_minute:02d}",
+                    "timezone": str(target_datetime.tzinfo),
+                    "original_input": user_input,
+                    "method": "manual_parsing",
+                    "current_date_context": now.date().isoformat(),
+                    "current_weekday": current_weekday
+                }
+            except Exception as e:
+                logger.error("Error in manual parsing: %s", e)
+        
+        # Fallback to dateparser with translations, one regex pass each
+        translated_input = _SPANISH_PHRASE_RE.sub(lambda m: _SPANISH_PHRASES[m.group(0)], translated_input)
+        translated_input = _SPANISH_DAY_OF_MONTH_RE.sub(
+            lambda m: f"{m.group(1)} {_SPANISH_MONTHS[m.group(2)]}", translated_input
+        )
+        
+        # Try dateparser as fallback with better year handling
+        logger.info("Datetime fast paths missed, falling back to dateparser: %r", user_input)
+        # Without a translation both strategies are the same string; don't parse it twice
+        parsing_strategies = [translated_input] if translated_input == user_input else [translated_input, user_input]
+        
+        date_parser = _date_parser_for(tz, reference_minute, now)
+        
+        for attempt_input in parsing_strategies:
+            parsed_date = date_parser.get_date_data(attempt_input).date_obj
+            
+            # Fix year issue: if parsed date is in the past or wrong year, fix it
+            if parsed_date:
+                # If the year is less than current year, fix it
+                if parsed_date.year < now.year:
+                    parsed_date = parsed_date.replace(year=now.year)
+                    logger.info("Adjusted year from %d to %d", parsed_date.year, now.year)
+                
+                # If the date is in the past (same year but earlier date), move to next year
+                elif parsed_date.date() < now.date():
+                    parsed_date = parsed_date.replace(year=now.year + 1)
+                    logger.info("Moved date to next year: %s", parsed_date.date())
+            if parsed_date:
+                return {
+                    "success": True,
+                    "datetime": parsed_date.isoformat(),
+                    "date": parsed_date.date().isoformat(),
+                    "time": f"{parsed_date.hour:02d}:{parsed_date.minute:02d}",
+                    "timezone": str(parsed_date.tzinfo),
+                    "original_input": user_input,
+                    "method": "dateparser",
+                    "translated_input": translated_input if translated_input != user_input.lower() else None
+                }
+        
+        # If all parsing failed
+        return {
+            "success": False,
+            "error": f"Could not parse datetime: '{user_input}'. Current date context: {now.strftime('%A, %Y-%m-%d')}",
+            "original_input": user_input,
+            "current_date_context": now.date().isoformat(),
+            "current_weekday": current_weekday,
+            "suggestions": [
+                f"mañana a las 2pm (tomorrow at 2pm)",
+                f"próximo viernes a las 8pm (next friday at 8pm)",
+                f"{(now.date() + timedelta(days=1)).isoformat()} 14:00",
+                "en 2 días a las 3pm (in 2 days at 3pm)"
+            ]
+        }
+            
+    except Exception as e:
+        error_msg = f"Error parsing datetime: {str(e)}"
+        logger.error(error_msg)
+        return {
+            "success": False,
+            "error": error_msg,
+            "original_input": user_input
+        }
@@ -3,16 +3,155 @@ Dependencies for the WhatsApp Scheduling Agent.
 Following main_agent_reference patterns with simple, focused dataclasses.
 """
 
+import asyncio
 import logging
-from dataclasses import dataclass
-from typing import Optional, Dict, Any
+import sys
+import weakref
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Optional, Dict, Any, List, Tuple, MutableMapping
+from zoneinfo import ZoneInfo
 import httpx
-from settings import settings
+from cachetools import TTLCache
+from .settings import settings
+from .booking_store import BookingStore, get_booking_store
+from .calendar_index import CalendarIndex, get_calendar_index
 
 logger = logging.getLogger(__name__)
 
+# Agent response cache per event loop, keys include the session id; TTLCache
+# is not thread-safe and the webhook and sync chat loops run on separate threads
+_RESPONSE_CACHES: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, MutableMapping[str, str]]" = weakref.WeakKeyDictionary()
+RESPONSE_CACHE_SIZE = 1024
+RESPONSE_CACHE_TTL = 30
 
-@dataclass
+# Shared outbound HTTP client per event loop, connections are bound to the loop
+_HTTP_CLIENTS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+HTTP_MAX_CONNECTIONS = 100
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 20
+HTTP_CONNECT_RETRIES = 2
+# Keep idle Graph API connections for minutes, not httpx's 5 second default
+HTTP_KEEPALIVE_EXPIRY = 300.0
+HTTP_TIMEOUT = httpx.Timeout(30.0, connect=5.0)
+
+
+def _new_http_client() -> httpx.AsyncClient:
+    """Build a keep-alive HTTP/2 client with connection retries."""
+    limits = httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+    )
+    transport = httpx.AsyncHTTPTransport(
+        http2=True,
+        limits=limits,
+        retries=HTTP_CONNECT_RETRIES
+    )
+    return httpx.AsyncClient(transport=transport, timeout=HTTP_TIMEOUT)
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Return the pooled HTTP client for the running event loop.
+    
+    Every session created on the same loop reuses one client, so WhatsApp
+    API calls skip the TCP and TLS handshake after the first request.
+    
+    Returns:
+        Shared AsyncClient
+    
+    Raises:
+        RuntimeError: If no event loop is running
+    """
+    loop = asyncio.get_running_loop()
+    client = _HTTP_CLIENTS.get(loop)
+    if client is None or client.is_closed:
+        client = _HTTP_CLIENTS[loop] = _new_http_client()
+    return client
+
+
+def get_response_cache() -> MutableMapping[str, str]:
+    """
+    Return the agent response cache of the running event loop.
+    
+    Returns:
+        TTLCache only ever touched from the loop's own thread
+    """
+    loop = asyncio.get_running_loop()
+    cache = _RESPONSE_CACHES.get(loop)
+    if cache is None:
+        cache = _RESPONSE_CACHES[loop] = TTLCache(maxsize=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL)
+    return cache
+
+
+async def close_http_client() -> None:
+    """Close the pooled HTTP client of the running event loop, if any."""
+    client = _HTTP_CLIENTS.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+@lru_cache(maxsize=64)
+def get_timezone(name: str) -> ZoneInfo:
+    """Return the cached ZoneInfo for an IANA timezone name."""
+    return ZoneInfo(name)
+
+
+@lru_cache(maxsize=8)
+def _whatsapp_headers(api_key: str) -> Dict[str, str]:
+    """Build the Graph API request headers once per access token."""
+    return {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json"
+    }
+
+
+@dataclass(slots=True)
+class OutboxItem:
+    """A WhatsApp message waiting to be sent at the end of a turn."""
+    to_number: str
+    message: str
+    template_type: Optional[str]
+    status: asyncio.Future
+
+
+class Outbox:
+    """Per-session queue of outbound WhatsApp messages flushed in one batch."""
+    
+    def __init__(self):
+        self._items: List[OutboxItem] = []
+    
+    def enqueue(
+        self,
+        to_number: str,
+        message: str,
+        template_type: Optional[str] = None
+    ) -> asyncio.Future:
+        """
+        Queue a message for delivery.
+        
+        Args:
+            to_number: Phone number to send message to
+            message: Message content to send
+            template_type: Optional template type
+        
+        Returns:
+            Future resolved with the delivery status once the outbox is flushed
+        """
+        status = asyncio.get_running_loop().create_future()
+        self._items.append(OutboxItem(to_number, message, template_type, status))
+        return status
+    
+    def drain(self) -> List[OutboxItem]:
+        """Remove and return all queued messages."""
+        items, self._items = self._items, []
+        return items
+    
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+@dataclass(slots=True)
 class SchedulingDependencies:
     """Combined dependencies for WhatsApp scheduling agent."""
     
@@ -33,19 +172,88 @@ class SchedulingDependencies:
     business_hours_start: int = 9
     business_hours_end: int = 17
     
-    # HTTP Client for API calls
+    # HTTP client for API calls, the running loop's pooled client when None
     http_client: Optional[httpx.AsyncClient] = None
     
     # Rate limiting and context
     conversation_context: Optional[Dict[str, Any]] = None
     
+    # Per-session availability cache: key -> (expiry, lookup task)
+    availability_cache: Optional[Dict[Tuple, Tuple[float, asyncio.Task]]] = None
+    availability_lock: Optional[asyncio.Lock] = None
+    
+    # Agent responses for redelivered messages, the running loop's cache when None
+    response_cache: Optional[MutableMapping[str, str]] = None
+    
+    # Outbound WhatsApp messages queued during the current turn
+    outbox: Optional[Outbox] = None
+    
+    # Persistent booking storage, the running loop's shared store when None
+    booking_store: Optional[BookingStore] = None
+    
+    # Busy intervals of the calendar, kept current by push notifications when enabled
+    calendar_index: Optional[CalendarIndex] = None
+    
+    # Graph API endpoint and headers, bound once per session (treat as read-only)
+    messages_url: str = field(init=False, default="")
+    wa_headers: Dict[str, str] = field(init=False, default_factory=dict)
+    
     def __post_init__(self):
-        """Initialize HTTP client if not provided."""
-        if self.http_client is None:
-            self.http_client = httpx.AsyncClient(timeout=30.0)
+        """Initialize session caches and Graph API settings if not provided."""
+        self.messages_url = f"{self.whatsapp_base_url}/{self.whatsapp_phone_id}/messages"
+        self.wa_headers = _whatsapp_headers(self.whatsapp_api_key)
         
         if self.conversation_context is None:
             self.conversation_context = {}
+        
+        if self.availability_cache is None:
+            self.availability_cache = {}
+        
+        if self.availability_lock is None:
+            self.availability_lock = asyncio.Lock()
+        
+        if self.outbox is None:
+            self.outbox = Outbox()
+        
+        if self.calendar_index is None:
+            self.calendar_index = get_calendar_index(self.calendar_id)
+    
+    def get_http_client(self) -> httpx.AsyncClient:
+        """
+        Return the HTTP client for this session.
+        
+        Created lazily on first use inside the event loop, like the booking store.
+        
+        Returns:
+            The client given at construction, else the running loop's pooled client
+        """
+        return self.http_client if self.http_client is not None else get_http_client()
+    
+    def get_booking_store(self) -> BookingStore:
+        """
+        Return the booking store for this session.
+        
+        Resolved on each use inside the event loop, so sessions created before
+        the loop starts never hold a store that nothing closes.
+        
+        Returns:
+            The store given at construction, else the running loop's shared store
+        """
+        return self.booking_store if self.booking_store is not None else get_booking_store()
+
+
+# Settings consumed by every session, read once at import (settings are frozen)
+_SETTINGS_SNAPSHOT: Dict[str, Any] = {
+    "whatsapp_api_key": settings.whatsapp_api_key,
+    "whatsapp_phone_id": settings.whatsapp_phone_id,
+    "whatsapp_business_account_id": settings.whatsapp_business_account_id,
+    "whatsapp_base_url": settings.whatsapp_base_url,
+    "calendar_credentials_path": settings.calendar_credentials_path,
+    "calendar_token_path": settings.calendar_token_path,
+    "calendar_id": settings.calendar_id,
+    "business_hours_start": settings.business_hours_start,
+    "business_hours_end": settings.business_hours_end,
+}
 
 
 def create_scheduling_dependencies(
@@ -65,22 +273,12 @@ def create_scheduling_dependencies(
         Configured SchedulingDependencies instance
     """
     return SchedulingDependencies(
-        # WhatsApp configuration from settings
-        whatsapp_api_key=settings.whatsapp_api_key,
-        whatsapp_phone_id=settings.whatsapp_phone_id,
-        whatsapp_business_account_id=settings.whatsapp_business_account_id,
-        whatsapp_base_url=settings.whatsapp_base_url,
-        
-        # Calendar configuration from settings
-        calendar_credentials_path=settings.calendar_credentials_path,
-        calendar_token_path=settings.calendar_token_path,
-        calendar_id=settings.calendar_id,
+        # WhatsApp, calendar and business hours configuration from settings
+        **_SETTINGS_SNAPSHOT,
         
         # Application configuration
         session_id=session_id,
-        user_timezone=user_timezone,
-        business_hours_start=settings.business_hours_start,
-        business_hours_end=settings.business_hours_end,
+        user_timezone=sys.intern(user_timezone),
         
         # Optional HTTP client
         http_client=http_client,
@@ -90,7 +288,7 @@ def create_scheduling_dependencies(
     )
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class BookingInfo:
     """Information for a booking request."""
     client_name: str
@@ -102,7 +300,7 @@ class BookingInfo:
     notes: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class CalendarEvent:
     """Represents a calendar event/appointment."""
     event_id: Optional[str] = None
@@ -0,0 +1,475 @@
+"""
+JIT tool-call planner for the WhatsApp Scheduling Agent.
+
+Asks the LLM once for a small JSON plan of lookup tool calls, validates it
+against each tool's argument schema and executes it in-process, so a
+deterministic lookup costs one model roundtrip instead of one per tool call.
+Bookings and cancellations are never planned; they need the agent's
+confirmation step.
+"""
+
+import asyncio
+import inspect
+import json
+import logging
+import re
+from collections import OrderedDict
+from string import Formatter
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
+
+from pydantic import BaseModel, Field, ValidationError
+from pydantic_ai import Agent
+
+from .dependencies import SchedulingDependencies
+
+logger = logging.getLogger(__name__)
+
+
+PLAN_PROMPT = """
+You plan tool calls for a fitness studio scheduling assistant.
+Return a JSON plan that fully handles the user's message with these tools:
+
+- get_current_datetime(timezone: str | null)
+- parse_date_time(user_input: str, timezone: str | null)
+- check_availability(date: str, time_range: str | null, instructor: str | null)
+- view_bookings(client_phone: str, date_range: str | null)
+- batch_check_availability(dates: list[str], time_range: str | null, instructor: str | null)
+
+Rules:
+- Give every step a short unique id ("s1", "s2", ...).
+- An argument may reference an earlier step's result field as "$<step_id>.<field>",
+  e.g. {"date": "$s1.date", "time": "$s1.time"} after a parse_date_time step.
+- Steps that do not reference each other run concurrently; use
+  batch_check_availability instead of several check_availability steps.
+- Pass the user's own words for dates and times to parse_date_time.
+- "reply" is the final message to the user and must embed the step results it
+  answers with: a whole result as "{s2}" (lists render one item per line), or
+  a field or item as "{s1.date}", "{s1[time]}" or "{s2[0].time}".
+- Return an empty "steps" list when the message needs clarification, asks to
+  book or cancel a class, or is a free-form conversation.
+"""
+
+
+class PlanStep(BaseModel):
+    """A single tool invocation in a plan."""
+    id: str
+    tool: str
+    args: Dict[str, Any] = Field(default_factory=dict)
+
+
+class ToolPlan(BaseModel):
+    """Plan emitted by the LLM for a user message."""
+    steps: List[PlanStep] = Field(default_factory=list)
+    reply: str = ""
+
+
+class GetCurrentDatetimeArgs(BaseModel):
+    timezone: Optional[str] = None
+
+
+class ParseDateTimeArgs(BaseModel):
+    user_input: str
+    timezone: Optional[str] = None
+
+
+class CheckAvailabilityArgs(BaseModel):
+    date: str
+    time_range: Optional[str] = None
+    instructor: Optional[str] = None
+
+
+class BatchCheckAvailabilityArgs(BaseModel):
+    dates: List[str]
+    time_range: Optional[str] = None
+    instructor: Optional[str] = None
+
+
+class ViewBookingsArgs(BaseModel):
+    client_phone: str
+    date_range: Optional[str] = None
+
+
+# Argument schema for every tool the planner may dispatch to, all read-only
+TOOL_ARG_MODELS: Dict[str, Type[BaseModel]] = {
+    "get_current_datetime": GetCurrentDatetimeArgs,
+    "parse_date_time": ParseDateTimeArgs,
+    "check_availability": CheckAvailabilityArgs,
+    "batch_check_availability": BatchCheckAvailabilityArgs,
+    "view_bookings": ViewBookingsArgs,
+}
+
+# Step result reference, e.g. "$s1.date"
+_REF_RE = re.compile(r"^\$(\w+)\.(\w+)$")
+
+# Upper bound on concurrent tool calls (Google Calendar quota friendly)
+MAX_CONCURRENT_TOOL_CALLS = 10
+
+# Message parts substituted with placeholders for the plan cache key
+_SLOT_PATTERNS = (
+    ("PHONE", re.compile(r"\+?\d[\d\s-]{7,}\d")),
+    ("DATE", re.compile(r"\b\d{4}-\d{2}-\d{2}\b|\b\d{1,2}/\d{1,2}(?:/\d{2,4})?\b")),
+    ("TIME", re.compile(r"\b\d{1,2}(?::\d{2})?\s*(?:am|pm)\b|\b\d{1,2}:\d{2}\b", re.I)),
+)
+_SLOT_MARKER = "<<{}>>"
+_DIGIT_RE = re.compile(r"\d")
+_FORMAT_FIELD_RE = re.compile(r"\{\w+(?:\[\w+\]|\.\w+)*\}")
+# Reply field: a step id followed by keys or list indexes, e.g. "s2", "s1.date", "s2[0].time"
+_REPLY_FIELD_RE = re.compile(r"^(\w+)((?:\[\w+\]|\.\w+)*)$")
+_FIELD_KEY_RE = re.compile(r"\[(\w+)\]|\.(\w+)")
+
+
+class PlanValidationError(Exception):
+    """Raised when a plan does not satisfy the tool invariants."""
+
+
+def _templatize(message: str) -> Tuple[str, List[str]]:
+    """
+    Replace phones, dates and times in a message with placeholders.
+
+    Args:
+        message: Raw user message
+
+    Returns:
+        Tuple of (template key, extracted slot values in order)
+    """
+    template = " ".join(message.lower().split())
+    slots: List[str] = []
+
+    for name, pattern in _SLOT_PATTERNS:
+        def _substitute(match: "re.Match[str]", name: str = name) -> str:
+            slots.append(match.group(0))
+            return f"<{name}>"
+        template = pattern.sub(_substitute, template)
+
+    return template, slots
+
+
+def _step_field(results: Dict[str, Any], step_id: str, keys: List[str], reference: str) -> Any:
+    """
+    Look up a value inside an earlier step's result.
+
+    Args:
+        results: Step results by step id
+        step_id: Step whose result is read
+        keys: Dict keys, or list indexes as digit strings, applied in order
+        reference: Reference text for the error message
+
+    Raises:
+        PlanValidationError: If the step or any key along the path is missing
+    """
+    if step_id not in results:
+        raise PlanValidationError(f"Unresolvable reference: {reference}")
+    value = results[step_id]
+    for key in keys:
+        if isinstance(value, dict) and key in value:
+            value = value[key]
+        elif isinstance(value, list) and key.isdigit() and int(key) < len(value):
+            value = value[int(key)]
+        else:
+            raise PlanValidationError(f"Unresolvable reference: {reference}")
+    return value
+
+
+def _render_value(value: Any) -> str:
+    """
+    Render a step result as WhatsApp text.
+
+    Lists become one line per item and dicts of lists (batch results keyed by
+    date) one section per key; None and boolean flags are left out of items.
+    """
+    if isinstance(value, list):
+        if not value:
+            return "-"
+        return "\n".join(f"- {_render_item(item)}" for item in value)
+    if isinstance(value, dict) and any(isinstance(item, list) for item in value.values()):
+        return "\n\n".join(f"{key}:\n{_render_value(item)}" for key, item in value.items())
+    if isinstance(value, dict):
+        return _render_item(value)
+    return str(value)
+
+
+def _render_item(item: Any) -> str:
+    """Render one list item, a dict as "key: value" pairs."""
+    if isinstance(item, dict):
+        return ", ".join(
+            f"{key}: {value}" for key, value in item.items()
+            if value is not None and not isinstance(value, bool)
+        )
+    return str(item)
+
+
+def _render_reply(reply: str, results: Dict[str, Any]) -> str:
+    """
+    Fill a reply's step result fields.
+
+    Uses the same lookup as "$step.field" arguments instead of str.format_map,
+    so keys and list indexes resolve against dict and list results, and whole
+    structured results render as readable lines instead of a Python repr.
+
+    Raises:
+        PlanValidationError: If a field does not resolve to a step result
+    """
+    parts: List[str] = []
+    for literal, field_name, format_spec, _ in Formatter().parse(reply):
+        parts.append(literal)
+        if field_name is None:
+            continue
+        field = _REPLY_FIELD_RE.match(field_name)
+        if field is None:
+            raise PlanValidationError(f"Unsupported reply field: {field_name}")
+        keys = [index or key for index, key in _FIELD_KEY_RE.findall(field.group(2))]
+        value = _step_field(results, field.group(1), keys, field_name)
+        if isinstance(value, (list, dict)):
+            value = _render_value(value)
+        parts.append(format(value, format_spec or ""))
+    return "".join(parts)
+
+
+def _failed(result: Any) -> bool:
+    """Check whether a tool result reports an error."""
+    if isinstance(result, list):
+        return bool(result) and isinstance(result[0], dict) and "error" in result[0]
+    if isinstance(result, dict):
+        return result.get("success") is False or "error" in result
+    return False
+
+
+def _schedule(plan: ToolPlan) -> List[List[PlanStep]]:
+    """
+    Group plan steps into waves that can run concurrently.
+
+    A step joins the first wave after every step it references via
+    "$step.field" arguments.
+
+    Args:
+        plan: Validated tool plan
+
+    Returns:
+        Ordered list of waves of independent steps
+    """
+    level: Dict[str, int] = {}
+    waves: List[List[PlanStep]] = []
+
+    for step in plan.steps:
+        depends_on = [
+            ref.group(1)
+            for ref in (
+                _REF_RE.match(value) for value in step.args.values() if isinstance(value, str)
+            )
+            if ref
+        ]
+        level[step.id] = max((level[dep] + 1 for dep in depends_on), default=0)
+        if level[step.id] == len(waves):
+            waves.append([])
+        waves[level[step.id]].append(step)
+
+    return waves
+
+
+def _is_parametric(plan: ToolPlan) -> bool:
+    """Check that every literal digit in a templated plan came from a slot."""
+    for step in plan.steps:
+        for value in step.args.values():
+            if isinstance(value, str) and not _REF_RE.match(value):
+                if _DIGIT_RE.search(re.sub(r"<<\d+>>", "", value)):
+                    return False
+    reply = _FORMAT_FIELD_RE.sub("", re.sub(r"<<\d+>>", "", plan.reply))
+    return not _DIGIT_RE.search(reply)
+
+
+class JITPlanner:
+    """Compile a user message into a validated tool plan and run it locally."""
+
+    def __init__(
+        self,
+        model: Any,
+        tools: Dict[str, Callable[..., Any]],
+        cache_size: int = 256
+    ):
+        """
+        Initialize the planner.
+
+        Args:
+            model: LLM model used to emit plans
+            tools: Mapping of tool name to the callable taking (ctx, **args)
+            cache_size: Maximum number of cached plan templates
+        """
+        self.tools = tools
+        self.cache_size = cache_size
+        self._plan_cache: "OrderedDict[str, str]" = OrderedDict()
+        self._plan_agent = Agent(
+            model,
+            result_type=ToolPlan,
+            system_prompt=PLAN_PROMPT
+        )
+
+    def validate(self, plan: ToolPlan) -> None:
+        """
+        Validate a plan against the tool schemas.
+
+        Args:
+            plan: Plan to validate
+
+        Raises:
+            PlanValidationError: If the plan is empty or violates an invariant
+        """
+        if not plan.steps:
+            raise PlanValidationError("Planner returned no steps")
+
+        seen: set = set()
+        for step in plan.steps:
+            if step.id in seen:
+                raise PlanValidationError(f"Duplicate step id: {step.id}")
+            if step.tool not in self.tools or step.tool not in TOOL_ARG_MODELS:
+                raise PlanValidationError(f"Unknown tool: {step.tool}")
+
+            for value in step.args.values():
+                ref = _REF_RE.match(value) if isinstance(value, str) else None
+                if ref and ref.group(1) not in seen:
+                    raise PlanValidationError(
+                        f"Step {step.id} references unknown step {ref.group(1)}"
+                    )
+
+            try:
+                TOOL_ARG_MODELS[step.tool].model_validate(step.args)
+            except ValidationError as e:
+                raise PlanValidationError(f"Invalid args for {step.tool}: {e}") from e
+
+            seen.add(step.id)
+
+        try:
+            reply_fields = [name for _, name, _, _ in Formatter().parse(plan.reply) if name is not None]
+        except ValueError as e:
+            raise PlanValidationError(f"Malformed reply: {e}") from e
+        if not reply_fields:
+            # A fixed reply would drop everything the steps fetched
+            raise PlanValidationError("Reply does not use any step result")
+        for field_name in reply_fields:
+            field = _REPLY_FIELD_RE.match(field_name)
+            if field is None:
+                raise PlanValidationError(f"Unsupported reply field: {field_name}")
+            if field.group(1) not in seen:
+                raise PlanValidationError(f"Reply references unknown field: {field_name}")
+
+    async def compile(self, message: str) -> ToolPlan:
+        """
+        Get a plan for a message, reusing a cached plan for the same template.
+
+        Args:
+            message: User's message
+
+        Returns:
+            Validated tool plan
+        """
+        template, slots = _templatize(message)
+
+        cached = self._plan_cache.get(template)
+        if cached is not None:
+            self._plan_cache.move_to_end(template)
+            for index, value in enumerate(slots):
+                cached = cached.replace(_SLOT_MARKER.format(index), json.dumps(value)[1:-1])
+            plan = ToolPlan.model_validate_json(cached)
+            self.validate(plan)
+            return plan
+
+        result = await self._plan_agent.run(message)
+        plan = result.data
+        self.validate(plan)
+        self._remember(template, slots, plan)
+        return plan
+
+    def _remember(self, template: str, slots: List[str], plan: ToolPlan) -> None:
+        """Store a plan with its slot values replaced by markers."""
+        serialized = plan.model_dump_json()
+        for index, value in enumerate(slots):
+            serialized = serialized.replace(
+                json.dumps(value)[1:-1], _SLOT_MARKER.format(index)
+            )
+
+        if not _is_parametric(ToolPlan.model_validate_json(serialized)):
+            # Values were derived from the message (e.g. "3pm" -> "15:00"),
+            # replaying this plan for another message would be wrong
+            return
+
+        self._plan_cache[template] = serialized
+        if len(self._plan_cache) > self.cache_size:
+            self._plan_cache.popitem(last=False)
+
+    def _resolve(self, args: Dict[str, Any], results: Dict[str, Any]) -> Dict[str, Any]:
+        """Replace "$step.field" references with earlier step results."""
+        resolved = {}
+        for name, value in args.items():
+            ref = _REF_RE.match(value) if isinstance(value, str) else None
+            if ref:
+                value = _step_field(results, ref.group(1), [ref.group(2)], value)
+            resolved[name] = value
+        return resolved
+
+    async def _call(self, ctx: Any, step: PlanStep, results: Dict[str, Any]) -> Any:
+        """Dispatch a single plan step to its tool."""
+        args = self._resolve(step.args, results)
+        result = self.tools[step.tool](ctx, **args)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
+
+    async def execute(self, plan: ToolPlan, dependencies: SchedulingDependencies) -> str:
+        """
+        Execute a validated plan without further LLM turns.
+
+        Args:
+            plan: Validated tool plan
+            dependencies: Scheduling dependencies passed to each tool
+
+        Returns:
+            Final reply with step results filled in
+        """
+        ctx = SimpleNamespace(deps=dependencies)
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_TOOL_CALLS)
+        results: Dict[str, Any] = {}
+
+        async def _bounded(step: PlanStep) -> Any:
+            async with semaphore:
+                return await self._call(ctx, step, results)
+
+        # Steps without pending dependencies run together in one gather window
+        for wave in _schedule(plan):
+            wave_results = await asyncio.gather(
+                *(_bounded(step) for step in wave),
+                return_exceptions=True
+            )
+
+            failed = None
+            for step, result in zip(wave, wave_results):
+                if isinstance(result, BaseException) or _failed(result):
+                    failed = failed or step
+                    continue
+                results[step.id] = result
+
+            if failed is not None:
+                # Lookups have no side effects, the agent can safely redo them
+                raise PlanValidationError(f"Step {failed.id} ({failed.tool}) failed")
+
+        try:
+            return _render_reply(plan.reply, results)
+        except (TypeError, ValueError) as e:
+            raise PlanValidationError(f"Could not render reply: {e}") from e
+
+    async def run(self, message: str, dependencies: SchedulingDependencies) -> str:
+        """
+        Compile and execute a plan for a message.
+
+        Args:
+            message: User's message
+            dependencies: Scheduling dependencies
+
+        Returns:
+            Final reply for the user
+
+        Raises:
+            PlanValidationError: If no valid plan could be produced or executed
+        """
+        plan = await self.compile(message)
+        logger.info("Executing JIT plan with %d steps", len(plan.steps))
+        return await self.execute(plan, dependencies)
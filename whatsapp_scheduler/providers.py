@@ -3,21 +3,58 @@ Flexible provider configuration for LLM models with fallback support.
 Based on examples/main_agent_reference/providers.py pattern.
 """
 
-from typing import Optional, Union
-from pydantic_ai.providers.openai import OpenAIProvider
-from pydantic_ai.providers.anthropic import AnthropicProvider
-from pydantic_ai.providers.google_gla import GoogleGLAProvider
-from pydantic_ai.models.openai import OpenAIModel
-from pydantic_ai.models.anthropic import AnthropicModel
-from pydantic_ai.models.gemini import GeminiModel
-from pydantic_ai.models.fallback import FallbackModel
-from settings import settings
-
-
-def get_llm_model(model_choice: Optional[str] = None) -> Union[OpenAIModel, AnthropicModel, GeminiModel, FallbackModel]:
+from functools import lru_cache
+from typing import TYPE_CHECKING, Optional, Union
+from .settings import settings
+
+# Provider SDKs are imported by the builder that uses them, only one is loaded per process
+if TYPE_CHECKING:
+    from pydantic_ai.models.openai import OpenAIModel
+    from pydantic_ai.models.anthropic import AnthropicModel
+    from pydantic_ai.models.gemini import GeminiModel
+    from pydantic_ai.models.fallback import FallbackModel
+
+
+def _build_gemini(model_name: str, api_key: str) -> "GeminiModel":
+    """Create a Gemini model."""
+    from pydantic_ai.providers.google_gla import GoogleGLAProvider
+    from pydantic_ai.models.gemini import GeminiModel
+    return GeminiModel(model_name, provider=GoogleGLAProvider(api_key=api_key))
+
+
+def _build_anthropic(model_name: str, api_key: str) -> "AnthropicModel":
+    """Create an Anthropic model."""
+    from pydantic_ai.providers.anthropic import AnthropicProvider
+    from pydantic_ai.models.anthropic import AnthropicModel
+    return AnthropicModel(model_name, provider=AnthropicProvider(api_key=api_key))
+
+
+def _build_openai(model_name: str, api_key: str) -> "OpenAIModel":
+    """Create an OpenAI-compatible model using the configured base URL."""
+    from pydantic_ai.providers.openai import OpenAIProvider
+    from pydantic_ai.models.openai import OpenAIModel
+    return OpenAIModel(
+        model_name,
+        provider=OpenAIProvider(base_url=settings.llm_base_url, api_key=api_key)
+    )
+
+
+# Model builder per LLM_PROVIDER value; unknown providers use the OpenAI-compatible builder
+_PROVIDER_BUILDERS = {
+    "gemini": _build_gemini,
+    "anthropic": _build_anthropic,
+    "openai": _build_openai,
+}
+
+
+@lru_cache(maxsize=4)
+def get_llm_model(model_choice: Optional[str] = None) -> Union["OpenAIModel", "AnthropicModel", "GeminiModel", "FallbackModel"]:
     """
     Get LLM model configuration based on environment variables with fallback support.
     
+    Models are cached per model_choice; call get_llm_model.cache_clear() after
+    changing settings.
+    
     Args:
         model_choice: Optional override for model choice
     
@@ -27,40 +64,22 @@ def get_llm_model(model_choice: Optional[str] = None) -> Union[OpenAIModel, Anth
     llm_choice = model_choice or settings.llm_model
     
     try:
-        # Determine provider based on settings
-        if settings.llm_provider.lower() == "gemini":
-            # Primary model: Gemini
-            gemini_provider = GoogleGLAProvider(api_key=settings.llm_api_key)
-            primary_model = GeminiModel(llm_choice, provider=gemini_provider)
-        elif settings.llm_provider.lower() == "anthropic":
-            # Primary model: Anthropic
-            anthropic_provider = AnthropicProvider(api_key=settings.llm_api_key)
-            primary_model = AnthropicModel(llm_choice, provider=anthropic_provider)
-        else:
-            # Primary model: OpenAI (default)
-            openai_provider = OpenAIProvider(
-                base_url=settings.llm_base_url,
-                api_key=settings.llm_api_key
-            )
-            primary_model = OpenAIModel(llm_choice, provider=openai_provider)
+        # Primary model from the configured provider, OpenAI-compatible by default
+        build_primary = _PROVIDER_BUILDERS.get(settings.llm_provider.lower(), _build_openai)
+        primary_model = build_primary(llm_choice, settings.llm_api_key)
         
         # Fallback models if available
         fallback_models = []
         
-        # Try to add other providers as fallback if available
-        try:
-            # Check if Anthropic API key is available and not the primary
-            anthropic_key = getattr(settings, 'anthropic_api_key', None)
-            if anthropic_key and settings.llm_provider.lower() != "anthropic":
-                anthropic_provider = AnthropicProvider(api_key=anthropic_key)
-                fallback_models.append(
-                    AnthropicModel('claude-3-5-haiku-20241022', provider=anthropic_provider)
-                )
-        except Exception:
-            pass  # Anthropic not available, continue without it
+        # Add Anthropic as fallback if a key is configured and it is not the primary
+        if settings.anthropic_api_key and build_primary is not _build_anthropic:
+            fallback_models.append(
+                _build_anthropic('claude-3-5-haiku-20241022', settings.anthropic_api_key)
+            )
         
         # Return fallback model if we have alternatives
         if fallback_models:
+            from pydantic_ai.models.fallback import FallbackModel
             return FallbackModel([primary_model] + fallback_models)
         else:
             return primary_model
@@ -68,6 +87,8 @@ def get_llm_model(model_choice: Optional[str] = None) -> Union[OpenAIModel, Anth
     except Exception as e:
         # For testing without proper API keys, return a basic model
         if settings.app_env == "testing":
+            from pydantic_ai.providers.openai import OpenAIProvider
+            from pydantic_ai.models.openai import OpenAIModel
             provider = OpenAIProvider(
                 base_url=settings.llm_base_url or "https://api.openai.com/v1",
                 api_key="test-key"
@@ -77,6 +98,7 @@ def get_llm_model(model_choice: Optional[str] = None) -> Union[OpenAIModel, Anth
             raise ValueError(f"Failed to configure LLM model: {e}")
 
 
+@lru_cache(maxsize=1)
 def get_model_info() -> dict:
     """
     Get information about current model configuration.
@@ -0,0 +1,86 @@
+"""
+Response caching and streaming helpers for the WhatsApp Scheduling Agent.
+"""
+
+import re
+from hashlib import blake2b
+from typing import List, Any, Optional, Callable, Awaitable, MutableMapping
+
+from pydantic_ai import Agent
+
+from .dependencies import SchedulingDependencies, get_response_cache
+
+# Streamed replies are pushed to the client in segments of at least this size
+STREAM_MIN_SEGMENT_CHARS = 80
+_SENTENCE_END_RE = re.compile(r'[.!?]\s+|\n+')
+
+
+def response_key(message: str, dependencies: SchedulingDependencies) -> Optional[str]:
+    """
+    Build the response cache key for a message.
+    
+    The WhatsApp message id is part of the key, so a webhook redelivery hits
+    the cache while a client genuinely repeating themselves does not.
+    
+    Returns:
+        Cache key, or None when the turn has no message id and must not be cached
+    """
+    turn_id = dependencies.conversation_context.get("message_id")
+    if not turn_id:
+        return None
+    raw = f"{dependencies.session_id}:{turn_id}:{message}".encode()
+    return blake2b(raw, digest_size=16).hexdigest()
+
+
+def response_cache_for(dependencies: SchedulingDependencies) -> MutableMapping[str, str]:
+    """Return the session's response cache override, or the running loop's shared cache."""
+    if dependencies.response_cache is not None:
+        return dependencies.response_cache
+    return get_response_cache()
+
+
+class SentenceBuffer:
+    """Accumulate streamed text and release it at sentence boundaries."""
+    
+    def __init__(self, min_length: int = STREAM_MIN_SEGMENT_CHARS):
+        self.min_length = min_length
+        self._pending = ""
+    
+    def feed(self, chunk: str) -> Optional[str]:
+        """Add a text delta, returning a segment once enough full sentences are buffered."""
+        self._pending += chunk
+        boundary = None
+        for match in _SENTENCE_END_RE.finditer(self._pending):
+            boundary = match.end()
+        if boundary is None or boundary < self.min_length:
+            return None
+        segment, self._pending = self._pending[:boundary], self._pending[boundary:]
+        return segment.strip() or None
+    
+    def flush(self) -> Optional[str]:
+        """Return whatever text is still buffered."""
+        segment, self._pending = self._pending.strip(), ""
+        return segment or None
+
+
+async def stream_agent_response(
+    agent: Agent,
+    message: str,
+    dependencies: SchedulingDependencies,
+    push: Callable[[str], Awaitable[Any]]
+) -> str:
+    """Run the agent in streaming mode, pushing sentence-sized segments as they arrive."""
+    buffer = SentenceBuffer()
+    chunks: List[str] = []
+    
+    async with agent.run_stream(message, deps=dependencies) as result:
+        async for chunk in result.stream_text(delta=True):
+            chunks.append(chunk)
+            segment = buffer.feed(chunk)
+            if segment:
+                await push(segment)
+    
+    tail = buffer.flush()
+    if tail:
+        await push(tail)
+    return "".join(chunks)
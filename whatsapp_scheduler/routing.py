@@ -0,0 +1,30 @@
+"""
+Message routing for the WhatsApp Scheduling Agent.
+Sends clear lookups to the read-only path and everything else to the full agent.
+"""
+
+import re
+from typing import Literal
+
+# Keyword routing between the read-only and the full scheduling agent
+_VIEW_BOOKINGS_RE = re.compile(r'\b(?:mis|my)\s+(?:reservas?|citas?|clases|bookings?|classes|appointments?)\b')
+_WRITE_RE = re.compile(
+    r'\b(?:reserv|agend|apart|book|cancel|anul|resched|reprogram|cambi|change|mov|confirm|env[ií]a|send|mensaje|message)'
+)
+_READ_RE = re.compile(
+    r'\b(?:disponib|availab|libre|free|horario|hours|abiert|open|qu[eé] clases|which classes|what classes|cu[aá]ndo|when)'
+    r'|' + _VIEW_BOOKINGS_RE.pattern
+)
+
+
+def classify_message(message: str) -> Literal["read", "write"]:
+    """
+    Route a message to the read-only or the full scheduling agent.
+    
+    Only clear lookups go to the read-only agent; anything ambiguous, such as
+    a bare "sí" confirming a booking, keeps access to the mutating tools.
+    """
+    text = message.lower()
+    if _READ_RE.search(text) and not _WRITE_RE.search(_VIEW_BOOKINGS_RE.sub(" ", text)):
+        return "read"
+    return "write"
@@ -19,7 +19,8 @@ class Settings(BaseSettings):
     model_config = ConfigDict(
         env_file=".env",
         env_file_encoding="utf-8",
-        case_sensitive=False
+        case_sensitive=False,
+        frozen=True
     )
     
     # LLM Configuration
@@ -27,12 +28,14 @@ class Settings(BaseSettings):
     llm_api_key: str = Field(...)
     llm_model: str = Field(default="gpt-4o-mini")
     llm_base_url: Optional[str] = Field(default="https://api.openai.com/v1")
+    anthropic_api_key: Optional[str] = Field(default=None)  # Enables Anthropic fallback
     
     # WhatsApp Business API Configuration
     whatsapp_api_key: str = Field(...)
     whatsapp_phone_id: str = Field(...)
     whatsapp_business_account_id: str = Field(...)
     whatsapp_webhook_token: str = Field(...)
+    whatsapp_app_secret: Optional[str] = Field(default=None)  # Enables X-Hub-Signature-256 checks
     whatsapp_base_url: str = Field(
         default="https://graph.facebook.com/v18.0"
     )
@@ -42,6 +45,7 @@ class Settings(BaseSettings):
     calendar_credentials_path: str = Field(default="credentials.json")
     calendar_token_path: str = Field(default="token.json")
     calendar_id: str = Field(default="primary")
+    calendar_webhook_url: Optional[str] = Field(default=None)  # Enables push-synced availability
     
     # Database Configuration
     database_url: str = Field(default="sqlite:///scheduler.db")
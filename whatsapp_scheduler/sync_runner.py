@@ -0,0 +1,75 @@
+"""
+Background event loop for the WhatsApp Scheduling Agent's synchronous entry point.
+Keeps one loop alive across calls so model clients and pooled connections are reused.
+"""
+
+import asyncio
+import atexit
+import logging
+import threading
+from typing import Any, Coroutine, Optional, TypeVar
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+from .dependencies import close_http_client
+from .booking_store import close_booking_store
+
+logger = logging.getLogger(__name__)
+
+_T = TypeVar("_T")
+
+# Persistent event loop used by chat_with_scheduler_sync
+_BACKGROUND_LOOP: Optional[asyncio.AbstractEventLoop] = None
+_BACKGROUND_LOOP_LOCK = threading.Lock()
+# Seconds allowed at interpreter exit to close the background loop's pooled resources
+BACKGROUND_SHUTDOWN_TIMEOUT = 5.0
+
+
+def _get_background_loop() -> asyncio.AbstractEventLoop:
+    """Return the event loop thread backing chat_with_scheduler_sync, starting it once."""
+    global _BACKGROUND_LOOP
+    with _BACKGROUND_LOOP_LOCK:
+        if _BACKGROUND_LOOP is None:
+            # uvloop when installed; the package never changes the process-wide loop policy
+            _BACKGROUND_LOOP = uvloop.new_event_loop() if uvloop is not None else asyncio.new_event_loop()
+            threading.Thread(
+                target=_BACKGROUND_LOOP.run_forever,
+                name="scheduler-event-loop",
+                daemon=True
+            ).start()
+            atexit.register(_close_background_loop)
+    return _BACKGROUND_LOOP
+
+
+async def _release_loop_resources() -> None:
+    """Close the pooled resources registered for the running loop."""
+    await close_http_client()
+    # Closing the last connection checkpoints the WAL into the database file
+    await close_booking_store()
+
+
+def _close_background_loop() -> None:
+    """Release the background loop's HTTP connections and booking store at interpreter exit."""
+    loop = _BACKGROUND_LOOP
+    if loop is None or loop.is_closed():
+        return
+    try:
+        asyncio.run_coroutine_threadsafe(_release_loop_resources(), loop).result(BACKGROUND_SHUTDOWN_TIMEOUT)
+    except Exception as e:
+        logger.warning("Failed to close background loop resources: %s", e)
+
+
+def run_on_background_loop(coro: Coroutine[Any, Any, _T]) -> _T:
+    """
+    Run a coroutine on the background loop and wait for its result.
+    
+    Args:
+        coro: Coroutine to run
+    
+    Returns:
+        The coroutine's result
+    """
+    return asyncio.run_coroutine_threadsafe(coro, _get_background_loop()).result()
@@ -0,0 +1,46 @@
+"""
+Shared fixtures for the WhatsApp Scheduling Agent test suite.
+
+Settings are read once at import, so placeholder credentials are set here,
+before any whatsapp_scheduler module is imported by the tests.
+"""
+
+import os
+
+for _name in (
+    "LLM_API_KEY",
+    "WHATSAPP_API_KEY",
+    "WHATSAPP_PHONE_ID",
+    "WHATSAPP_BUSINESS_ACCOUNT_ID",
+    "WHATSAPP_WEBHOOK_TOKEN",
+):
+    os.environ.setdefault(_name, f"test-{_name.lower()}")
+
+from types import SimpleNamespace
+
+import pytest
+
+from whatsapp_scheduler.booking_store import BookingStore
+from whatsapp_scheduler.dependencies import create_scheduling_dependencies
+
+
+@pytest.fixture
+async def booking_store(tmp_path):
+    """Booking store on a throwaway SQLite database."""
+    store = BookingStore(str(tmp_path / "bookings.db"))
+    yield store
+    await store.close()
+
+
+@pytest.fixture
+def deps(booking_store):
+    """Scheduling dependencies bound to the temporary booking store."""
+    dependencies = create_scheduling_dependencies(session_id="test_session", user_timezone="America/Bogota")
+    dependencies.booking_store = booking_store
+    return dependencies
+
+
+@pytest.fixture
+def ctx(deps):
+    """Minimal stand-in for RunContext; the tools only read ctx.deps."""
+    return SimpleNamespace(deps=deps)
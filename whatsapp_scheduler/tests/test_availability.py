@@ -0,0 +1,76 @@
+"""
+Table tests for the free-slot sweep behind check_calendar_availability.
+
+Minutes are since midnight; business hours 09:00-17:00 are 540-1020.
+"""
+
+import pytest
+
+from whatsapp_scheduler.availability import _free_slot_starts, _minute_of_day
+
+DATE = "2030-03-04"
+DAY_START, DAY_END = 9 * 60, 17 * 60
+ALL_DAY = list(range(DAY_START, DAY_END, 60))
+
+
+def _hours(*hours):
+    """Slot starts in minutes for the given hours."""
+    return [hour * 60 for hour in hours]
+
+
+@pytest.mark.parametrize("event_datetime, expected", [
+    (f"{DATE}T00:00:00-05:00", 0),
+    (f"{DATE}T09:30:00-05:00", 570),
+    (f"{DATE}T23:59:00-05:00", 1439),
+    ("2030-03-03T22:00:00-05:00", -1),
+    ("2030-03-05T02:00:00-05:00", 24 * 60 + 1),
+    ("2030-12-31T23:00:00-05:00", 24 * 60 + 1),
+])
+def test_minute_of_day(event_datetime, expected):
+    """Same-day times map to minutes; other days fall before or after the day."""
+    assert _minute_of_day(event_datetime, DATE) == expected
+
+
+@pytest.mark.parametrize("booked, expected", [
+    ([], ALL_DAY),
+    # A single hour-aligned event
+    ([(600, 660)], _hours(9, 11, 12, 13, 14, 15, 16)),
+    # An event inside one slot blocks only that slot
+    ([(615, 630)], _hours(9, 11, 12, 13, 14, 15, 16)),
+    # An event straddling a slot boundary blocks both slots
+    ([(630, 690)], _hours(9, 12, 13, 14, 15, 16)),
+    # Overlapping events, given out of order, merge into one busy block
+    ([(720, 800), (660, 750)], _hours(9, 10, 14, 15, 16)),
+    # Adjacent events leave no gap, and the slot right after them is free
+    ([(600, 660), (660, 720)], _hours(9, 12, 13, 14, 15, 16)),
+    # An event nested in another changes nothing
+    ([(600, 780), (630, 660)], _hours(9, 13, 14, 15, 16)),
+    # Ending exactly when business hours start, or starting when they end
+    ([(480, 540), (1020, 1080)], ALL_DAY),
+    # Touching the first and last slot from inside business hours
+    ([(540, 541), (1019, 1020)], _hours(10, 11, 12, 13, 14, 15)),
+    # Overrunning the business-hours edges
+    ([(500, 570), (990, 1100)], _hours(10, 11, 12, 13, 14, 15)),
+])
+def test_free_slot_starts(booked, expected):
+    """Busy intervals are half-open and block every slot they overlap."""
+    assert _free_slot_starts(booked, DAY_START, DAY_END, 60) == expected
+
+
+@pytest.mark.parametrize("busy_start, busy_end, expected", [
+    # Overnight event ending mid-morning
+    ("2030-03-03T22:00:00-05:00", f"{DATE}T10:30:00-05:00", _hours(11, 12, 13, 14, 15, 16)),
+    # Evening event running past midnight
+    (f"{DATE}T15:00:00-05:00", "2030-03-05T01:00:00-05:00", _hours(9, 10, 11, 12, 13, 14)),
+    # Event spanning the whole day and beyond
+    ("2030-03-03T00:00:00-05:00", "2030-03-06T00:00:00-05:00", []),
+    # Event covering the whole day exactly
+    (f"{DATE}T00:00:00-05:00", "2030-03-05T00:00:00-05:00", []),
+    # Events on other days do not block anything
+    ("2030-03-03T09:00:00-05:00", "2030-03-03T17:00:00-05:00", ALL_DAY),
+    ("2030-03-05T09:00:00-05:00", "2030-03-05T17:00:00-05:00", ALL_DAY),
+])
+def test_events_across_midnight(busy_start, busy_end, expected):
+    """Events crossing day boundaries are clipped to the requested date."""
+    booked = [(_minute_of_day(busy_start, DATE), _minute_of_day(busy_end, DATE))]
+    assert _free_slot_starts(booked, DAY_START, DAY_END, 60) == expected
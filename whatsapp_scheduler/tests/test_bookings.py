@@ -0,0 +1,123 @@
+"""
+Tests for the booking tools and the SQLite booking store.
+
+Each test runs against a temporary database; calendar event creation is
+replaced so no Google API is contacted.
+"""
+
+import pytest
+
+from whatsapp_scheduler import tools
+from whatsapp_scheduler.tools import book_class, cancel_booking, get_client_bookings, _UNKNOWN_SENDER
+
+CLIENT_PHONE = "+573001112233"
+OTHER_PHONE = "+573004445566"
+
+
+@pytest.fixture(autouse=True)
+def fake_calendar(monkeypatch):
+    """Replace the Google Calendar insert with a canned event."""
+    async def create_calendar_event(ctx, summary, start_datetime, end_datetime, description=""):
+        return {"id": "evt_test", "htmlLink": "https://calendar.example/evt_test"}
+    
+    monkeypatch.setattr(tools, "create_calendar_event", create_calendar_event)
+
+
+async def _book(ctx, **overrides):
+    """Book a yoga class for the sender in the conversation context."""
+    booking = {
+        "client_name": "Ana Gómez",
+        "client_phone": CLIENT_PHONE,
+        "date": "2030-03-04",
+        "time": "10:00",
+        "class_type": "Yoga",
+    }
+    booking.update(overrides)
+    return await book_class(ctx, **booking)
+
+
+class TestBookingStore:
+    """BookingStore persistence on a temporary database."""
+    
+    async def test_add_list_remove(self, booking_store):
+        """A stored booking is listed for its client and removed by id."""
+        await booking_store.add({
+            "booking_id": "BK_1",
+            "client_name": "Ana Gómez",
+            "client_phone": CLIENT_PHONE,
+            "date": "2030-03-04",
+            "time": "10:00",
+            "class_type": "Yoga",
+            "created_at": "2030-03-01T00:00:00+00:00",
+        })
+        
+        rows = await booking_store.for_client(CLIENT_PHONE)
+        assert [row["booking_id"] for row in rows] == ["BK_1"]
+        assert await booking_store.for_client(CLIENT_PHONE, ("2030-03-05", "2030-03-31")) == []
+        
+        assert await booking_store.remove("BK_1", OTHER_PHONE) is False
+        assert await booking_store.remove("BK_1", CLIENT_PHONE) is True
+        assert await booking_store.for_client(CLIENT_PHONE) == []
+
+
+class TestBookingTools:
+    """book_class, get_client_bookings and cancel_booking through the tool layer."""
+    
+    async def test_book_list_cancel(self, ctx):
+        """A booking shows up in the sender's list and is gone after cancelling it."""
+        ctx.deps.conversation_context["client_phone"] = CLIENT_PHONE
+        
+        booked = await _book(ctx)
+        assert booked["success"] is True
+        assert booked["event_id"] == "evt_test"
+        assert booked["duration_minutes"] == 60
+        
+        listed = await get_client_bookings(ctx, client_phone=CLIENT_PHONE)
+        assert [b["booking_id"] for b in listed] == [booked["booking_id"]]
+        assert listed[0]["instructor"] == "Available Staff"
+        
+        cancelled = await cancel_booking(ctx, booking_id=booked["booking_id"])
+        assert cancelled["success"] is True
+        assert await get_client_bookings(ctx, client_phone=CLIENT_PHONE) == []
+    
+    async def test_cancel_by_date_and_time(self, ctx):
+        """Without an id, the sender's booking at the given slot is cancelled."""
+        ctx.deps.conversation_context["client_phone"] = CLIENT_PHONE
+        booked = await _book(ctx)
+        
+        cancelled = await cancel_booking(ctx, date="2030-03-04", time="10:00")
+        assert cancelled == {
+            "success": True,
+            "booking_id": booked["booking_id"],
+            "message": "Your booking for 2030-03-04 at 10:00 has been cancelled",
+        }
+    
+    async def test_booking_belongs_to_sender(self, ctx):
+        """The phone from the conversation context wins over the one the model passed."""
+        ctx.deps.conversation_context["client_phone"] = CLIENT_PHONE
+        await _book(ctx, client_phone=OTHER_PHONE)
+        
+        rows = await ctx.deps.booking_store.for_client(CLIENT_PHONE)
+        assert len(rows) == 1
+        assert await ctx.deps.booking_store.for_client(OTHER_PHONE) == []
+    
+    async def test_cancel_from_another_phone_is_refused(self, ctx):
+        """Knowing a booking id is not enough to cancel another client's booking."""
+        ctx.deps.conversation_context["client_phone"] = CLIENT_PHONE
+        booked = await _book(ctx)
+        
+        ctx.deps.conversation_context["client_phone"] = OTHER_PHONE
+        refused = await cancel_booking(ctx, booking_id=booked["booking_id"], client_phone=CLIENT_PHONE)
+        assert refused["success"] is False
+        assert await cancel_booking(ctx, date="2030-03-04", time="10:00") == refused
+        
+        ctx.deps.conversation_context["client_phone"] = CLIENT_PHONE
+        listed = await get_client_bookings(ctx, client_phone=CLIENT_PHONE)
+        assert [b["booking_id"] for b in listed] == [booked["booking_id"]]
+    
+    async def test_unknown_sender(self, ctx):
+        """Without a client phone in context, lookups and cancellations are refused."""
+        assert "client_phone" not in ctx.deps.conversation_context
+        
+        assert await cancel_booking(ctx, booking_id="BK_any") == _UNKNOWN_SENDER
+        assert await get_client_bookings(ctx, client_phone=CLIENT_PHONE) == [_UNKNOWN_SENDER]
@@ -0,0 +1,112 @@
+"""
+Tests that every date parsing fast path agrees with the dateparser fallback.
+
+The clock is frozen, and each input is parsed twice: once through
+_parse_datetime_cached, which must take a fast path, and once the way its
+fallback does (Spanish phrases translated, then DateDataParser).
+"""
+
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from whatsapp_scheduler import date_parsing
+from whatsapp_scheduler.date_parsing import (
+    _SPANISH_DAY_OF_MONTH_RE,
+    _SPANISH_MONTHS,
+    _SPANISH_PHRASE_RE,
+    _SPANISH_PHRASES,
+    _date_parser_for,
+    _parse_datetime_cached,
+)
+
+TZ = "America/Bogota"
+# Monday 4 March 2030, 09:15 in Bogotá
+NOW = datetime(2030, 3, 4, 9, 15, tzinfo=ZoneInfo(TZ))
+REFERENCE_MINUTE = int(NOW.timestamp() // 60)
+
+
+class _FrozenDatetime(datetime):
+    """datetime whose now() is NOW."""
+    
+    @classmethod
+    def now(cls, tz=None):
+        return NOW.astimezone(tz)
+
+
+@pytest.fixture(autouse=True)
+def frozen_now(monkeypatch):
+    """Freeze the parser's clock and start every test with empty parse caches."""
+    monkeypatch.setattr(date_parsing, "datetime", _FrozenDatetime)
+    _parse_datetime_cached.cache_clear()
+    date_parsing._date_parser_local.__dict__.clear()
+    yield
+    _parse_datetime_cached.cache_clear()
+    date_parsing._date_parser_local.__dict__.clear()
+
+
+def _dateparser_fallback(user_input: str) -> datetime:
+    """Parse an input the way _parse_datetime_cached falls back to dateparser."""
+    translated = _SPANISH_PHRASE_RE.sub(lambda m: _SPANISH_PHRASES[m.group(0)], user_input)
+    translated = _SPANISH_DAY_OF_MONTH_RE.sub(lambda m: f"{m.group(1)} {_SPANISH_MONTHS[m.group(2)]}", translated)
+    parsed = _date_parser_for(TZ, REFERENCE_MINUTE, NOW).get_date_data(translated).date_obj
+    assert parsed is not None, f"dateparser could not parse {translated!r}"
+    return parsed
+
+
+@pytest.mark.parametrize("user_input, expected_date, expected_time", [
+    # ISO date
+    ("2030-03-15 14:30", "2030-03-15", "14:30"),
+    # Relative offset
+    ("in 2 hours", "2030-03-04", "11:15"),
+    ("dentro de 2 horas", "2030-03-04", "11:15"),
+    ("in 45 minutes", "2030-03-04", "10:00"),
+    ("en 30 minutos", "2030-03-04", "09:45"),
+    # Day of month
+    ("15 march 10:30", "2030-03-15", "10:30"),
+    ("15 de marzo 10:30", "2030-03-15", "10:30"),
+    # Numeric day/month
+    ("15/03/2030 10:30", "2030-03-15", "10:30"),
+    ("20/4 16:00", "2030-04-20", "16:00"),
+    # Day keyword
+    ("today 14:30", "2030-03-04", "14:30"),
+    ("hoy 14:30", "2030-03-04", "14:30"),
+    ("tomorrow 10:00", "2030-03-05", "10:00"),
+    ("mañana 10:00", "2030-03-05", "10:00"),
+    ("day after tomorrow 18:00", "2030-03-06", "18:00"),
+    ("pasado mañana 18:00", "2030-03-06", "18:00"),
+    ("next friday 8 pm", "2030-03-08", "20:00"),
+    ("próximo viernes 8 pm", "2030-03-08", "20:00"),
+    # Bare time
+    ("14:30", "2030-03-04", "14:30"),
+    ("3 pm", "2030-03-04", "15:00"),
+])
+def test_fast_path_matches_dateparser(user_input, expected_date, expected_time):
+    """The fast path answers without dateparser and agrees with it."""
+    result = _parse_datetime_cached(user_input, TZ, REFERENCE_MINUTE)
+    assert result["method"] == "manual_parsing"
+    assert (result["date"], result["time"]) == (expected_date, expected_time)
+    
+    fallback = _dateparser_fallback(user_input)
+    assert (fallback.date().isoformat(), f"{fallback.hour:02d}:{fallback.minute:02d}") == (expected_date, expected_time)
+
+
+@pytest.mark.parametrize("user_input, expected_date", [
+    ("in 3 days", "2030-03-07"),
+    ("en 3 días", "2030-03-07"),
+])
+def test_day_offset_matches_dateparser_date(user_input, expected_date):
+    """A day offset keeps the date; unlike dateparser it does not carry over the current time."""
+    result = _parse_datetime_cached(user_input, TZ, REFERENCE_MINUTE)
+    assert result["method"] == "manual_parsing"
+    assert (result["date"], result["time"]) == (expected_date, "00:00")
+    assert _dateparser_fallback(user_input).date().isoformat() == expected_date
+
+
+def test_unmatched_input_falls_back_to_dateparser():
+    """Inputs no fast path recognises are parsed by dateparser."""
+    result = _parse_datetime_cached("march 20th", TZ, REFERENCE_MINUTE)
+    assert result["success"] is True
+    assert result["method"] == "dateparser"
+    assert result["date"] == "2030-03-20"
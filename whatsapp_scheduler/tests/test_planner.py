@@ -0,0 +1,231 @@
+"""
+Tests for the JIT tool-call planner.
+
+Plans come from TestModel, so the planner's validation, scheduling, reply
+rendering and plan cache run exactly as in production without an LLM.
+"""
+
+from types import SimpleNamespace
+
+import pytest
+from pydantic_ai.models.test import TestModel
+
+from whatsapp_scheduler import agent as agent_module
+from whatsapp_scheduler.planner import (
+    JITPlanner,
+    PlanValidationError,
+    ToolPlan,
+    _render_reply,
+    _schedule,
+    _templatize,
+)
+
+SLOTS = [
+    {"date": "2030-03-04", "time": "10:00", "instructor": "Jane", "available": True},
+    {"date": "2030-03-04", "time": "14:00", "instructor": None, "available": True},
+]
+
+
+def _plan(*steps, reply="{s1}"):
+    """Build a plan from (id, tool, args) tuples."""
+    return {"steps": [{"id": i, "tool": tool, "args": args} for i, tool, args in steps], "reply": reply}
+
+
+@pytest.fixture
+def calls():
+    """Tool invocations in call order, as (tool, args)."""
+    return []
+
+
+@pytest.fixture
+def fake_tools(calls):
+    """Read-only tools returning canned results and recording their args."""
+    def get_current_datetime(ctx, timezone=None):
+        calls.append(("get_current_datetime", {"timezone": timezone}))
+        return {"current_date": "2030-03-03", "day_name_en": "sunday"}
+    
+    async def parse_date_time(ctx, user_input, timezone=None):
+        calls.append(("parse_date_time", {"user_input": user_input}))
+        return {"date": "2030-03-04", "time": "10:00"}
+    
+    async def check_availability(ctx, date, time_range=None, instructor=None):
+        calls.append(("check_availability", {"date": date, "time_range": time_range}))
+        return [dict(slot, date=date) for slot in SLOTS]
+    
+    async def batch_check_availability(ctx, dates, time_range=None, instructor=None):
+        calls.append(("batch_check_availability", {"dates": dates}))
+        return {date: [dict(slot, date=date) for slot in SLOTS] for date in dates}
+    
+    async def view_bookings(ctx, client_phone, date_range=None):
+        calls.append(("view_bookings", {"client_phone": client_phone}))
+        return []
+    
+    return {
+        "get_current_datetime": get_current_datetime,
+        "parse_date_time": parse_date_time,
+        "check_availability": check_availability,
+        "batch_check_availability": batch_check_availability,
+        "view_bookings": view_bookings,
+    }
+
+
+def _planner(fake_tools, plan):
+    """JITPlanner whose model always emits the given plan."""
+    return JITPlanner(TestModel(custom_result_args=plan), tools=fake_tools)
+
+
+class TestValidation:
+    """Plans are rejected before any tool runs."""
+    
+    @pytest.mark.parametrize("plan, error", [
+        (_plan(), "no steps"),
+        (_plan(("s1", "book_class", {}), reply="{s1}"), "Unknown tool"),
+        (_plan(("s1", "check_availability", {"date": "$s9.date"})), "unknown step s9"),
+        (_plan(("s1", "check_availability", {"date": "$s1.date"})), "unknown step s1"),
+        (
+            _plan(
+                ("s1", "check_availability", {"date": "$s2.date"}),
+                ("s2", "parse_date_time", {"user_input": "$s1.date"}),
+            ),
+            "unknown step s2",
+        ),
+        (
+            _plan(
+                ("s1", "get_current_datetime", {}),
+                ("s1", "get_current_datetime", {}),
+            ),
+            "Duplicate step id",
+        ),
+        (_plan(("s1", "check_availability", {})), "Invalid args"),
+        (_plan(("s1", "get_current_datetime", {}), reply="Done!"), "does not use any step result"),
+        (_plan(("s1", "get_current_datetime", {}), reply="{s1"), "Malformed reply"),
+        (_plan(("s1", "get_current_datetime", {}), reply="{s1-date}"), "Unsupported reply field"),
+        (_plan(("s1", "get_current_datetime", {}), reply="{s2.date}"), "unknown field"),
+    ])
+    def test_rejected(self, fake_tools, plan, error):
+        """Empty plans, cycles, unknown refs and tools, bad args and bad replies are refused."""
+        with pytest.raises(PlanValidationError, match=error):
+            _planner(fake_tools, plan).validate(ToolPlan.model_validate(plan))
+
+
+class TestExecution:
+    """Plans run wave by wave with references resolved."""
+    
+    async def test_references_resolve_across_waves(self, fake_tools, calls, deps):
+        """A step referencing another runs in a later wave with the field substituted."""
+        plan = ToolPlan.model_validate(_plan(
+            ("s1", "parse_date_time", {"user_input": "lunes a las 10"}),
+            ("s2", "check_availability", {"date": "$s1.date"}),
+            ("s3", "get_current_datetime", {}),
+            reply="Hoy es {s3.day_name_en}; el {s1.date} a las {s2[0].time} está libre.",
+        ))
+        planner = _planner(fake_tools, plan.model_dump())
+        planner.validate(plan)
+        
+        assert [[step.id for step in wave] for wave in _schedule(plan)] == [["s1", "s3"], ["s2"]]
+        
+        reply = await planner.execute(plan, deps)
+        assert reply == "Hoy es sunday; el 2030-03-04 a las 10:00 está libre."
+        assert ("check_availability", {"date": "2030-03-04", "time_range": None}) in calls
+        assert [tool for tool, _ in calls][-1] == "check_availability"
+    
+    async def test_failed_step_rejects_plan(self, fake_tools, deps):
+        """A tool reporting an error aborts the plan so the agent can take over."""
+        async def view_bookings(ctx, client_phone, date_range=None):
+            return [{"error": "calendar unavailable"}]
+        
+        fake_tools["view_bookings"] = view_bookings
+        plan = ToolPlan.model_validate(_plan(("s1", "view_bookings", {"client_phone": "+573001112233"})))
+        
+        with pytest.raises(PlanValidationError, match="Step s1"):
+            await _planner(fake_tools, plan.model_dump()).execute(plan, deps)
+    
+    async def test_missing_result_field_rejects_plan(self, fake_tools, deps):
+        """A reference to a field the result does not have is a plan error, not a crash."""
+        plan = ToolPlan.model_validate(_plan(("s1", "get_current_datetime", {}), reply="{s1.missing}"))
+        
+        with pytest.raises(PlanValidationError, match="Unresolvable reference"):
+            await _planner(fake_tools, plan.model_dump()).execute(plan, deps)
+
+
+class TestReplyRendering:
+    """Structured step results render as WhatsApp text."""
+    
+    @pytest.mark.parametrize("reply, results, expected", [
+        ("{s1}", {"s1": "plain"}, "plain"),
+        ("{s1[time]}", {"s1": {"time": "10:00"}}, "10:00"),
+        ("{s1.count:>3}", {"s1": {"count": 7}}, "  7"),
+        ("Libres:\n{s1}", {"s1": []}, "Libres:\n-"),
+        (
+            "{s1}",
+            {"s1": SLOTS},
+            "- date: 2030-03-04, time: 10:00, instructor: Jane\n- date: 2030-03-04, time: 14:00",
+        ),
+        (
+            "{s1}",
+            {"s1": {"2030-03-04": ["10:00"], "2030-03-05": []}},
+            "2030-03-04:\n- 10:00\n\n2030-03-05:\n-",
+        ),
+        ("{s1}", {"s1": {"date": "2030-03-04", "notes": None}}, "date: 2030-03-04"),
+    ])
+    def test_render(self, reply, results, expected):
+        """Lists, dicts of lists and plain dicts render without Python reprs."""
+        assert _render_reply(reply, results) == expected
+    
+    def test_out_of_range_index(self):
+        """List indexes past the end are unresolvable."""
+        with pytest.raises(PlanValidationError):
+            _render_reply("{s1[5].time}", {"s1": SLOTS})
+
+
+class TestPlanCache:
+    """Plans are cached per message template with slot values replayed."""
+    
+    def test_templatize(self):
+        """Dates and times become placeholders and are returned in order."""
+        template, slots = _templatize("Horarios  el 4/3 a las 3pm")
+        assert template == "horarios el <DATE> a las <TIME>"
+        assert slots == ["4/3", "3pm"]
+    
+    async def test_cache_hit_replays_slots(self, fake_tools):
+        """A second message with the same template reuses the plan without the model."""
+        planner = _planner(fake_tools, _plan(("s1", "check_availability", {"date": "2030-03-04"})))
+        
+        first = await planner.compile("What is free on 2030-03-04?")
+        assert first.steps[0].args == {"date": "2030-03-04"}
+        
+        async def _no_model_call(message):
+            raise AssertionError("plan should come from the cache")
+        
+        planner._plan_agent = SimpleNamespace(run=_no_model_call)
+        second = await planner.compile("what is free on 2030-03-11?")
+        assert second.steps[0].args == {"date": "2030-03-11"}
+    
+    async def test_derived_values_are_not_cached(self, fake_tools):
+        """A plan holding values derived from the message (3pm -> 15:00) is never replayed."""
+        planner = _planner(fake_tools, _plan(
+            ("s1", "check_availability", {"date": "2030-03-04", "time_range": "15:00-16:00"})
+        ))
+        
+        await planner.compile("free on 2030-03-04 at 3pm?")
+        assert planner._plan_cache == {}
+
+
+class TestFallback:
+    """chat_with_scheduler falls back to the agent when the plan is unusable."""
+    
+    async def test_invalid_plan_falls_back_to_agent(self, fake_tools, deps, monkeypatch):
+        """A PlanValidationError from the planner hands the message to the read agent."""
+        planner = _planner(fake_tools, _plan())
+        agent_runs = []
+        
+        async def run(message, deps):
+            agent_runs.append(message)
+            return SimpleNamespace(data="agent reply")
+        
+        monkeypatch.setattr(agent_module, "get_jit_planner", lambda: planner)
+        monkeypatch.setattr(agent_module, "get_read_agent", lambda: SimpleNamespace(run=run))
+        
+        message = "What classes are available tomorrow?"
+        assert await agent_module.chat_with_scheduler(message, deps) == "agent reply"
+        assert agent_runs == [message]
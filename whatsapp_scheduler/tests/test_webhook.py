@@ -0,0 +1,82 @@
+"""
+Tests for X-Hub-Signature-256 verification of incoming webhooks.
+"""
+
+import hashlib
+import hmac
+from types import SimpleNamespace
+
+import pytest
+
+from whatsapp_scheduler import webhook
+from whatsapp_scheduler.webhook import app, startup, verify_webhook_signature
+
+SECRET = b"test-app-secret"
+BODY = b'{"object":"whatsapp_business_account","entry":[]}'
+
+
+def _sign(body: bytes, secret: bytes = SECRET) -> str:
+    """Signature header as Meta sends it."""
+    return "sha256=" + hmac.new(secret, body, hashlib.sha256).hexdigest()
+
+
+@pytest.fixture
+def production(monkeypatch):
+    """Run verification as outside development with the app secret configured."""
+    monkeypatch.setattr(webhook, "settings", SimpleNamespace(app_env="production"))
+    monkeypatch.setattr(webhook, "_APP_SECRET", SECRET)
+
+
+class TestVerifyWebhookSignature:
+    """verify_webhook_signature outside development."""
+    
+    def test_valid_signature(self, production):
+        """A body signed with the app secret is accepted."""
+        assert verify_webhook_signature(BODY, _sign(BODY)) is True
+    
+    def test_tampered_body(self, production):
+        """Any change to the signed body is rejected."""
+        assert verify_webhook_signature(BODY.replace(b"[]", b"[{}]"), _sign(BODY)) is False
+    
+    def test_wrong_secret(self, production):
+        """A signature made with another secret is rejected."""
+        assert verify_webhook_signature(BODY, _sign(BODY, b"other-secret")) is False
+    
+    @pytest.mark.parametrize("signature", [
+        "",
+        _sign(BODY)[len("sha256="):],
+        _sign(BODY).replace("sha256=", "sha1="),
+        "sha256=not-hex",
+    ])
+    def test_malformed_header(self, production, signature):
+        """A header without the sha256= prefix or with a non-hex digest is rejected."""
+        assert verify_webhook_signature(BODY, signature) is False
+    
+    def test_unset_secret_fails_closed(self, production, monkeypatch):
+        """Without an app secret nothing verifies, not even a correctly signed body."""
+        monkeypatch.setattr(webhook, "_APP_SECRET", None)
+        assert verify_webhook_signature(BODY, _sign(BODY)) is False
+    
+    def test_development_skips_verification(self, monkeypatch):
+        """Local development accepts unsigned payloads."""
+        monkeypatch.setattr(webhook, "settings", SimpleNamespace(app_env="development"))
+        monkeypatch.setattr(webhook, "_APP_SECRET", None)
+        assert verify_webhook_signature(BODY, "") is True
+
+
+class TestWebhookEndpoint:
+    """Signature enforcement at the HTTP and startup level."""
+    
+    async def test_unsigned_post_is_forbidden(self, production, monkeypatch):
+        """An unverifiable payload is refused before it is queued."""
+        monkeypatch.setattr(webhook, "_APP_SECRET", None)
+        response = await app.test_client().post(
+            "/webhook", data=BODY, headers={"X-Hub-Signature-256": _sign(BODY)}
+        )
+        assert response.status_code == 403
+    
+    async def test_startup_requires_secret(self, production, monkeypatch):
+        """The server refuses to start outside development without an app secret."""
+        monkeypatch.setattr(webhook, "_APP_SECRET", None)
+        with pytest.raises(RuntimeError, match="WHATSAPP_APP_SECRET"):
+            await startup()
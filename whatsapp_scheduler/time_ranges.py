@@ -0,0 +1,92 @@
+"""
+Time range and booking time normalization for the WhatsApp Scheduling Agent.
+Handles the common, already-structured inputs without the natural language parser.
+"""
+
+import re
+from typing import Optional, Tuple
+
+# Already-normalized booking date/time, joined as "YYYY-MM-DD HH:MM"
+_DATETIME_RE = re.compile(r'(\d{4}-\d{2}-\d{2}) (\d{2}:\d{2})')
+_DATE_RE = re.compile(r'\d{4}-\d{2}-\d{2}')
+
+# "3pm" / "12 am" style times mapped to HH:MM, built once at import
+_AMPM_TIMES = {
+    f"{hour}{suffix}": f"{(hour % 12) + (12 if suffix == 'pm' else 0):02d}:00"
+    for hour in range(1, 13)
+    for suffix in ("am", "pm")
+}
+
+# Named time ranges accepted by check_availability
+_TIME_RANGES = {
+    "morning": ("09:00", "12:00"),
+    "afternoon": ("12:00", "17:00"),
+    "evening": ("17:00", "20:00"),
+}
+
+# Explicit ranges such as "9am-12pm" or "14-16"
+_EXPLICIT_RANGE_RE = re.compile(r'(\d{1,2})\s*(am|pm)?\s*-\s*(\d{1,2})\s*(am|pm)?')
+_WORD_RE = re.compile(r'[a-z]+')
+
+
+def _to_24h(hour: int, ampm: Optional[str]) -> int:
+    """Convert a 12-hour clock hour to 24-hour format."""
+    if ampm == "pm" and hour != 12:
+        return hour + 12
+    if ampm == "am" and hour == 12:
+        return 0
+    return hour
+
+
+def parse_time_range(time_range: str) -> Optional[Tuple[str, str]]:
+    """
+    Parse a named or explicit time range into a (start, end) tuple.
+    
+    Args:
+        time_range: Time range such as "morning" or "9am-12pm"
+    
+    Returns:
+        Tuple of (start_time, end_time) in HH:MM format, or None if unknown
+    """
+    text = time_range.lower()
+    
+    match = _EXPLICIT_RANGE_RE.search(text)
+    if match:
+        start_hour, start_ampm, end_hour, end_ampm = match.groups()
+        end = _to_24h(int(end_hour), end_ampm)
+        start = _to_24h(int(start_hour), start_ampm)
+        # "2-5pm" means 14:00-17:00
+        if start_ampm is None and end_ampm is not None:
+            inherited = _to_24h(int(start_hour), end_ampm)
+            if inherited < end:
+                start = inherited
+        if 0 <= start < end <= 24:
+            return (f"{start:02d}:00", f"{end:02d}:00")
+    
+    for word in _WORD_RE.findall(text):
+        if word in _TIME_RANGES:
+            return _TIME_RANGES[word]
+    
+    return None
+
+
+def fast_parse(date: str, time: str) -> Optional[Tuple[str, str]]:
+    """
+    Normalize a booking date/time without the natural language parser.
+    
+    Handles an ISO date with either an HH:MM or a "3pm" style time.
+    
+    Returns:
+        (YYYY-MM-DD, HH:MM) tuple, or None if parse_datetime_natural is needed
+    """
+    match = _DATETIME_RE.fullmatch(f"{date.strip()} {time.strip()}")
+    if match:
+        return match.group(1), match.group(2)
+    
+    date = date.strip()
+    if _DATE_RE.fullmatch(date):
+        hhmm = _AMPM_TIMES.get(time.replace(" ", "").lower())
+        if hhmm:
+            return date, hhmm
+    
+    return None
@@ -3,109 +3,33 @@ Tools for WhatsApp Scheduling Agent.
 Following PydanticAI patterns with @agent.tool decorators and proper error handling.
 """
 
+import asyncio
 import logging
+import re
+import secrets
 from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime, timedelta
-import json
-import dateparser
-import os.path
+import orjson
+from types import SimpleNamespace
 from pydantic_ai import RunContext
 
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 
-from dependencies import SchedulingDependencies, BookingInfo, CalendarEvent
+from .dependencies import SchedulingDependencies, BookingInfo, get_timezone
+from .calendar_api import invalidate_busy_cache
+from .calendar_batch import queue_event_insert
+from .availability import invalidate_availability_cache
 
 logger = logging.getLogger(__name__)
 
-# Google Calendar API configuration
-SCOPES = ['https://www.googleapis.com/auth/calendar']
-
-
-def get_calendar_service(ctx: RunContext[SchedulingDependencies]):
-    """Get authenticated Google Calendar service."""
-    try:
-        creds = None
-        
-        # Load existing token
-        if os.path.exists(ctx.deps.calendar_token_path):
-            creds = Credentials.from_authorized_user_file(ctx.deps.calendar_token_path, SCOPES)
-        
-        # If there are no (valid) credentials available, let the user log in
-        if not creds or not creds.valid:
-            if creds and creds.expired and creds.refresh_token:
-                creds.refresh(Request())
-            else:
-                flow = InstalledAppFlow.from_client_secrets_file(
-                    ctx.deps.calendar_credentials_path, SCOPES)
-                creds = flow.run_local_server(port=0)
-            
-            # Save the credentials for the next run
-            with open(ctx.deps.calendar_token_path, 'w') as token:
-                token.write(creds.to_json())
-        
-        service = build('calendar', 'v3', credentials=creds)
-        return service
-        
-    except Exception as e:
-        logger.error(f"Error creating calendar service: {e}")
-        raise
-
-
-async def get_calendar_events(
-    start_time: str,
-    end_time: str,
-    max_results: int = 10,
-    ctx: Optional[RunContext[SchedulingDependencies]] = None
-) -> List[Dict[str, Any]]:
-    """
-    Get calendar events from Google Calendar.
-    
-    Args:
-        start_time: Start time in ISO format
-        end_time: End time in ISO format  
-        max_results: Maximum number of events to return
-        ctx: Optional context (for testing)
-    
-    Returns:
-        List of calendar events
-    """
-    try:
-        if ctx is None:
-            from dependencies import create_scheduling_dependencies
-            deps = create_scheduling_dependencies()
-            
-            class MockContext:
-                def __init__(self, deps):
-                    self.deps = deps
-            ctx = MockContext(deps)
-        
-        service = get_calendar_service(ctx)
-        
-        # Call the Calendar API
-        events_result = service.events().list(
-            calendarId=ctx.deps.calendar_id,
-            timeMin=start_time,
-            timeMax=end_time,
-            maxResults=max_results,
-            singleEvents=True,
-            orderBy='startTime'
-        ).execute()
-        
-        events = events_result.get('items', [])
-        
-        logger.info(f"Retrieved {len(events)} events from Google Calendar")
-        return events
-        
-    except HttpError as e:
-        logger.error(f"Google Calendar API error: {e}")
-        raise
-    except Exception as e:
-        logger.error(f"Error getting calendar events: {e}")
-        raise
+# Class types offered by the studio and their duration in minutes
+CLASS_DURATIONS = {
+    'Yoga': 60,
+    'Pilates': 45,
+    'HIIT Training': 30,
+    'Personal Training': 60,
+    'Group Fitness': 45
+}
 
 
 async def create_calendar_event(
@@ -130,8 +54,6 @@ async def create_calendar_event(
         Created event details
     """
     try:
-        service = get_calendar_service(ctx)
-        
         # Prepare event data
         event_data = {
             'summary': summary,
@@ -150,23 +72,39 @@ async def create_calendar_event(
         if attendees:
             event_data['attendees'] = [{'email': email} for email in attendees]
         
-        # Create the event
-        event = service.events().insert(
-            calendarId=ctx.deps.calendar_id,
-            body=event_data
-        ).execute()
+        # Create the event, batched with any inserts issued in the same loop tick
+        event = await queue_event_insert(ctx, event_data)
+        
+        # The new event makes cached busy intervals for its day stale; the local
+        # index is updated right away instead of waiting for the push notification
+        invalidate_busy_cache(ctx.deps.calendar_id, start_datetime[:10])
+        if ctx.deps.calendar_index is not None:
+            ctx.deps.calendar_index.apply(event)
         
-        logger.info(f"Created calendar event: {event.get('id')}")
+        logger.info("Created calendar event: %s", event.get('id'))
         return event
         
     except HttpError as e:
-        logger.error(f"Google Calendar API error creating event: {e}")
+        logger.error("Google Calendar API error creating event: %s", e)
         raise
     except Exception as e:
-        logger.error(f"Error creating calendar event: {e}")
+        logger.error("Error creating calendar event: %s", e)
         raise
 
 
+# Outbound text payload; only the recipient and the JSON-encoded body vary per send
+_TEXT_PAYLOAD_TEMPLATE = b'{"messaging_product":"whatsapp","to":"%s","type":"text","text":{"body":%s}}'
+# Recipients are normalized and validated so they can be spliced into the template unescaped
+_PHONE_NUMBER_RE = re.compile(r'\+?\d{6,15}')
+_NON_DIGIT_RE = re.compile(r'\D')
+
+
+def _normalize_phone_number(number: str) -> str:
+    """Drop spaces, dashes and other formatting from a phone number, keeping a leading +."""
+    number = number.strip()
+    return ("+" if number.startswith("+") else "") + _NON_DIGIT_RE.sub("", number)
+
+
 async def send_whatsapp_message(
     ctx: RunContext[SchedulingDependencies],
     to_number: str,
@@ -185,38 +123,25 @@ async def send_whatsapp_message(
         Message delivery status
     """
     try:
-        if not ctx.deps.http_client:
-            return "Error: HTTP client not available"
-        
-        # WhatsApp API endpoint
-        url = f"{ctx.deps.whatsapp_base_url}/{ctx.deps.whatsapp_phone_id}/messages"
+        # The model passes numbers as written, e.g. "+57 300 123 4567" or "300-123-4567"
+        recipient = _normalize_phone_number(to_number)
+        if not _PHONE_NUMBER_RE.fullmatch(recipient):
+            return f"Error: invalid recipient number {to_number!r}"
         
-        headers = {
-            "Authorization": f"Bearer {ctx.deps.whatsapp_api_key}",
-            "Content-Type": "application/json"
-        }
-        
-        # Prepare message payload
-        payload = {
-            "messaging_product": "whatsapp",
-            "to": to_number,
-            "type": "text",
-            "text": {
-                "body": message
-            }
-        }
+        # Prepare message payload, orjson escapes and quotes the body
+        payload = _TEXT_PAYLOAD_TEMPLATE % (recipient.encode(), orjson.dumps(message))
         
         # Send the message
-        response = await ctx.deps.http_client.post(
-            url, 
-            headers=headers, 
-            json=payload
+        response = await ctx.deps.get_http_client().post(
+            ctx.deps.messages_url, 
+            headers=ctx.deps.wa_headers, 
+            content=payload
         )
         
         if response.status_code == 200:
-            response_data = response.json()
+            response_data = orjson.loads(response.content)
             message_id = response_data.get("messages", [{}])[0].get("id", "unknown")
-            logger.info(f"WhatsApp message sent successfully: {message_id}")
+            logger.info("WhatsApp message sent successfully: %s", message_id)
             return f"Message sent successfully (ID: {message_id})"
         else:
             error_msg = f"Failed to send WhatsApp message: {response.status_code} - {response.text}"
@@ -229,94 +154,66 @@ async def send_whatsapp_message(
         return error_msg
 
 
-async def check_calendar_availability(
+async def send_whatsapp_messages_batch(
     ctx: RunContext[SchedulingDependencies],
-    date: str,
-    time_range: Optional[Tuple[str, str]] = None,
-    instructor: Optional[str] = None
-) -> List[Dict[str, Any]]:
+    items: List[Tuple[str, str, Optional[str]]]
+) -> List[str]:
     """
-    Check calendar availability for scheduling by querying Google Calendar.
+    Send several WhatsApp messages concurrently over the shared HTTP/2 client.
     
     Args:
-        date: Date to check (YYYY-MM-DD format)
-        time_range: Optional tuple of (start_time, end_time)
-        instructor: Optional specific instructor
+        items: (to_number, message, template_type) tuples
     
     Returns:
-        List of available time slots
+        Delivery status for each message, in input order
     """
-    try:
-        logger.info(f"Checking calendar availability for {date} with time_range: {time_range}")
-        
-        # Set default time range if not provided
-        if time_range is None:
-            time_range = (f"{ctx.deps.business_hours_start:02d}:00", f"{ctx.deps.business_hours_end:02d}:00")
-        
-        # Create datetime range for the day
-        start_datetime = f"{date}T{time_range[0]}:00"
-        end_datetime = f"{date}T{time_range[1]}:00"
-        
-        # Get existing events from Google Calendar
-        existing_events = await get_calendar_events(
-            start_time=start_datetime + "Z",
-            end_time=end_datetime + "Z",
-            max_results=50,
-            ctx=ctx
-        )
-        
-        # Generate all possible slots (hourly slots in business hours)
-        available_slots = []
-        start_hour = int(time_range[0].split(':')[0])
-        end_hour = int(time_range[1].split(':')[0])
-        
-        for hour in range(start_hour, end_hour):
-            slot_time = f"{hour:02d}:00"
-            slot_datetime = f"{date}T{slot_time}:00"
-            
-            # Check if this slot conflicts with existing events
-            is_available = True
-            for event in existing_events:
-                event_start = event.get('start', {}).get('dateTime', '')
-                event_end = event.get('end', {}).get('dateTime', '')
-                
-                if event_start and event_end:
-                    # Simple overlap check (could be more sophisticated)
-                    if slot_datetime >= event_start[:16] and slot_datetime < event_end[:16]:
-                        is_available = False
-                        break
-            
-            if is_available:
-                available_slots.append({
-                    "time": slot_time,
-                    "instructor": instructor or "Available Staff",
-                    "duration": "60 minutes",
-                    "available": True,
-                    "date": date
-                })
-        
-        logger.info(f"Found {len(available_slots)} available slots for {date}")
-        return available_slots
-        
-    except Exception as e:
-        error_msg = f"Error checking calendar availability: {str(e)}"
-        logger.error(error_msg)
-        # Fallback to basic available slots if calendar check fails
-        fallback_slots = []
-        start_hour = ctx.deps.business_hours_start
-        end_hour = ctx.deps.business_hours_end
-        
-        for hour in range(start_hour, end_hour, 2):  # Every 2 hours as fallback
-            slot_time = f"{hour:02d}:00"
-            fallback_slots.append({
-                "time": slot_time,
-                "instructor": instructor or "Available Staff",
-                "duration": "60 minutes",
-                "available": True,
-                "note": "Calendar check failed, showing fallback availability"
-            })
-        
-        return fallback_slots
+    results = await asyncio.gather(
+        *(send_whatsapp_message(ctx, to_number, message, template_type) for to_number, message, template_type in items),
+        return_exceptions=True
+    )
+    return [
+        f"Error sending message: {result}" if isinstance(result, Exception) else result
+        for result in results
+    ]
+
+
+async def flush_outbox(deps: SchedulingDependencies) -> List[str]:
+    """
+    Send every message queued on the outbox concurrently.
+    
+    Args:
+        deps: Scheduling dependencies holding the outbox and HTTP client
+    
+    Returns:
+        Delivery status for each queued message, in queue order
+    """
+    items = deps.outbox.drain()
+    if not items:
+        return []
+    
+    statuses = await send_whatsapp_messages_batch(
+        SimpleNamespace(deps=deps),
+        [(item.to_number, item.message, item.template_type) for item in items]
+    )
+    
+    for item, status in zip(items, statuses):
+        if not item.status.done():
+            item.status.set_result(status)
+    
+    logger.info("Flushed %d queued WhatsApp messages", len(items))
+    return statuses
+
+
+# Returned when bookings are requested outside a conversation with a known sender
+_UNKNOWN_SENDER = {
+    "success": False,
+    "error": "The sender of this conversation could not be identified"
+}
+
+
+def _sender_phone(ctx: RunContext[SchedulingDependencies]) -> Optional[str]:
+    """Return the phone number the conversation comes from, as set by the transport."""
+    return (ctx.deps.conversation_context or {}).get("client_phone")
 
 
 async def book_class(
@@ -345,6 +242,9 @@ async def book_class(
         Booking confirmation with unique booking ID and calendar event
     """
     try:
+        # Bookings belong to the verified sender, whatever phone the model passed
+        client_phone = _sender_phone(ctx) or client_phone
+        
         # Create booking info
         booking = BookingInfo(
             client_name=client_name,
@@ -356,28 +256,14 @@ async def book_class(
             notes=notes
         )
         
-        # Generate a booking ID
-        booking_id = f"BK_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        # Generate an unguessable booking ID, it is enough to cancel the booking
+        booking_id = f"BK_{secrets.token_urlsafe(12)}"
         
         # Calculate class duration based on type
-        class_durations = {
-            'Yoga': 60,
-            'Pilates': 45,
-            'HIIT Training': 30,
-            'Personal Training': 60,
-            'Group Fitness': 45
-        }
-        duration_minutes = class_durations.get(class_type, 60)
-        
-        # Create start and end datetime strings with proper timezone handling
-        import pytz
-        
-        # Parse the naive datetime
-        naive_datetime = datetime.strptime(f"{date} {time}", '%Y-%m-%d %H:%M')
+        duration_minutes = CLASS_DURATIONS.get(class_type, 60)
         
-        # Localize to user's timezone (Colombia)
-        user_tz = pytz.timezone(ctx.deps.user_timezone)
-        start_dt = user_tz.localize(naive_datetime)
+        # Parse with the C fromisoformat and attach the user's timezone (Colombia)
+        start_dt = datetime.fromisoformat(f"{date}T{time}").replace(tzinfo=get_timezone(ctx.deps.user_timezone))
         end_dt = start_dt + timedelta(minutes=duration_minutes)
         
         # Convert to ISO format with timezone info
@@ -400,6 +286,10 @@ Class Booking Details:
         if notes:
             event_description += f"\nNotes: {notes}"
         
+        # Open the booking store while the calendar request is in flight
+        store = ctx.deps.get_booking_store()
+        store_ready = asyncio.ensure_future(store.open())
+        
         # Create the Google Calendar event
         try:
             calendar_event = await create_calendar_event(
@@ -413,29 +303,34 @@ Class Booking Details:
             event_id = calendar_event.get('id')
             event_link = calendar_event.get('htmlLink', '')
             
-            logger.info(f"Google Calendar event created: {event_id}")
+            logger.info("Google Calendar event created: %s", event_id)
             
         except Exception as calendar_error:
-            logger.error(f"Failed to create calendar event: {calendar_error}")
+            logger.error("Failed to create calendar event: %s", calendar_error)
             # Continue with booking but note the calendar issue
             event_id = None
             event_link = ''
         
-        # Store in conversation context for this session
-        if 'bookings' not in ctx.deps.conversation_context:
-            ctx.deps.conversation_context['bookings'] = []
-        
-        booking_record = {
+        # Persist the booking
+        await store_ready
+        await store.add({
             'booking_id': booking_id,
-            'booking_info': booking.__dict__,
+            'client_name': booking.client_name,
+            'client_phone': booking.client_phone,
+            'date': booking.date,
+            'time': booking.time,
+            'class_type': booking.class_type,
+            'instructor': booking.instructor,
+            'notes': booking.notes,
             'calendar_event_id': event_id,
             'calendar_event_link': event_link,
-            'created_at': datetime.now().isoformat()
-        }
+            'created_at': datetime.now(get_timezone("UTC")).isoformat()
+        })
         
-        ctx.deps.conversation_context['bookings'].append(booking_record)
+        # The booked slot is no longer free
+        invalidate_availability_cache(ctx, date)
         
-        logger.info(f"Class booked successfully: {booking_id} (Calendar Event: {event_id})")
+        logger.info("Class booked successfully: %s (Calendar Event: %s)", booking_id, event_id)
         
         return {
             "success": True,
@@ -461,6 +356,37 @@ Class Booking Details:
         }
 
 
+async def batch_book_classes(
+    ctx: RunContext[SchedulingDependencies],
+    bookings: List[BookingInfo]
+) -> List[Dict[str, Any]]:
+    """
+    Book several classes at once.
+    
+    The bookings run concurrently, so their calendar events are created in a
+    single batch request rather than one round-trip each.
+    
+    Args:
+        bookings: Bookings to create
+    
+    Returns:
+        One book_class result per booking, in order
+    """
+    return await asyncio.gather(*(
+        book_class(
+            ctx,
+            client_name=booking.client_name,
+            client_phone=booking.client_phone,
+            date=booking.date,
+            time=booking.time,
+            class_type=booking.class_type,
+            instructor=booking.instructor,
+            notes=booking.notes
+        )
+        for booking in bookings
+    ))
+
+
 async def cancel_booking(
     ctx: RunContext[SchedulingDependencies],
     booking_id: Optional[str] = None,
@@ -469,11 +395,14 @@ async def cancel_booking(
     time: Optional[str] = None
 ) -> Dict[str, Any]:
     """
-    Cancel a booking by ID or client details.
+    Cancel one of the sender's bookings by ID or by date and time.
+    
+    Only bookings of the phone in the conversation context can be cancelled;
+    a client_phone passed by the model is ignored.
     
     Args:
         booking_id: Unique booking ID
-        client_phone: Client's phone number (alternative identifier)
+        client_phone: Ignored, kept for the tool signature
         date: Booking date (alternative identifier)
         time: Booking time (alternative identifier)
     
@@ -481,34 +410,31 @@ async def cancel_booking(
         Cancellation confirmation
     """
     try:
-        bookings = ctx.deps.conversation_context.get('bookings', [])
+        store = ctx.deps.get_booking_store()
+        client_phone = _sender_phone(ctx)
+        if client_phone is None:
+            return dict(_UNKNOWN_SENDER)
         
         if booking_id:
             # Find booking by ID
-            for booking in bookings:
-                if booking['booking_id'] == booking_id:
-                    bookings.remove(booking)
-                    logger.info(f"Booking cancelled: {booking_id}")
-                    return {
-                        "success": True,
-                        "booking_id": booking_id,
-                        "message": f"Booking {booking_id} has been cancelled successfully"
-                    }
+            if await store.remove(booking_id, client_phone):
+                logger.info("Booking cancelled: %s", booking_id)
+                return {
+                    "success": True,
+                    "booking_id": booking_id,
+                    "message": f"Booking {booking_id} has been cancelled successfully"
+                }
         
-        elif client_phone and date and time:
-            # Find booking by client details
-            for booking in bookings:
-                booking_info = booking['booking_info']
-                if (booking_info['client_phone'] == client_phone and 
-                    booking_info['date'] == date and 
-                    booking_info['time'] == time):
-                    bookings.remove(booking)
-                    logger.info(f"Booking cancelled for {client_phone} on {date} at {time}")
-                    return {
-                        "success": True,
-                        "booking_id": booking['booking_id'],
-                        "message": f"Your booking for {date} at {time} has been cancelled"
-                    }
+        elif date and time:
+            # Find booking by client details through the (client_phone, date) index
+            cancelled_id = await store.remove_by_slot(client_phone, date, time)
+            if cancelled_id:
+                logger.info("Booking cancelled for %s on %s at %s", client_phone, date, time)
+                return {
+                    "success": True,
+                    "booking_id": cancelled_id,
+                    "message": f"Your booking for {date} at {time} has been cancelled"
+                }
         
         return {
             "success": False,
@@ -530,317 +456,39 @@ async def get_client_bookings(
     date_range: Optional[Tuple[str, str]] = None
 ) -> List[Dict[str, Any]]:
     """
-    Get all bookings for a specific client.
+    Get all bookings of the sender.
+    
+    Only the phone in the conversation context is looked up; a client_phone
+    passed by the model is ignored so no client sees another's bookings.
     
     Args:
-        client_phone: Client's phone number
+        client_phone: Ignored, kept for the tool signature
         date_range: Optional date range (start_date, end_date)
     
     Returns:
         List of client's bookings
     """
     try:
-        bookings = ctx.deps.conversation_context.get('bookings', [])
+        client_phone = _sender_phone(ctx)
+        if client_phone is None:
+            return [dict(_UNKNOWN_SENDER)]
+        
         client_bookings = []
         
-        for booking in bookings:
-            booking_info = booking['booking_info']
-            if booking_info['client_phone'] == client_phone:
-                client_bookings.append({
-                    "booking_id": booking['booking_id'],
-                    "date": booking_info['date'],
-                    "time": booking_info['time'],
-                    "class_type": booking_info['class_type'],
-                    "instructor": booking_info.get('instructor', 'Available Staff'),
-                    "created_at": booking['created_at']
-                })
+        for booking in await ctx.deps.get_booking_store().for_client(client_phone, date_range):
+            client_bookings.append({
+                "booking_id": booking['booking_id'],
+                "date": booking['date'],
+                "time": booking['time'],
+                "class_type": booking['class_type'],
+                "instructor": booking['instructor'] or 'Available Staff',
+                "created_at": booking['created_at']
+            })
         
-        logger.info(f"Found {len(client_bookings)} bookings for {client_phone}")
+        logger.info("Found %d bookings for %s", len(client_bookings), client_phone)
         return client_bookings
         
     except Exception as e:
         error_msg = f"Error retrieving client bookings: {str(e)}"
         logger.error(error_msg)
         return [{"error": error_msg}]
-
-
-def parse_datetime_natural(
-    ctx: RunContext[SchedulingDependencies],
-    user_input: str,
-    timezone: Optional[str] = None
-) -> Dict[str, Any]:
-    """
-    Parse natural language datetime expressions with current date context and Spanish support.
-    
-    Args:
-        user_input: Natural language date/time expression
-        timezone: Optional timezone for parsing
-    
-    Returns:
-        Structured datetime information
-    """
-    try:
-        from datetime import datetime, timedelta
-        import pytz
-        
-        # Use user timezone or default
-        tz = timezone or ctx.deps.user_timezone
-        
-        # Get current date for context
-        if tz == "UTC":
-            now = datetime.utcnow().replace(tzinfo=pytz.UTC)
-        else:
-            try:
-                tz_obj = pytz.timezone(tz)
-                now = datetime.now(tz_obj)
-            except:
-                now = datetime.now()
-        
-        # Preprocess Spanish expressions with current date context
-        original_lower = user_input.lower().strip()
-        translated_input = original_lower
-        
-        # Manual parsing for common Spanish relative dates
-        current_weekday = now.weekday()  # 0=Monday, 6=Sunday
-        
-        # Days of week mapping
-        days_map = {
-            'lunes': 0, 'monday': 0,
-            'martes': 1, 'tuesday': 1,
-            'miércoles': 2, 'miercoles': 2, 'wednesday': 2,
-            'jueves': 3, 'thursday': 3,
-            'viernes': 4, 'friday': 4,
-            'sábado': 5, 'sabado': 5, 'saturday': 5,
-            'domingo': 6, 'sunday': 6
-        }
-        
-        # Try to manually calculate relative dates
-        target_date = None
-        target_time = "00:00"
-        
-        # Extract time if present - improved patterns to handle Spanish properly
-        time_patterns = [
-            r'a la (\d{1,2})\s+(pm|am)',  # "a la 1 pm" (singular)
-            r'a las (\d{1,2}):(\d{2})\s*(pm|am)?',  # "a las 1:30 pm" with minutes
-            r'a las (\d{1,2})\s+(pm|am)',  # "a las 1 pm" (plural)
-            r'at (\d{1,2})\s*(pm|am)',  # "at 1 pm"
-            r'(\d{1,2}):(\d{2})',  # "13:30"
-            r'(\d{1,2})\s*(pm|am)'  # "1 pm" (fallback)
-        ]
-        
-        import re
-        time_found = None
-        for pattern in time_patterns:
-            match = re.search(pattern, original_lower)
-            if match:
-                try:
-                    # Parse based on pattern type
-                    if 'a la' in pattern or 'a las' in pattern or 'at' in pattern:
-                        # Patterns with explicit Spanish/English time phrases
-                        hour = int(match.group(1))
-                        if ':' in pattern and len(match.groups()) >= 2 and match.group(2).isdigit():
-                            minute = int(match.group(2))
-                            ampm = match.group(3) if len(match.groups()) >= 3 else None
-                        else:
-                            minute = 0  # Default to 0 minutes for "a la 1 pm"
-                            ampm = match.group(2) if len(match.groups()) >= 2 else None
-                    elif ':' in pattern:
-                        # Time with colon "13:30"
-                        hour = int(match.group(1))
-                        minute = int(match.group(2))
-                        ampm = match.group(3) if len(match.groups()) >= 3 else None
-                    else:
-                        # Simple hour + am/pm "1 pm"
-                        hour = int(match.group(1))
-                        minute = 0
-                        ampm = match.group(2) if len(match.groups()) >= 2 else None
-                    
-                    # Apply AM/PM conversion
-                    if ampm:
-                        if ampm.lower() == 'pm' and hour != 12:
-                            hour += 12
-                        elif ampm.lower() == 'am' and hour == 12:
-                            hour = 0
-                    
-                    target_time = f"{hour:02d}:{minute:02d}"
-                    time_found = True
-                    break
-                except Exception as e:
-                    logger.error(f"Error parsing time pattern '{pattern}': {e}")
-                    continue
-        
-        # Parse relative day expressions manually
-        if 'mañana' in original_lower or 'tomorrow' in original_lower:
-            target_date = now.date() + timedelta(days=1)
-        elif 'pasado mañana' in original_lower or 'day after tomorrow' in original_lower:
-            target_date = now.date() + timedelta(days=2)
-        elif 'hoy' in original_lower or 'today' in original_lower:
-            target_date = now.date()
-        else:
-            # Look for "próximo/next + day"
-            for day_name, day_num in days_map.items():
-                if f'próximo {day_name}' in original_lower or f'proximo {day_name}' in original_lower or f'next {day_name}' in original_lower:
-                    # Calculate days until next occurrence of this weekday
-                    days_ahead = day_num - current_weekday
-                    if days_ahead <= 0:  # Target day already happened this week
-                        days_ahead += 7
-                    target_date = now.date() + timedelta(days=days_ahead)
-                    break
-                elif day_name in original_lower and ('próximo' in original_lower or 'proximo' in original_lower or 'next' in original_lower):
-                    # Handle cases like "próximo viernes" or "next friday"
-                    days_ahead = day_num - current_weekday
-                    if days_ahead <= 0:
-                        days_ahead += 7
-                    target_date = now.date() + timedelta(days=days_ahead)
-                    break
-        
-        # If we successfully parsed manually
-        if target_date:
-            try:
-                # Combine date and time
-                if tz == "UTC":
-                    target_datetime = datetime.combine(target_date, datetime.strptime(target_time, "%H:%M").time())
-                    target_datetime = target_datetime.replace(tzinfo=pytz.UTC)
-                else:
-                    target_datetime = datetime.combine(target_date, datetime.strptime(target_time, "%H:%M").time())
-                    tz_obj = pytz.timezone(tz)
-                    target_datetime = tz_obj.localize(target_datetime)
-                
-                return {
-                    "success": True,
-                    "datetime": target_datetime.isoformat(),
-                    "date": target_datetime.strftime('%Y-%m-%d'),
-                    "time": target_datetime.strftime('%H:%M'),
-                    "timezone": str(target_datetime.tzinfo),
-                    "original_input": user_input,
-                    "method": "manual_parsing",
-                    "current_date_context": now.strftime('%Y-%m-%d'),
-                    "current_weekday": current_weekday
-                }
-            except Exception as e:
-                logger.error(f"Error in manual parsing: {e}")
-        
-        # Fallback to dateparser with translations
-        spanish_phrases = {
-            'próximo viernes': 'next friday',
-            'proximo viernes': 'next friday',
-            'el viernes que viene': 'next friday',
-            'siguiente viernes': 'next friday',
-            'próximo lunes': 'next monday',
-            'proximo lunes': 'next monday',
-            'próximo martes': 'next tuesday',
-            'proximo martes': 'next tuesday',
-            'próximo miércoles': 'next wednesday',
-            'proximo miercoles': 'next wednesday',
-            'próximo jueves': 'next thursday',
-            'proximo jueves': 'next thursday',
-            'próximo sábado': 'next saturday',
-            'proximo sabado': 'next saturday',
-            'próximo domingo': 'next sunday',
-            'proximo domingo': 'next sunday',
-            'mañana': 'tomorrow',
-            'pasado mañana': 'day after tomorrow'
-        }
-        
-        # Add specific date translations for Spanish
-        specific_date_phrases = {
-            r'el (\d+) de enero': r'\1 january',
-            r'el (\d+) de febrero': r'\1 february', 
-            r'el (\d+) de marzo': r'\1 march',
-            r'el (\d+) de abril': r'\1 april',
-            r'el (\d+) de mayo': r'\1 may',
-            r'el (\d+) de junio': r'\1 june',
-            r'el (\d+) de julio': r'\1 july', 
-            r'el (\d+) de agosto': r'\1 august',
-            r'el (\d+) de septiembre': r'\1 september',
-            r'el (\d+) de octubre': r'\1 october',
-            r'el (\d+) de noviembre': r'\1 november',
-            r'el (\d+) de diciembre': r'\1 december',
-            # Also handle cases with time
-            r'el (\d+) de enero a las': r'\1 january at',
-            r'el (\d+) de febrero a las': r'\1 february at',
-            r'el (\d+) de marzo a las': r'\1 march at',
-            r'el (\d+) de abril a las': r'\1 april at',
-            r'el (\d+) de mayo a las': r'\1 may at',
-            r'el (\d+) de junio a las': r'\1 june at',
-            r'el (\d+) de julio a las': r'\1 july at',
-            r'el (\d+) de agosto a las': r'\1 august at',
-            r'el (\d+) de septiembre a las': r'\1 september at',
-            r'el (\d+) de octubre a las': r'\1 october at',
-            r'el (\d+) de noviembre a las': r'\1 november at',
-            r'el (\d+) de diciembre a las': r'\1 december at'
-        }
-        
-        # Apply basic phrase translations
-        for spanish_phrase, english_phrase in spanish_phrases.items():
-            if spanish_phrase in translated_input:
-                translated_input = translated_input.replace(spanish_phrase, english_phrase)
-        
-        # Apply regex-based specific date translations
-        import re
-        for spanish_pattern, english_replacement in specific_date_phrases.items():
-            translated_input = re.sub(spanish_pattern, english_replacement, translated_input)
-        
-        # Try dateparser as fallback with better year handling
-        parsing_strategies = [translated_input, user_input]
-        
-        for attempt_input in parsing_strategies:
-            parsed_date = dateparser.parse(
-                attempt_input,
-                languages=['es', 'en'],
-                settings={
-                    'TIMEZONE': tz,
-                    'RETURN_AS_TIMEZONE_AWARE': True,
-                    'PREFER_DAY_OF_MONTH': 'first',
-                    'DATE_ORDER': 'DMY',
-                    'PREFER_DATES_FROM': 'future',
-                    'RELATIVE_BASE': now  # Use current date as reference
-                }
-            )
-            
-            # Fix year issue: if parsed date is in the past or wrong year, fix it
-            if parsed_date:
-                # If the year is less than current year, fix it
-                if parsed_date.year < now.year:
-                    parsed_date = parsed_date.replace(year=now.year)
-                    logger.info(f"Adjusted year from {parsed_date.year} to {now.year}")
-                
-                # If the date is in the past (same year but earlier date), move to next year
-                elif parsed_date.date() < now.date():
-                    parsed_date = parsed_date.replace(year=now.year + 1)
-                    logger.info(f"Moved date to next year: {parsed_date.date()}")
-            if parsed_date:
-                return {
-                    "success": True,
-                    "datetime": parsed_date.isoformat(),
-                    "date": parsed_date.strftime('%Y-%m-%d'),
-                    "time": parsed_date.strftime('%H:%M'),
-                    "timezone": str(parsed_date.tzinfo),
-                    "original_input": user_input,
-                    "method": "dateparser",
-                    "translated_input": translated_input if translated_input != user_input.lower() else None
-                }
-        
-        # If all parsing failed
-        return {
-            "success": False,
-            "error": f"Could not parse datetime: '{user_input}'. Current date context: {now.strftime('%A, %Y-%m-%d')}",
-            "original_input": user_input,
-            "current_date_context": now.strftime('%Y-%m-%d'),
-            "current_weekday": current_weekday,
-            "suggestions": [
-                f"mañana a las 2pm (tomorrow at 2pm)",
-                f"próximo viernes a las 8pm (next friday at 8pm)",
-                f"{(now + timedelta(days=1)).strftime('%Y-%m-%d')} 14:00",
-                "en 2 días a las 3pm (in 2 days at 3pm)"
-            ]
-        }
-            
-    except Exception as e:
-        error_msg = f"Error parsing datetime: {str(e)}"
-        logger.error(error_msg)
-        return {
-            "success": False,
-            "error": error_msg,
-            "original_input": user_input
-        }
\ No newline at end of file
@@ -1,25 +1,62 @@
 """
-Flask webhook server for WhatsApp Business API integration.
+Quart (ASGI) webhook server for WhatsApp Business API integration.
 Handles incoming messages and webhook verification.
 """
 
-import logging
-import json
 import asyncio
-from typing import Dict, Any
-from flask import Flask, request, jsonify
+import logging
+import hashlib
+import hmac
+import weakref
+import orjson
+from types import SimpleNamespace
+from typing import Dict, Any, List, Optional, Tuple
+from quart import Quart, request, jsonify
+from werkzeug.exceptions import HTTPException
 import httpx
+from cachetools import TTLCache
 
 from .agent import chat_with_scheduler
-from .dependencies import create_scheduling_dependencies
+from .dependencies import SchedulingDependencies, create_scheduling_dependencies, close_http_client
+from .booking_store import close_booking_store
+from .calendar_index import notify_change
+from .calendar_sync import run_calendar_sync
+from .tools import send_whatsapp_message
 from .settings import settings
 
 # Configure logging
 logging.basicConfig(level=getattr(logging, settings.log_level))
 logger = logging.getLogger(__name__)
 
-# Create Flask app
-app = Flask(__name__)
+# Create Quart app
+app = Quart(__name__)
+
+# Encoded once so signature checks don't re-encode the secret per request
+_APP_SECRET = settings.whatsapp_app_secret.encode() if settings.whatsapp_app_secret else None
+
+# Webhook payloads are acknowledged immediately and processed by background consumers
+WEBHOOK_QUEUE_SIZE = 1024
+WEBHOOK_CONSUMERS = 8
+
+_webhook_queue: Optional[asyncio.Queue] = None
+_consumer_tasks: List[asyncio.Task] = []
+_calendar_sync_task: Optional[asyncio.Task] = None
+
+# Outbound replies are coalesced briefly and sent in batches by one background sender
+REPLY_BATCH_SIZE = 16
+REPLY_BATCH_WINDOW = 0.02
+REPLY_SHUTDOWN_TIMEOUT = 5.0
+
+_reply_queue: Optional[asyncio.Queue] = None
+_reply_task: Optional[asyncio.Task] = None
+
+# Scheduling dependencies per sender, rebuilt after SESSION_TTL seconds
+SESSION_CACHE_SIZE = 10_000
+SESSION_TTL = 1800
+_session_dependencies: TTLCache = TTLCache(maxsize=SESSION_CACHE_SIZE, ttl=SESSION_TTL)
+
+# Per-sender conversation locks, dropped once no message from that sender is in flight
+_sender_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
 
 
 def verify_webhook_signature(payload: bytes, signature: str) -> bool:
@@ -27,90 +64,129 @@ def verify_webhook_signature(payload: bytes, signature: str) -> bool:
     Verify WhatsApp webhook signature.
     
     Args:
-        payload: Request payload bytes
+        payload: Raw request body bytes, exactly as signed by Meta
         signature: X-Hub-Signature-256 header value
     
     Returns:
-        True if signature is valid
+        True if signature is valid; always False outside development when no
+        app secret is configured, so a missing secret never fails open
     """
-    # In production, implement proper signature verification
-    # using HMAC-SHA256 with your webhook secret
-    # For now, we'll skip signature verification in development
+    # Only local development may skip verification
     if settings.app_env == "development":
         return True
     
-    # TODO: Implement proper signature verification
-    # import hmac
-    # import hashlib
-    # expected_signature = hmac.new(
-    #     webhook_secret.encode(),
-    #     payload,
-    #     hashlib.sha256
-    # ).hexdigest()
-    # return signature == f"sha256={expected_signature}"
+    if _APP_SECRET is None:
+        logger.error("WHATSAPP_APP_SECRET is not set, rejecting webhook payload")
+        return False
+    
+    if not signature.startswith("sha256="):
+        return False
     
-    return True
+    try:
+        received = bytes.fromhex(signature[7:])
+    except ValueError:
+        return False
+    
+    expected = hmac.new(_APP_SECRET, payload, hashlib.sha256).digest()
+    return hmac.compare_digest(expected, received)
 
 
 @app.route("/webhook", methods=["GET"])
-def webhook_verification():
+async def webhook_verification():
     """
     Handle WhatsApp webhook verification.
     
     WhatsApp sends a GET request with challenge parameters
     that need to be echoed back for verification.
     """
-    try:
-        # Get verification parameters
-        mode = request.args.get("hub.mode")
-        token = request.args.get("hub.verify_token")
-        challenge = request.args.get("hub.challenge")
-        
-        logger.info(f"Webhook verification request: mode={mode}, token={token}")
-        
-        # Verify the token matches our configured token
-        if mode == "subscribe" and token == settings.whatsapp_webhook_token:
-            logger.info("Webhook verification successful")
-            return challenge, 200
-        else:
-            logger.warning(f"Webhook verification failed: invalid token")
-            return "Forbidden", 403
-            
-    except Exception as e:
-        logger.error(f"Error in webhook verification: {e}")
-        return "Internal Server Error", 500
+    # Get verification parameters
+    mode = request.args.get("hub.mode")
+    token = request.args.get("hub.verify_token")
+    challenge = request.args.get("hub.challenge")
+    
+    logger.info("Webhook verification request: mode=%s, token=%s", mode, token)
+    
+    # Verify the token matches our configured token
+    if mode == "subscribe" and token == settings.whatsapp_webhook_token:
+        logger.info("Webhook verification successful")
+        return challenge, 200
+    
+    logger.warning("Webhook verification failed: invalid token")
+    return "Forbidden", 403
 
 
 @app.route("/webhook", methods=["POST"])
-def webhook_handler():
+async def webhook_handler():
     """
     Handle incoming WhatsApp messages.
     
     Processes webhook events and responds to messages using the scheduling agent.
     """
+    # Verify the request signature
+    payload = await request.get_data(cache=False)
+    signature = request.headers.get("X-Hub-Signature-256", "")
+    if not verify_webhook_signature(payload, signature):
+        logger.warning("Invalid webhook signature")
+        return "Forbidden", 403
+    
+    if not payload:
+        logger.warning("Empty webhook payload")
+        return "Bad Request", 400
+    
+    # Hand the raw body to the background consumers and ACK right away;
+    # parsing and filtering happen off the request path
     try:
-        # Verify the request signature
-        signature = request.headers.get("X-Hub-Signature-256", "")
-        if not verify_webhook_signature(request.data, signature):
-            logger.warning("Invalid webhook signature")
-            return "Forbidden", 403
-        
-        # Parse the webhook payload
-        data = request.get_json()
-        if not data:
-            logger.warning("Empty webhook payload")
-            return "Bad Request", 400
-        
-        logger.info(f"Received webhook data: {json.dumps(data, indent=2)}")
-        
-        # Process the webhook data
-        asyncio.run(process_webhook_data(data))
-        
-        return "OK", 200
-        
-    except Exception as e:
-        logger.error(f"Error processing webhook: {e}")
-        return "Internal Server Error", 500
+        _webhook_queue.put_nowait(payload)
+    except asyncio.QueueFull:
+        logger.warning("Webhook queue full (%d), rejecting payload", WEBHOOK_QUEUE_SIZE)
+        return "Too Many Requests", 429
+    
+    return "OK", 200
+
+
+@app.errorhandler(Exception)
+async def handle_unexpected_error(error: Exception):
+    """Log unhandled route errors once, at the request boundary."""
+    if isinstance(error, HTTPException):
+        return error
+    logger.exception("Unhandled error in %s %s", request.method, request.path)
+    return "Internal Server Error", 500
+
+
+def _has_text_message(data: Dict[str, Any]) -> bool:
+    """Check whether a webhook payload contains at least one non-blank text message."""
+    for entry_item in data.get("entry", ()):
+        for change in entry_item.get("changes", ()):
+            if change.get("field") != "messages":
+                continue
+            for message in change.get("value", {}).get("messages", ()):
+                if message.get("type") == "text":
+                    body = message.get("text", {}).get("body", "")
+                    if body and not body.isspace():
+                        return True
+    return False
+
+
+async def _consume_webhooks(queue: asyncio.Queue) -> None:
+    """Parse and process queued raw webhook payloads until cancelled."""
+    while True:
+        payload = await queue.get()
+        try:
+            data = orjson.loads(payload)
+            
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Received webhook data: %s", orjson.dumps(data, option=orjson.OPT_INDENT_2).decode())
+            
+            # Status callbacks and non-text messages never reach the agent
+            if data and _has_text_message(data):
+                await process_webhook_data(data)
+        except orjson.JSONDecodeError:
+            logger.warning("Dropping malformed webhook payload")
+        except Exception:
+            # Background boundary: log and keep consuming
+            logger.exception("Error processing webhook data")
+        finally:
+            queue.task_done()
 
 
 async def process_webhook_data(data: Dict[str, Any]) -> None:
@@ -120,92 +196,114 @@ async def process_webhook_data(data: Dict[str, Any]) -> None:
     Args:
         data: Webhook payload from WhatsApp
     """
-    try:
-        # Extract entry data
-        entry = data.get("entry", [])
-        if not entry:
-            logger.info("No entry data in webhook")
-            return
+    # Extract entry data
+    entry = data.get("entry", [])
+    if not entry:
+        logger.info("No entry data in webhook")
+        return
+    
+    for entry_item in entry:
+        changes = entry_item.get("changes", [])
         
-        for entry_item in entry:
-            changes = entry_item.get("changes", [])
-            
-            for change in changes:
-                # Process message changes
-                if change.get("field") == "messages":
-                    await process_message_change(change.get("value", {}))
-                    
-    except Exception as e:
-        logger.error(f"Error processing webhook data: {e}")
+        for change in changes:
+            # Process message changes
+            if change.get("field") == "messages":
+                await process_message_change(change.get("value", {}))
 
 
 async def process_message_change(value: Dict[str, Any]) -> None:
     """
     Process individual message changes from webhook.
     
+    Messages in one change are handled concurrently; messages from the same
+    sender still run one at a time, in order.
+    
     Args:
         value: Message change value from webhook
     """
-    try:
-        messages = value.get("messages", [])
-        contacts = value.get("contacts", [])
+    # Status updates (sent/delivered/read) carry no messages at all
+    messages = value.get("messages")
+    if not messages:
+        return
+    
+    # Sender names by WhatsApp id, built once for the whole batch
+    contact_names = {
+        contact.get("wa_id"): contact.get("profile", {}).get("name", "Unknown")
+        for contact in value.get("contacts", ())
+    }
+    results = await asyncio.gather(
+        *(_handle_message(message, contact_names) for message in messages),
+        return_exceptions=True
+    )
+    for message, result in zip(messages, results):
+        if isinstance(result, Exception):
+            logger.error("Error processing message", exc_info=result, extra={"phone": message.get("from")})
+
+
+async def _handle_message(message: Dict[str, Any], contact_names: Dict[str, str]) -> None:
+    """
+    Run one incoming WhatsApp message through the scheduling agent.
+    
+    Args:
+        message: Message object from the webhook
+        contact_names: Contact names by WhatsApp id from the same message change
+    """
+    get = message.get
+    
+    # Skip if not a text message for now
+    message_type = get("type")
+    if message_type != "text":
+        logger.debug("Skipping non-text message type: %s", message_type)
+        return
+    
+    # Extract message text
+    text_content = (get("text") or {}).get("body")
+    if not text_content or text_content.isspace():
+        logger.debug("Empty message text")
+        return
+    
+    # Extract message details
+    from_number = get("from")
+    
+    # Get contact information
+    contact_name = contact_names.get(from_number, "Unknown")
+    
+    # One conversation turn at a time per sender, so replies keep their order
+    lock = _sender_locks.get(from_number)
+    if lock is None:
+        lock = _sender_locks[from_number] = asyncio.Lock()
+    
+    async with lock:
+        logger.info("Processing message from %s (%s): %s", contact_name, from_number, text_content)
         
-        for message in messages:
-            # Extract message details
-            message_id = message.get("id")
-            from_number = message.get("from")
-            message_type = message.get("type")
-            timestamp = message.get("timestamp")
-            
-            # Skip if not a text message for now
-            if message_type != "text":
-                logger.info(f"Skipping non-text message type: {message_type}")
-                continue
-            
-            # Extract message text
-            text_content = message.get("text", {}).get("body", "")
-            if not text_content:
-                logger.info("Empty message text")
-                continue
-            
-            # Get contact information
-            contact_name = "Unknown"
-            for contact in contacts:
-                if contact.get("wa_id") == from_number:
-                    contact_name = contact.get("profile", {}).get("name", "Unknown")
-                    break
-            
-            logger.info(f"Processing message from {contact_name} ({from_number}): {text_content}")
-            
-            # Create dependencies for this conversation
-            dependencies = create_scheduling_dependencies(
+        # Reuse the sender's dependencies (and their session caches) across messages
+        dependencies = _session_dependencies.get(from_number)
+        if dependencies is None:
+            dependencies = _session_dependencies[from_number] = create_scheduling_dependencies(
                 session_id=f"whatsapp_{from_number}",
                 user_timezone="UTC"  # Could be enhanced to detect user timezone
             )
+        
+        # Add contact information to conversation context
+        context = dependencies.conversation_context
+        context["client_phone"] = from_number
+        context["client_name"] = contact_name
+        context["message_id"] = get("id")
+        context["timestamp"] = get("timestamp")
+        
+        # Process the message with the scheduling agent, streaming the
+        # reply back to WhatsApp as sentences are generated
+        async def push(text: str) -> None:
+            await send_response_to_whatsapp(from_number, text, dependencies)
+        
+        try:
+            await chat_with_scheduler(text_content, dependencies, push=push)
             
-            # Add contact information to conversation context
-            dependencies.conversation_context.update({
-                "client_phone": from_number,
-                "client_name": contact_name,
-                "message_id": message_id,
-                "timestamp": timestamp
-            })
-            
-            # Process the message with the scheduling agent
-            try:
-                response = await chat_with_scheduler(text_content, dependencies)
-                
-                # Send response back to WhatsApp
-                await send_response_to_whatsapp(from_number, response, dependencies)
-                
-            except Exception as e:
-                logger.error(f"Error processing message with agent: {e}")
-                # Send error response
-                error_response = "I apologize, but I'm having trouble processing your request right now. Please try again or contact our staff directly."
-                await send_response_to_whatsapp(from_number, error_response, dependencies)
-                
-    except Exception as e:
-        logger.error(f"Error processing message change: {e}")
+        except Exception:
+            logger.exception("Error processing message with agent", extra={"phone": from_number})
+            # Send error response
+            error_response = "I apologize, but I'm having trouble processing your request right now. Please try again or contact our staff directly."
+            await send_response_to_whatsapp(from_number, error_response, dependencies)
 
 
 async def send_response_to_whatsapp(
@@ -216,42 +314,96 @@ async def send_response_to_whatsapp(
     """
     Send a response message back to WhatsApp.
     
+    While the server is running the message is handed to the reply sender and
+    this returns without waiting for the Graph API; otherwise it is sent inline.
+    
     Args:
         phone_number: Recipient phone number
         message: Message to send
         dependencies: Scheduling dependencies with HTTP client
     """
-    try:
-        # Use the send_whatsapp_message function from tools
-        from .tools import send_whatsapp_message
-        from pydantic_ai import RunContext
-        
-        # Create a minimal RunContext for the tool
-        class MockRunContext:
-            def __init__(self, deps):
-                self.deps = deps
-        
-        ctx = MockRunContext(dependencies)
-        result = await send_whatsapp_message(ctx, phone_number, message)
-        
-        logger.info(f"Response sent to {phone_number}: {result}")
+    if _reply_queue is not None:
+        await _reply_queue.put((phone_number, message, dependencies))
+    else:
+        await _deliver_replies([(phone_number, message, dependencies)])
+
+
+async def _deliver_replies(replies: List[Tuple[str, str, SchedulingDependencies]]) -> None:
+    """Send replies to one recipient in order, logging failures."""
+    for phone_number, message, dependencies in replies:
+        try:
+            # The tool only reads ctx.deps, so a namespace stands in for RunContext
+            result = await send_whatsapp_message(SimpleNamespace(deps=dependencies), phone_number, message)
+            
+            logger.info("Response sent to %s: %s", phone_number, result)
+            
+        except Exception:
+            logger.exception("Error sending response to WhatsApp", extra={"phone": phone_number})
+
+
+async def _send_replies(queue: asyncio.Queue) -> None:
+    """
+    Send queued replies in batches until cancelled.
+    
+    Replies arriving within REPLY_BATCH_WINDOW seconds of each other (up to
+    REPLY_BATCH_SIZE) are sent together: recipients concurrently over the
+    pooled HTTP/2 client, each recipient's replies in queue order.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await queue.get()]
+        deadline = loop.time() + REPLY_BATCH_WINDOW
+        while len(batch) < REPLY_BATCH_SIZE:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
         
-    except Exception as e:
-        logger.error(f"Error sending response to WhatsApp: {e}")
+        by_recipient: Dict[str, List[Tuple[str, str, SchedulingDependencies]]] = {}
+        for reply in batch:
+            by_recipient.setdefault(reply[0], []).append(reply)
+        try:
+            await asyncio.gather(*(_deliver_replies(replies) for replies in by_recipient.values()))
+        finally:
+            for _ in batch:
+                queue.task_done()
+
+
+@app.route("/calendar/notifications", methods=["POST"])
+async def calendar_notification():
+    """
+    Handle Google Calendar push notifications.
+    
+    The notification carries no event data, it only flags the local calendar
+    index for an incremental sync by the background sync task.
+    """
+    channel_id = request.headers.get("X-Goog-Channel-ID", "")
+    state = request.headers.get("X-Goog-Resource-State", "")
+    
+    if not notify_change(channel_id, request.headers.get("X-Goog-Channel-Token", "")):
+        logger.warning("Calendar notification for unknown channel %s", channel_id)
+        return "Forbidden", 403
+    
+    logger.debug("Calendar notification on channel %s: %s", channel_id, state)
+    return "OK", 200
 
 
 @app.route("/health", methods=["GET"])
-def health_check():
+async def health_check():
     """Health check endpoint."""
     return {
         "status": "healthy",
         "service": "whatsapp-scheduler",
+        "queue_depth": _webhook_queue.qsize() if _webhook_queue else 0,
         "version": "1.0.0"
     }, 200
 
 
 @app.route("/", methods=["GET"])
-def root():
+async def root():
     """Root endpoint with basic info."""
     return {
         "service": "WhatsApp Scheduling Agent",
@@ -263,8 +415,61 @@ def root():
     }, 200
 
 
+@app.before_serving
+async def startup() -> None:
+    """Create the webhook and reply queues and start their workers and the calendar sync on the serving loop."""
+    global _webhook_queue, _calendar_sync_task, _reply_queue, _reply_task
+    if settings.app_env != "development" and _APP_SECRET is None:
+        raise RuntimeError(
+            "WHATSAPP_APP_SECRET must be set outside development, "
+            "webhook signatures cannot be verified without it"
+        )
+    
+    _reply_queue = asyncio.Queue(maxsize=WEBHOOK_QUEUE_SIZE)
+    _reply_task = asyncio.create_task(_send_replies(_reply_queue))
+    _webhook_queue = asyncio.Queue(maxsize=WEBHOOK_QUEUE_SIZE)
+    _consumer_tasks[:] = [
+        asyncio.create_task(_consume_webhooks(_webhook_queue))
+        for _ in range(WEBHOOK_CONSUMERS)
+    ]
+    
+    if settings.calendar_webhook_url:
+        ctx = SimpleNamespace(deps=create_scheduling_dependencies(session_id="calendar_sync"))
+        _calendar_sync_task = asyncio.create_task(run_calendar_sync(ctx, settings.calendar_webhook_url))
+
+
+@app.after_serving
+async def shutdown() -> None:
+    """Stop the consumers and calendar sync, flush pending replies, release the pooled HTTP connections and close the booking store."""
+    global _calendar_sync_task, _reply_queue, _reply_task
+    tasks = [*_consumer_tasks, _calendar_sync_task] if _calendar_sync_task else list(_consumer_tasks)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    _calendar_sync_task = None
+    _consumer_tasks.clear()
+    
+    # Give replies already queued a chance to go out before the client closes
+    try:
+        await asyncio.wait_for(_reply_queue.join(), REPLY_SHUTDOWN_TIMEOUT)
+    except asyncio.TimeoutError:
+        logger.warning("Dropping %d unsent WhatsApp replies on shutdown", _reply_queue.qsize())
+    _reply_task.cancel()
+    await asyncio.gather(_reply_task, return_exceptions=True)
+    _reply_queue = _reply_task = None
+    await close_http_client()
+    await close_booking_store()
+
+
 if __name__ == "__main__":
-    # Run the Flask app
+    # Development server; in production run under uvicorn with --loop uvloop (see README)
+    try:
+        import uvloop
+    except ImportError:  # uvloop is optional (and unavailable on Windows)
+        pass
+    else:
+        # app.run creates its loop from the policy; set here so importing the app stays side-effect free
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
     app.run(
         host="0.0.0.0",
         port=5000,